@@ -0,0 +1,497 @@
+import asyncio
+import base64
+import binascii
+from collections.abc import Mapping
+import pathlib
+import struct
+import sys
+import time
+
+from custom_components.smartir.command_index import ClimateCommandIndex
+from custom_components.smartir.device_data import DeviceData
+from custom_components.smartir.ir_codec import (
+    broadlink_to_pulses,
+    pronto_to_pulses,
+    pulses_to_broadlink,
+    pulses_to_pronto,
+    pulses_to_tuya,
+    tuya_to_pulses,
+)
+from custom_components.smartir.smartir_helpers import closest_match_value
+
+CHECK_DATA = {
+    "climate": {
+        "hvac_modes": ["auto", "heat", "cool", "heat_cool", "fan_only", "dry"],
+    },
+    "fan": {},
+    "media_player": {},
+    "light": {},
+}
+
+HEARTBEAT_INTERVAL = 0.001
+VALIDATE_ROUNDS = 5
+LOOKIN_COMMANDS = 500
+
+
+def device_class(file_path):
+    return pathlib.Path(file_path).parts[-2]
+
+
+def load_and_check(file_path):
+    device_data = DeviceData.read_file(file_path)
+    return DeviceData.check_file(
+        file_path,
+        device_data,
+        device_class(file_path),
+        dict(CHECK_DATA[device_class(file_path)]),
+    )
+
+
+async def load_inline(file_path):
+    """Read file in the executor, validate it in the event loop.
+
+    The file is read by the same loader as in the executor benchmark, so only
+    the place of the validation differs.
+    """
+    device_data = await asyncio.get_running_loop().run_in_executor(
+        None, DeviceData.read_file, file_path
+    )
+    return DeviceData.check_file(
+        file_path,
+        device_data,
+        device_class(file_path),
+        dict(CHECK_DATA[device_class(file_path)]),
+    )
+
+
+async def load_executor(file_path):
+    """Read and validate file as a single executor job."""
+    return await asyncio.get_running_loop().run_in_executor(
+        None, load_and_check, file_path
+    )
+
+
+async def measure_loop_blocking(load, files):
+    """Load files and measure how long the event loop was blocked."""
+    lags = []
+    done = asyncio.Event()
+
+    async def heartbeat():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            lags.append(time.perf_counter() - start - HEARTBEAT_INTERVAL)
+
+    task = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    for file_path in files:
+        await load(file_path)
+    elapsed = time.perf_counter() - start
+    done.set()
+    await task
+    return elapsed, sum(lags), max(lags), len([lag for lag in lags if lag > 0.005])
+
+
+async def benchmark_loop(files):
+    for name, load in [("inline", load_inline), ("executor", load_executor)]:
+        elapsed, blocked, worst, long = await measure_loop_blocking(load, files)
+        print(
+            "%-10s files: %d, total: %.3fs, loop blocked: %.3fs, longest block: %.1fms, blocks over 5ms: %d"
+            % (name, len(files), elapsed, blocked, worst * 1000, long)
+        )
+
+
+def count_leaves(commands):
+    if isinstance(commands, Mapping):
+        return sum(count_leaves(value) for value in commands.values())
+    return 1
+
+
+async def benchmark_validate(files):
+    """Measure validation throughput of already loaded device files."""
+    devices = []
+    for file_path in files:
+        device_data = DeviceData.read_file_as_json(file_path)
+        devices.append((file_path, device_data, count_leaves(device_data["commands"])))
+
+    invalid = 0
+    start = time.perf_counter()
+    for _ in range(VALIDATE_ROUNDS):
+        for file_path, device_data, _ in devices:
+            if not DeviceData.check_file(
+                file_path,
+                device_data,
+                device_class(file_path),
+                dict(CHECK_DATA[device_class(file_path)]),
+            ):
+                invalid += 1
+    elapsed = (time.perf_counter() - start) / VALIDATE_ROUNDS
+
+    leaves = sum(device[2] for device in devices)
+    print(
+        "files: %d (%d invalid), leaves: %d, time: %.3fs, %.0f files/s, %.0f leaves/s"
+        % (
+            len(devices),
+            invalid / VALIDATE_ROUNDS,
+            leaves,
+            elapsed,
+            len(devices) / elapsed,
+            leaves / elapsed,
+        )
+    )
+
+
+def walk_commands(commands, levels, hvac_mode, modes, temperature):
+    """Resolve climate command by walking the nested commands tree."""
+    if hvac_mode not in commands.keys():
+        return None
+    commands = commands[hvac_mode]
+    modes = list(modes)
+    for index, declared in enumerate(levels):
+        if not declared:
+            continue
+        if not isinstance(commands, Mapping):
+            return None
+        for key in ["-", modes[index]] + declared:
+            if key in commands.keys():
+                modes[index] = key
+                commands = commands[key]
+                break
+        else:
+            return None
+    if not isinstance(commands, Mapping):
+        return None
+    if "-" in commands.keys():
+        temp = "-"
+        commands = commands["-"]
+    elif (
+        temp := closest_match_value(temperature, commands.keys())
+    ) and temp is not None:
+        commands = commands[str(temp)]
+    else:
+        return None
+    if not isinstance(commands, str):
+        return None
+    return commands, *modes, temp
+
+
+def climate_requests(device_data):
+    """Return all requests of the declared modes and temperatures."""
+    levels = [
+        device_data.get(attr) or [None]
+        for attr in ("presetModes", "fanModes", "swingModes")
+    ]
+    temperatures = []
+    temperature = device_data["minTemperature"]
+    while temperature <= device_data["maxTemperature"]:
+        temperatures.append(temperature)
+        temperature = round(temperature + device_data["precision"], 1)
+    return [
+        (hvac_mode, preset_mode, fan_mode, swing_mode, temperature)
+        for hvac_mode in device_data["operationModes"]
+        for preset_mode in levels[0]
+        for fan_mode in levels[1]
+        for swing_mode in levels[2]
+        for temperature in temperatures
+    ]
+
+
+async def benchmark_lookup(files):
+    """Compare climate commands tree walk with the flat commands index."""
+    devices = []
+    for file_path in files:
+        device_data = DeviceData.read_file_as_json(file_path)
+        devices.append((device_data, climate_requests(device_data)))
+    lookups = sum(len(requests) for _, requests in devices)
+
+    start = time.perf_counter()
+    expected = []
+    for device_data, requests in devices:
+        levels = [
+            device_data.get(attr) for attr in ("presetModes", "fanModes", "swingModes")
+        ]
+        expected.append(
+            [
+                walk_commands(device_data["commands"], levels, hvac, modes, temp)
+                for hvac, *modes, temp in requests
+            ]
+        )
+    walk = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexes = []
+    for device_data, requests in devices:
+        index = ClimateCommandIndex(
+            device_data["commands"],
+            device_data["operationModes"],
+            device_data.get("presetModes"),
+            device_data.get("fanModes"),
+            device_data.get("swingModes"),
+            sorted({temperature for *_, temperature in requests}),
+        )
+        index.build()
+        indexes.append(index)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = [
+        [index.resolve(*request) for request in requests]
+        for index, (_, requests) in zip(indexes, devices)
+    ]
+    resolve = time.perf_counter() - start
+    if results != expected:
+        print("Commands index results differ from the commands tree walk!")
+        sys.exit(1)
+
+    print("lookups: %d" % lookups)
+    for name, elapsed in (
+        ("walk", walk),
+        ("index build", build),
+        ("index", resolve),
+    ):
+        print(
+            "%-11s %.3fs, %.2fus per lookup"
+            % (name, elapsed, elapsed / lookups * 1000000)
+        )
+
+
+def legacy_pronto2lirc(pronto):
+    codes = [
+        int(binascii.hexlify(pronto[i : i + 2]), 16) for i in range(0, len(pronto), 2)
+    ]
+
+    if codes[0]:
+        raise ValueError("Pronto code should start with 0000")
+    if len(codes) != 4 + 2 * (codes[2] + codes[3]):
+        raise ValueError("Number of pulse widths does not match the preamble")
+
+    frequency = 1 / (codes[1] * 0.241246)
+    return [int(round(code / frequency)) for code in codes[4:]]
+
+
+def legacy_lirc2broadlink(pulses):
+    array = bytearray()
+
+    for pulse in pulses:
+        pulse = int(pulse * 269 / 8192)
+
+        if pulse < 256:
+            array += bytearray(struct.pack(">B", pulse))
+        else:
+            array += bytearray([0x00])
+            array += bytearray(struct.pack(">H", pulse))
+
+    packet = bytearray([0x26, 0x00])
+    packet += bytearray(struct.pack("<H", len(array)))
+    packet += array
+    packet += bytearray([0x0D, 0x05])
+
+    remainder = (len(packet) + 4) % 16
+    if remainder:
+        packet += bytearray(16 - remainder)
+    return packet
+
+
+def command_leaves(commands):
+    if isinstance(commands, Mapping):
+        for value in commands.values():
+            yield from command_leaves(value)
+    elif isinstance(commands, list):
+        for value in commands:
+            yield from command_leaves(value)
+    elif isinstance(commands, str):
+        yield commands
+
+
+def measure(function, items):
+    start = time.perf_counter()
+    results = [function(item) for item in items]
+    return results, time.perf_counter() - start
+
+
+async def benchmark_codec(files):
+    """Compare IR codec with the previous Pronto and Broadlink conversions.
+
+    Tuya codes are checked only by their round trip.
+    """
+    packets = []
+    for file_path in files:
+        device_data = DeviceData.read_file_as_json(file_path)
+        if (
+            device_data.get("supportedController") != "Broadlink"
+            or device_data.get("commandsEncoding") != "Base64"
+        ):
+            continue
+        for command in command_leaves(device_data["commands"]):
+            try:
+                packet = base64.b64decode(command)
+                broadlink_to_pulses(packet)
+            except (ValueError, binascii.Error):
+                continue
+            packets.append(packet)
+
+    pulses, decode = measure(broadlink_to_pulses, packets)
+    pulses = [item for item in pulses if item and not len(item) % 2]
+    encoded, encode = measure(pulses_to_broadlink, pulses)
+    legacy_encoded, legacy_encode = measure(legacy_lirc2broadlink, pulses)
+    if encoded != legacy_encoded:
+        print("Broadlink packets differ from the previous encoder output!")
+        sys.exit(1)
+    if [broadlink_to_pulses(packet) for packet in encoded] != pulses:
+        print("Broadlink packets round trip doesn't return the same pulses!")
+        sys.exit(1)
+
+    prontos = [pulses_to_pronto(item) for item in pulses]
+    decoded, pronto_decode = measure(pronto_to_pulses, prontos)
+    legacy_decoded, legacy_pronto_decode = measure(legacy_pronto2lirc, prontos)
+    if decoded != legacy_decoded:
+        print("Pronto pulses differ from the previous decoder output!")
+        sys.exit(1)
+
+    tuyas, tuya_encode = measure(pulses_to_tuya, pulses)
+    decoded, tuya_decode = measure(tuya_to_pulses, tuyas)
+    if decoded != [[min(pulse, 0xFFFF) for pulse in item] for item in pulses]:
+        print("Tuya codes round trip doesn't return the same pulses!")
+        sys.exit(1)
+
+    print("codes: %d of %d Broadlink codes" % (len(pulses), len(packets)))
+    for name, count, elapsed in (
+        ("broadlink decode", len(packets), decode),
+        ("broadlink encode", len(pulses), encode),
+        ("legacy encode", len(pulses), legacy_encode),
+        ("pronto decode", len(prontos), pronto_decode),
+        ("legacy decode", len(prontos), legacy_pronto_decode),
+        ("tuya encode", len(pulses), tuya_encode),
+        ("tuya decode", len(tuyas), tuya_decode),
+    ):
+        print("%-16s %.3fs, %.0f codes/s" % (name, elapsed, count / elapsed))
+    print(
+        "tuya size        %.1f%% of Broadlink packets"
+        % (100 * sum(map(len, tuyas)) / sum(map(len, encoded)))
+    )
+
+
+async def start_lookin_server(received):
+    """Start local stand-in of the LOOKin remote HTTP API."""
+    from aiohttp import web
+
+    async def handle(request):
+        received.append(request.match_info["command"])
+        return web.Response(text="OK")
+
+    app = web.Application()
+    app.router.add_get("/commands/ir/{encoding}/{command}", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, "%s:%d" % (host, port)
+
+
+async def benchmark_lookin(files):
+    """Compare LOOKin command latency of the HTTP client and the executor.
+
+    Commands are sent one by one to a local stand-in of the LOOKin remote.
+    """
+    import aiohttp
+
+    from custom_components.smartir.lookin_client import LookinClient
+
+    # Pronto commands, Broadlink commands are converted to Pronto
+    commands = []
+    for file_path in files:
+        device_data = DeviceData.read_file_as_json(file_path)
+        encoding = (
+            device_data.get("supportedController"),
+            device_data.get("commandsEncoding"),
+        )
+        for command in command_leaves(device_data["commands"]):
+            if encoding[1] == "Pronto":
+                commands.append(command.replace(" ", ""))
+            elif encoding == ("Broadlink", "Base64"):
+                try:
+                    pulses = broadlink_to_pulses(base64.b64decode(command))
+                except (ValueError, binascii.Error):
+                    continue
+                if pulses and not len(pulses) % 2:
+                    commands.append(pulses_to_pronto(pulses).hex().upper())
+        if len(commands) >= LOOKIN_COMMANDS:
+            break
+    commands = commands[:LOOKIN_COMMANDS]
+    if not commands:
+        print("No Pronto commands found!")
+        sys.exit(1)
+
+    received = []
+    runner, host = await start_lookin_server(received)
+    paths = ["/commands/ir/prontohex/" + command for command in commands]
+    loop = asyncio.get_running_loop()
+    results = []
+    try:
+        try:
+            import requests
+        except ImportError:
+            requests = None
+            print("requests package is not installed, skipping executor benchmark")
+        if requests is not None:
+            # previous implementation, every request in the executor thread
+            latencies = []
+            for path in paths:
+                start = time.perf_counter()
+                await loop.run_in_executor(None, requests.get, "http://" + host + path)
+                latencies.append(time.perf_counter() - start)
+            results.append(("executor", latencies))
+
+        async with aiohttp.ClientSession() as session:
+            client = LookinClient(session, host, backoff=0)
+            latencies = []
+            for path in paths:
+                start = time.perf_counter()
+                await client.async_get(path)
+                latencies.append(time.perf_counter() - start)
+            results.append(("client", latencies))
+    finally:
+        await runner.cleanup()
+
+    if len(received) != len(commands) * len(results) or received[-1] != commands[-1]:
+        print("Stand-in LOOKin remote didn't receive all commands!")
+        sys.exit(1)
+
+    print("commands: %d, requests: %d" % (len(commands), len(received)))
+    for name, latencies in results:
+        latencies.sort()
+        print(
+            "%-9s total: %.3fs, mean: %.2fms, median: %.2fms, p99: %.2fms"
+            % (
+                name,
+                sum(latencies),
+                1000 * sum(latencies) / len(latencies),
+                1000 * latencies[len(latencies) // 2],
+                1000 * latencies[len(latencies) * 99 // 100],
+            )
+        )
+
+
+BENCHMARKS = {
+    "loop": benchmark_loop,
+    "validate": benchmark_validate,
+    "lookup": benchmark_lookup,
+    "codec": benchmark_codec,
+    "lookin": benchmark_lookin,
+}
+
+
+def main():
+    args = sys.argv
+    args.pop(0)
+    if len(args) < 2 or args[0] not in BENCHMARKS:
+        print("Usage: benchmark.py {%s} FILE..." % "|".join(BENCHMARKS))
+        sys.exit(1)
+
+    asyncio.run(BENCHMARKS[args[0]](args[1:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import pathlib
+import sys
+
+from custom_components.smartir.device_bundle import compile_bundle_file
+
+
+def main():
+    exit = 0
+
+    files = sys.argv
+    files.pop(0)
+    if not len(files):
+        sys.exit(0)
+
+    for file_path in files:
+        path = pathlib.Path(file_path)
+        if path.suffix != ".json":
+            continue
+        try:
+            print("Compiled '%s'." % compile_bundle_file(file_path))
+        except Exception as e:
+            print("Error compiling '%s': '%s'." % (file_path, e))
+            exit = 1
+
+    sys.exit(exit)
+
+
+main()
@@ -1,4 +1,3 @@
-import asyncio
 import logging
 
 import voluptuous as vol
@@ -30,7 +29,8 @@ import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.typing import ConfigType
 from homeassistant.util.unit_conversion import TemperatureConverter
-from .smartir_helpers import closest_match_value
+from .command_index import ClimateCommandIndex
+from .command_queue import CommandQueue
 from .smartir_entity import load_device_data_file, SmartIR, PLATFORM_SCHEMA
 
 _LOGGER = logging.getLogger(__name__)
@@ -84,6 +84,8 @@ class SmartIRClimate(SmartIR, ClimateEntity, RestoreEntity):
         self._temperature_unit = hass.config.units.temperature_unit
 
         self._hvac_mode = None
+        # operation mode last sent to the device, selects its off command
+        self._sent_hvac_mode = None
         self._preset_mode = None
         self._fan_mode = None
         self._swing_mode = None
@@ -155,9 +157,20 @@ class SmartIRClimate(SmartIR, ClimateEntity, RestoreEntity):
         )
         self._target_temperature = self._min_temperature
 
+        # HA and device temperatures conversion tables
+        self._temperatures = TemperatureTable(
+            device_data["minTemperature"],
+            device_data["maxTemperature"],
+            self._data_temp_step,
+            self._data_temperature_unit,
+            self._min_temperature,
+            self._max_temperature,
+            self._temp_step,
+            self._ha_temperature_unit,
+        )
+
         # hvac_modes
-        self._hvac_modes = device_data["operationModes"]
-        self._hvac_modes.append(HVACMode.OFF)
+        self._hvac_modes = device_data["operationModes"] + [HVACMode.OFF]
 
         # preset_modes
         self._preset_modes = device_data.get("presetModes")
@@ -177,9 +190,23 @@ class SmartIRClimate(SmartIR, ClimateEntity, RestoreEntity):
             self._support_flags = self._support_flags | ClimateEntityFeature.SWING_MODE
             self._swing_mode = self._swing_modes[0]
 
+        # commands of all requested modes combinations, built in the executor
+        self._command_index = ClimateCommandIndex(
+            self._commands,
+            device_data["operationModes"],
+            self._preset_modes,
+            self._fan_modes,
+            self._swing_modes,
+            self._temperatures.device_temperatures(),
+        )
+
+        # changes requested while sending are merged and sent once
+        self._command_queue = CommandQueue(self._send_changes)
+
     async def async_added_to_hass(self):
         """Run when entity about to be added."""
         await super().async_added_to_hass()
+        await self.hass.async_add_executor_job(self._command_index.build)
         _LOGGER.debug(
             f"async_added_to_hass {self} {self.name} {self.supported_features}"
         )
@@ -189,6 +216,7 @@ class SmartIRClimate(SmartIR, ClimateEntity, RestoreEntity):
         if last_state is not None:
             if last_state.attributes.get("hvac_mode") in self._hvac_modes:
                 self._hvac_mode = last_state.attributes.get("hvac_mode")
+                self._sent_hvac_mode = self._hvac_mode
 
             if (
                 self._support_flags & ClimateEntityFeature.PRESET_MODE
@@ -361,6 +389,9 @@ class SmartIRClimate(SmartIR, ClimateEntity, RestoreEntity):
             "supported_models": self._supported_models,
             "supported_controller": self._supported_controller,
             "commands_encoding": self._commands_encoding,
+            "sends_suppressed": self._send_filter.suppressed,
+            "commands_coalesced": self._command_queue.coalesced,
+            "commands_sent": self._command_queue.sent,
         }
 
     async def async_set_hvac_mode(self, hvac_mode):
@@ -370,19 +401,11 @@ class SmartIRClimate(SmartIR, ClimateEntity, RestoreEntity):
             return
 
         if hvac_mode == HVACMode.OFF:
-            state = STATE_OFF
-            hvac_mode = self._hvac_mode
+            changes = {"state": STATE_OFF}
         else:
-            state = STATE_ON
+            changes = {"state": STATE_ON, "hvac_mode": hvac_mode}
 
-        await self._send_command(
-            state,
-            hvac_mode,
-            self._preset_mode,
-            self._fan_mode,
-            self._swing_mode,
-            self._target_temperature,
-        )
+        await self._command_queue.async_submit(changes)
 
     async def async_set_temperature(self, **kwargs):
         """Set new target temperatures."""
@@ -397,29 +420,21 @@ class SmartIRClimate(SmartIR, ClimateEntity, RestoreEntity):
             return
 
         if hvac_mode is None:
-            hvac_mode = self._hvac_mode
-            if self._state == STATE_OFF:
-                state = STATE_OFF
-            else:
-                state = STATE_ON
+            changes = {"temperature": temperature}
         elif hvac_mode not in self._hvac_modes:
             _LOGGER.error("The hvac mode '%s' is not supported.", hvac_mode)
             return
         else:
             if hvac_mode == HVACMode.OFF:
-                state = STATE_OFF
-                hvac_mode = self._hvac_mode
+                changes = {"state": STATE_OFF, "temperature": temperature}
             else:
-                state = STATE_ON
+                changes = {
+                    "state": STATE_ON,
+                    "hvac_mode": hvac_mode,
+                    "temperature": temperature,
+                }
 
-        await self._send_command(
-            state,
-            hvac_mode,
-            self._preset_mode,
-            self._fan_mode,
-            self._swing_mode,
-            temperature,
-        )
+        await self._command_queue.async_submit(changes)
 
     async def async_set_preset_mode(self, preset_mode):
         """Set preset mode."""
@@ -428,14 +443,7 @@ class SmartIRClimate(SmartIR, ClimateEntity, RestoreEntity):
             _LOGGER.error("The preset mode '%s' is not supported.", preset_mode)
             return
 
-        await self._send_command(
-            self._state,
-            self._hvac_mode,
-            preset_mode,
-            self._fan_mode,
-            self._swing_mode,
-            self._target_temperature,
-        )
+        await self._command_queue.async_submit({"preset_mode": preset_mode})
 
     async def async_set_fan_mode(self, fan_mode):
         """Set fan mode."""
@@ -444,14 +452,7 @@ class SmartIRClimate(SmartIR, ClimateEntity, RestoreEntity):
             _LOGGER.error("The fan mode '%s' is not supported.", fan_mode)
             return
 
-        await self._send_command(
-            self._state,
-            self._hvac_mode,
-            self._preset_mode,
-            fan_mode,
-            self._swing_mode,
-            self._target_temperature,
-        )
+        await self._command_queue.async_submit({"fan_mode": fan_mode})
 
     async def async_set_swing_mode(self, swing_mode):
         """Set swing mode."""
@@ -460,14 +461,7 @@ class SmartIRClimate(SmartIR, ClimateEntity, RestoreEntity):
             _LOGGER.error("The swing mode '%s' is not supported.", swing_mode)
             return
 
-        await self._send_command(
-            self._state,
-            self._hvac_mode,
-            self._preset_mode,
-            self._fan_mode,
-            swing_mode,
-            self._target_temperature,
-        )
+        await self._command_queue.async_submit({"swing_mode": swing_mode})
 
     async def async_turn_off(self):
         """Turn off."""
@@ -475,7 +469,23 @@ class SmartIRClimate(SmartIR, ClimateEntity, RestoreEntity):
 
     async def async_turn_on(self):
         """Turn on."""
-        await self.async_set_hvac_mode(self._hvac_mode)
+        if self._hvac_mode not in self._hvac_modes:
+            _LOGGER.error("The hvac_mode '%s' is not supported.", self._hvac_mode)
+            return
+
+        # keeps operation mode of the pending changes
+        await self._command_queue.async_submit({"state": STATE_ON})
+
+    async def _send_changes(self, changes):
+        """Send the current state updated by the requested changes."""
+        await self._send_command(
+            changes.get("state", self._state),
+            changes.get("hvac_mode", self._hvac_mode),
+            changes.get("preset_mode", self._preset_mode),
+            changes.get("fan_mode", self._fan_mode),
+            changes.get("swing_mode", self._swing_mode),
+            changes.get("temperature", self._target_temperature),
+        )
 
     async def _send_command(
         self, state, hvac_mode, preset_mode, fan_mode, swing_mode, temperature
@@ -486,13 +496,15 @@ class SmartIRClimate(SmartIR, ClimateEntity, RestoreEntity):
 
             try:
                 if state == STATE_OFF:
-                    off_mode = "off_" + self._hvac_mode
+                    # merged changes may set a mode never sent to the device
+                    off_mode = "off_%s" % self._sent_hvac_mode
                     if off_mode in self._commands.keys() and isinstance(
                         self._commands[off_mode], str
                     ):
                         _LOGGER.debug("Found '%s' operation mode command.", off_mode)
-                        await self._controller.send(self._commands[off_mode])
-                        await asyncio.sleep(self._delay)
+                        await self._async_send_sequence(
+                            [self._commands[off_mode]], STATE_OFF
+                        )
                     elif "off" in self._commands.keys() and isinstance(
                         self._commands["off"], str
                     ):
@@ -510,8 +522,9 @@ class SmartIRClimate(SmartIR, ClimateEntity, RestoreEntity):
                             )
                         else:
                             _LOGGER.debug("Found 'off' operation mode command.")
-                            await self._controller.send(self._commands["off"])
-                            await asyncio.sleep(self._delay)
+                            await self._async_send_sequence(
+                                [self._commands["off"]], STATE_OFF
+                            )
                     else:
                         _LOGGER.error(
                             "Missing device IR code for 'off' or '%s' operation mode.",
@@ -519,6 +532,7 @@ class SmartIRClimate(SmartIR, ClimateEntity, RestoreEntity):
                         )
                         return
                 else:
+                    commands = []
                     if "on" in self._commands.keys() and isinstance(
                         self._commands["on"], str
                     ):
@@ -537,156 +551,45 @@ class SmartIRClimate(SmartIR, ClimateEntity, RestoreEntity):
                         else:
                             # if on code is not present, the on bit can be still set later in the all operation/fan codes"""
                             _LOGGER.debug("Found 'on' operation mode command.")
-                            await self._controller.send(self._commands["on"])
-                            await asyncio.sleep(self._delay)
-
-                    commands = self._commands
-                    if hvac_mode in commands.keys():
-                        commands = commands[hvac_mode]
-                        _LOGGER.debug(
-                            "Found '%s' operation mode command.",
-                            hvac_mode,
-                        )
-                    else:
-                        _LOGGER.error(
-                            "Missing device IR code for '%s' operation mode.", hvac_mode
-                        )
-                        return
+                            commands.append(self._commands["on"])
 
-                    if self._preset_modes:
-                        if isinstance(commands, dict):
-                            for key in ["-", preset_mode] + self._preset_modes:
-                                if key in commands.keys():
-                                    preset_mode = key
-                                    commands = commands[key]
-                                    _LOGGER.debug(
-                                        "Found '%s' preset mode command.",
-                                        preset_mode,
-                                    )
-                                    break
-                            else:
-                                _LOGGER.error(
-                                    "Missing device IR codes for selected '%s' preset mode.",
-                                    preset_mode,
-                                )
-                                return
-                        else:
-                            _LOGGER.error(
-                                "No device IR codes for preset modes are defined.",
-                            )
-                            return
-
-                    if self._fan_modes:
-                        if isinstance(commands, dict):
-                            for key in ["-", fan_mode] + self._fan_modes:
-                                if key in commands.keys():
-                                    fan_mode = key
-                                    commands = commands[key]
-                                    _LOGGER.debug(
-                                        "Found '%s' fan mode command.",
-                                        fan_mode,
-                                    )
-                                    break
-                            else:
-                                _LOGGER.error(
-                                    "Missing device IR codes for selected '%s' fan mode.",
-                                    fan_mode,
-                                )
-                                return
-                        else:
-                            _LOGGER.error(
-                                "No device IR codes for fan modes are defined.",
-                            )
-                            return
-
-                    if self._swing_modes:
-                        if isinstance(commands, dict):
-                            for key in ["-", swing_mode] + self._swing_modes:
-                                if key in commands.keys():
-                                    swing_mode = key
-                                    commands = commands[key]
-                                    _LOGGER.debug(
-                                        "Found '%s' swing mode command.",
-                                        swing_mode,
-                                    )
-                                    break
-                            else:
-                                _LOGGER.error(
-                                    "Missing device IR codes for selected '%s' swing mode.",
-                                    swing_mode,
-                                )
-                                return
-                        else:
-                            _LOGGER.error(
-                                "No device IR codes for swing modes are defined.",
-                            )
-                            return
-
-                    if isinstance(commands, dict):
-                        target_temperature = convert_temp(
-                            temperature,
-                            self._ha_temperature_unit,
-                            self._data_temperature_unit,
-                            None,
+                    if self._command_index.outdated:
+                        # commands were reloaded
+                        await self.hass.async_add_executor_job(
+                            self._command_index.build
                         )
-                        _LOGGER.debug(
-                            "Input HA temperature '%s%s' converted into device temperature '%s%s'.",
-                            temperature,
-                            self._ha_temperature_unit,
+                    target_temperature = self._temperatures.to_device(temperature)
+                    if not (
+                        command := self._command_index.resolve(
+                            hvac_mode,
+                            preset_mode,
+                            fan_mode,
+                            swing_mode,
                             target_temperature,
-                            self._data_temperature_unit,
-                        )
-
-                        if "-" in commands.keys():
-                            temperature = "-"
-                            commands = commands["-"]
-                        elif (
-                            temp := closest_match_value(
-                                target_temperature, commands.keys()
-                            )
-                        ) and temp is not None:
-                            # convert selected device temperature back to HA units
-                            temp_ha = convert_temp(
-                                temp,
-                                self._data_temperature_unit,
-                                self._ha_temperature_unit,
-                                self._temp_step,
-                            )
-                            _LOGGER.debug(
-                                "Input HA temperature '%s%s' closest found device temperature command '%s%s' converts back into HA '%s%s' temperature.",
-                                temperature,
-                                self._ha_temperature_unit,
-                                temp,
-                                self._data_temperature_unit,
-                                temp_ha,
-                                self._ha_temperature_unit,
-                            )
-                            temperature = temp_ha
-                            commands = commands[str(temp)]
-                        else:
-                            _LOGGER.error(
-                                "Missing device IR codes for selected '%s' temperature.",
-                                target_temperature,
-                            )
-                            return
-                        _LOGGER.debug(
-                            "Found '%s', temperature command.",
-                            temperature,
-                        )
-                    else:
-                        _LOGGER.error(
-                            "No device IR codes for temperatures are defined.",
-                        )
-                        return
-
-                    if not isinstance(commands, str):
-                        _LOGGER.error(
-                            "No device IR code found.",
                         )
+                    ):
                         return
+                    code, preset_mode, fan_mode, swing_mode, temp = command
+                    _LOGGER.debug(
+                        "Found command for '%s' operation mode, '%s' preset mode, '%s' fan mode, '%s' swing mode and '%s%s' device temperature (input HA temperature '%s%s').",
+                        hvac_mode,
+                        preset_mode,
+                        fan_mode,
+                        swing_mode,
+                        temp,
+                        self._data_temperature_unit,
+                        temperature,
+                        self._ha_temperature_unit,
+                    )
+                    if temp == "-":
+                        temperature = "-"
+                    else:
+                        # convert selected device temperature back to HA units
+                        temperature = self._temperatures.to_ha(temp)
 
-                    await self._controller.send(commands)
-                    await asyncio.sleep(self._delay)
+                    commands.append(code)
+                    await self._async_send_sequence(commands, STATE_ON)
+                    self._sent_hvac_mode = hvac_mode
 
                 self._on_by_remote = False
                 self._state = state
@@ -832,3 +735,71 @@ def convert_temp(temperature: Number, from_unit: str, to_unit: str, precision: N
     else:
         _LOGGER.error("Invalid precision '%s'.", precision)
         return None
+
+
+def temperature_steps(min_temperature, max_temperature, step):
+    """Return all temperatures from min to max temperature by step."""
+    steps = []
+    index = 0
+    while (temperature := round(min_temperature + index * step, 1)) <= max_temperature:
+        steps.append(temperature)
+        index += 1
+    return steps
+
+
+class TemperatureTable:
+    """Two-way table of HA and device temperatures of a climate entity.
+
+    All HA temperatures between min and max temperature by the HA temperature
+    step and all device temperatures by the device precision are converted
+    once, other temperatures are converted on every lookup.
+    """
+
+    def __init__(
+        self,
+        data_min_temperature,
+        data_max_temperature,
+        data_step,
+        data_unit,
+        ha_min_temperature,
+        ha_max_temperature,
+        ha_step,
+        ha_unit,
+    ):
+        self._data_unit = data_unit
+        self._ha_step = ha_step
+        self._ha_unit = ha_unit
+        self._to_device = {
+            temperature: convert_temp(temperature, ha_unit, data_unit, None)
+            for temperature in temperature_steps(
+                ha_min_temperature, ha_max_temperature, ha_step
+            )
+        }
+        self._to_ha = {
+            temperature: convert_temp(temperature, data_unit, ha_unit, ha_step)
+            for temperature in temperature_steps(
+                data_min_temperature, data_max_temperature, data_step
+            )
+        }
+
+    def to_device(self, temperature):
+        """Return HA temperature converted to device units, not rounded."""
+        if (converted := self._to_device.get(temperature)) is None:
+            converted = convert_temp(temperature, self._ha_unit, self._data_unit, None)
+        return converted
+
+    def device_temperatures(self):
+        """Return HA temperatures converted to device units."""
+        return list(self._to_device.values())
+
+    def to_ha(self, temperature):
+        """Return device temperature command key converted to HA temperature."""
+        try:
+            converted = self._to_ha.get(float(temperature))
+        except (TypeError, ValueError):
+            converted = None
+        if converted is None:
+            converted = convert_temp(
+                temperature, self._data_unit, self._ha_unit, self._ha_step
+            )
+        return converted
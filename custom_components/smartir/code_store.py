@@ -0,0 +1,73 @@
+import sys
+import threading
+
+
+class CodeStore:
+    """Process wide store of interned IR code strings.
+
+    Every distinct code is kept only once and commands trees loaded through
+    the store point to the shared string objects. Codes are reference counted
+    per occurrence in the acquired trees and dropped from the store when the
+    last tree using them is released.
+    """
+
+    def __init__(self):
+        self._codes = {}
+        self._lock = threading.Lock()
+        self._references = 0
+        self._bytes = 0
+        self._unique_bytes = 0
+
+    def acquire(self, tree):
+        """Return a copy of a commands tree pointing to the interned codes."""
+        with self._lock:
+            return self._intern(tree)
+
+    def release(self, tree):
+        """Release all codes of a tree returned by acquire."""
+        with self._lock:
+            self._release(tree)
+
+    def _intern(self, node):
+        if isinstance(node, dict):
+            return {key: self._intern(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [self._intern(value) for value in node]
+        if not isinstance(node, str):
+            return node
+
+        size = sys.getsizeof(node)
+        self._references += 1
+        self._bytes += size
+        entry = self._codes.get(node)
+        if entry is None:
+            self._codes[node] = entry = [node, 0]
+            self._unique_bytes += size
+        entry[1] += 1
+        return entry[0]
+
+    def _release(self, node):
+        if isinstance(node, dict):
+            for value in node.values():
+                self._release(value)
+        elif isinstance(node, list):
+            for value in node:
+                self._release(value)
+        elif isinstance(node, str) and (entry := self._codes.get(node)):
+            size = sys.getsizeof(node)
+            self._references -= 1
+            self._bytes -= size
+            entry[1] -= 1
+            if not entry[1]:
+                del self._codes[node]
+                self._unique_bytes -= size
+
+    def statistics(self) -> dict:
+        """Return number of interned codes, their references and bytes saved."""
+        with self._lock:
+            return {
+                "codes": len(self._codes),
+                "references": self._references,
+                "bytes": self._unique_bytes,
+                "bytes_saved": self._bytes - self._unique_bytes,
+            }
@@ -0,0 +1,137 @@
+from collections.abc import Mapping
+from itertools import product
+import logging
+
+from .smartir_helpers import ClosestMatch
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ClimateCommandIndex:
+    """Flat index of climate commands keyed by the requested modes.
+
+    The index is built out of the event loop: the commands tree is walked with
+    the '-' wildcard and declared modes fallback once for every combination
+    of the operation, preset, fan and swing modes, and the command of every
+    device temperature of the entity is stored under its own key. Resolving
+    a command is a single dictionary hit. Temperature keys of every modes
+    combination are kept sorted, so any other temperature is found by
+    bisection. The index has to be built again when the commands are
+    reloaded.
+    """
+
+    def __init__(
+        self, commands, hvac_modes, preset_modes, fan_modes, swing_modes, temperatures
+    ):
+        self._commands = commands
+        self._hvac_modes = list(hvac_modes)
+        self._levels = [
+            (index, name, modes)
+            for index, (name, modes) in enumerate(
+                (("preset", preset_modes), ("fan", fan_modes), ("swing", swing_modes))
+            )
+            if modes
+        ]
+        self._level_modes = [
+            preset_modes or [None],
+            fan_modes or [None],
+            swing_modes or [None],
+        ]
+        self._temperatures = list(temperatures)
+        self._index = {}
+        self._combinations = {}
+        self._errors = {}
+        self._generation = None
+
+    @property
+    def outdated(self) -> bool:
+        """Return if the index wasn't built for the current commands."""
+        return self._generation != getattr(self._commands, "generation", 0)
+
+    def build(self):
+        """Build the index of the current commands, doesn't run in the event loop."""
+        generation = getattr(self._commands, "generation", 0)
+        index = {}
+        combinations = {}
+        errors = {}
+        for hvac_mode in self._hvac_modes:
+            if hvac_mode not in self._commands:
+                continue
+            # subtree of the operation mode is loaded only once
+            commands = self._commands[hvac_mode]
+            for modes in product(*self._level_modes):
+                key = self._combination(hvac_mode, modes)
+                result, error = self._walk(commands, list(modes))
+                if result is None:
+                    errors[key] = error
+                    continue
+                combinations[key] = result
+                for temperature in self._temperatures:
+                    command, _ = self._lookup(*result, temperature)
+                    if command is not None:
+                        index[(hvac_mode, *modes, temperature)] = command
+
+        # reload during the build leaves the index outdated
+        self._index, self._combinations, self._errors = index, combinations, errors
+        self._generation = generation
+
+    def resolve(self, hvac_mode, preset_mode, fan_mode, swing_mode, temperature):
+        """Return command and the modes and device temperature it was found for.
+
+        Returns None if there is no command for the requested modes.
+        """
+        key = (hvac_mode, preset_mode, fan_mode, swing_mode, temperature)
+        if (command := self._index.get(key)) is not None:
+            return command
+
+        combination = self._combination(hvac_mode, key[1:4])
+        if (result := self._combinations.get(combination)) is None:
+            _LOGGER.error(
+                *self._errors.get(
+                    combination,
+                    ("Missing device IR code for '%s' operation mode.", hvac_mode),
+                )
+            )
+            return None
+        command, error = self._lookup(*result, temperature)
+        if command is None:
+            _LOGGER.error(*error)
+        return command
+
+    def _combination(self, hvac_mode, modes):
+        # modes of the levels which are not declared are ignored
+        return (hvac_mode, *(modes[index] for index, _, _ in self._levels))
+
+    def _walk(self, commands, modes):
+        for index, name, declared in self._levels:
+            if not isinstance(commands, Mapping):
+                return None, ("No device IR codes for %s modes are defined.", name)
+            for mode in ["-", modes[index]] + declared:
+                if mode in commands:
+                    modes[index] = mode
+                    commands = commands[mode]
+                    break
+            else:
+                return None, (
+                    "Missing device IR codes for selected '%s' %s mode.",
+                    modes[index],
+                    name,
+                )
+
+        if not isinstance(commands, Mapping):
+            return None, ("No device IR codes for temperatures are defined.",)
+        temperatures = None if "-" in commands else ClosestMatch(commands.keys())
+        return (modes, dict(commands), temperatures), None
+
+    @staticmethod
+    def _lookup(modes, commands, temperatures, temperature):
+        if temperatures is None:
+            temp = "-"
+        elif not (temp := temperatures.value(temperature)):
+            return None, (
+                "Missing device IR codes for selected '%s' temperature.",
+                temperature,
+            )
+        if not isinstance(commands[temp], str):
+            return None, ("No device IR code found.",)
+        return (commands[temp], *modes, temp), None
@@ -0,0 +1,44 @@
+import asyncio
+
+
+class CommandQueue:
+    """Latest-wins queue of entity state changes.
+
+    Changes requested while the previous changes are being sent are merged
+    into a single pending batch, later values replacing the earlier ones,
+    and the batch is sent once. Every request returns after the batch with
+    its changes was sent. Used only in the event loop.
+    """
+
+    def __init__(self, send):
+        self._send = send
+        self._lock = asyncio.Lock()
+        self._pending = None
+        self._coalesced = 0
+        self._sent = 0
+
+    async def async_submit(self, changes: dict):
+        """Request changes, merging them with the pending ones."""
+        if self._pending is None:
+            self._pending = {}
+        else:
+            self._coalesced += 1
+        batch = self._pending
+        batch.update(changes)
+
+        async with self._lock:
+            # the first request of the batch getting the lock sends it
+            if self._pending is batch:
+                self._pending = None
+                self._sent += 1
+                await self._send(batch)
+
+    @property
+    def coalesced(self) -> int:
+        """Number of requests merged into the pending ones."""
+        return self._coalesced
+
+    @property
+    def sent(self) -> int:
+        """Number of sent batches of requests."""
+        return self._sent
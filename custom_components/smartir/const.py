@@ -0,0 +1,10 @@
+DOMAIN = "smartir"
+
+DATA_DEVICE_CACHE = "device_cache"
+DATA_VALIDATION_CACHE = "validation_cache"
+DATA_CODE_STORE = "code_store"
+DATA_DEVICE_INDEX = "device_index"
+DATA_ENTITIES = "entities"
+DATA_TRANSCODE_CACHE = "transcode_cache"
+DATA_TRANSMITTER_SCHEDULER = "transmitter_scheduler"
+DATA_LOOKIN_CLIENTS = "lookin_clients"
@@ -1,9 +1,10 @@
 from abc import ABC, abstractmethod
+import asyncio
 from base64 import b64encode
+from collections import OrderedDict
 import ipaddress
 import binascii
-import requests
-import struct
+import logging
 import json
 
 from .controller_const import (
@@ -14,6 +15,7 @@ from .controller_const import (
     ESPHOME_CONTROLLER,
     ZHA_CONTROLLER,
     UFOR11_CONTROLLER,
+    ENC_BASE64,
     ENC_HEX,
     ENC_PRONTO,
     BROADLINK_COMMANDS_ENCODING,
@@ -25,8 +27,22 @@ from .controller_const import (
     UFOR11_COMMANDS_ENCODING,
     CONTROLLER_CONF,
 )
+from .const import (
+    DOMAIN,
+    DATA_LOOKIN_CLIENTS,
+    DATA_TRANSCODE_CACHE,
+    DATA_TRANSMITTER_SCHEDULER,
+)
+from .ir_codec import pronto_to_pulses, pulses_to_broadlink
+from .lookin_client import LookinClient
+from .transmitter import TransmitterScheduler
 
 from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+_LOGGER = logging.getLogger(__name__)
+
+TRANSCODE_CACHE_SIZE = 256
 
 
 def get_controller(hass, controller, encoding, controller_data):
@@ -53,6 +69,104 @@ def get_controller(hass, controller, encoding, controller_data):
     return controllers[controller](hass, controller, encoding, controller_data)
 
 
+def get_pretranscoder(controller, encoding, controller_data):
+    """Return encoding and function transcoding device commands in advance.
+
+    Returns None unless the controller transcodes the commands and
+    transcoding all commands when the device is loaded is enabled.
+    """
+    if (
+        controller != BROADLINK_CONTROLLER
+        or encoding == ENC_BASE64
+        or not controller_data.get(CONTROLLER_CONF["PRETRANSCODE"])
+    ):
+        return None
+    return ENC_BASE64, lambda command: broadlink_to_base64(encoding, command)
+
+
+def broadlink_to_base64(encoding, command):
+    """Return a Hex or Pronto command transcoded into Broadlink Base64 encoding."""
+    if encoding == ENC_HEX:
+        try:
+            command = binascii.unhexlify(command)
+            command = b64encode(command).decode("utf-8")
+        except:
+            raise Exception("Error while converting " "Hex to Base64 encoding")
+
+    if encoding == ENC_PRONTO:
+        try:
+            command = command.replace(" ", "")
+            command = bytearray.fromhex(command)
+            command = Helper.pronto2lirc(command)
+            command = Helper.lirc2broadlink(command)
+            command = b64encode(command).decode("utf-8")
+        except:
+            raise Exception("Error while converting " "Pronto to Base64 encoding")
+
+    return command
+
+
+def get_transcode_cache(hass):
+    """Return the cache of transcoded commands shared by all controllers."""
+    data = hass.data.setdefault(DOMAIN, {})
+    if DATA_TRANSCODE_CACHE not in data:
+        data[DATA_TRANSCODE_CACHE] = TranscodeCache()
+    return data[DATA_TRANSCODE_CACHE]
+
+
+def get_transmitter_scheduler(hass):
+    """Return the scheduler of transmitters shared by all controllers."""
+    data = hass.data.setdefault(DOMAIN, {})
+    if DATA_TRANSMITTER_SCHEDULER not in data:
+        data[DATA_TRANSMITTER_SCHEDULER] = TransmitterScheduler()
+    return data[DATA_TRANSMITTER_SCHEDULER]
+
+
+def get_lookin_client(hass, host):
+    """Return the HTTP client of the LOOKin remote shared by all controllers."""
+    data = hass.data.setdefault(DOMAIN, {})
+    clients = data.setdefault(DATA_LOOKIN_CLIENTS, {})
+    if host not in clients:
+        clients[host] = LookinClient(async_get_clientsession(hass), host)
+    return clients[host]
+
+
+class TranscodeCache:
+    """Bounded cache of commands transcoded for the controllers.
+
+    Only the least recently used commands are kept. Used only in the event
+    loop.
+    """
+
+    def __init__(self, size=TRANSCODE_CACHE_SIZE):
+        self._size = size
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key, transcode, command):
+        """Return transcoded command, transcoding it on cache miss."""
+        if (value := self._entries.get(key)) is not None:
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return value
+
+        self._misses += 1
+        value = self._entries[key] = transcode(command)
+        if len(self._entries) > self._size:
+            self._entries.popitem(last=False)
+        return value
+
+    def statistics(self) -> dict:
+        """Return number of cached commands, cache hits and misses."""
+        return {
+            "size": len(self._entries),
+            "max_size": self._size,
+            "hits": self._hits,
+            "misses": self._misses,
+        }
+
+
 def get_controller_schema(vol, cv):
     """Return a controller schema."""
     schema = vol.Any(
@@ -64,6 +178,8 @@ def get_controller_schema(vol, cv):
                 vol.Required(CONTROLLER_CONF["REMOTE_ENTITY"]): cv.entity_id,
                 vol.Optional(CONTROLLER_CONF["NUM_REPEATS"]): cv.positive_int,
                 vol.Optional(CONTROLLER_CONF["DELAY_SECS"]): cv.positive_float,
+                vol.Optional(CONTROLLER_CONF["PRETRANSCODE"]): cv.boolean,
+                vol.Optional(CONTROLLER_CONF["TRANSMITTER_GAP"]): cv.positive_float,
             }
         ),
         vol.Schema(
@@ -72,6 +188,7 @@ def get_controller_schema(vol, cv):
                     XIAOMI_CONTROLLER
                 ),
                 vol.Required(CONTROLLER_CONF["REMOTE_ENTITY"]): cv.entity_id,
+                vol.Optional(CONTROLLER_CONF["TRANSMITTER_GAP"]): cv.positive_float,
             }
         ),
         vol.Schema(
@@ -80,6 +197,7 @@ def get_controller_schema(vol, cv):
                     MQTT_CONTROLLER
                 ),
                 vol.Required(CONTROLLER_CONF["MQTT_TOPIC"]): cv.string,
+                vol.Optional(CONTROLLER_CONF["TRANSMITTER_GAP"]): cv.positive_float,
             }
         ),
         vol.Schema(
@@ -88,6 +206,7 @@ def get_controller_schema(vol, cv):
                     UFOR11_CONTROLLER
                 ),
                 vol.Required(CONTROLLER_CONF["MQTT_TOPIC"]): cv.string,
+                vol.Optional(CONTROLLER_CONF["TRANSMITTER_GAP"]): cv.positive_float,
             }
         ),
         vol.Schema(
@@ -98,6 +217,7 @@ def get_controller_schema(vol, cv):
                 vol.Required(CONTROLLER_CONF["REMOTE_HOST"]): vol.All(
                     ipaddress.ip_address, cv.string
                 ),
+                vol.Optional(CONTROLLER_CONF["TRANSMITTER_GAP"]): cv.positive_float,
             }
         ),
         vol.Schema(
@@ -106,6 +226,7 @@ def get_controller_schema(vol, cv):
                     ESPHOME_CONTROLLER
                 ),
                 vol.Required(CONTROLLER_CONF["ESPHOME_SERVICE"]): cv.string,
+                vol.Optional(CONTROLLER_CONF["TRANSMITTER_GAP"]): cv.positive_float,
             }
         ),
         vol.Schema(
@@ -119,6 +240,7 @@ def get_controller_schema(vol, cv):
                 vol.Required(CONTROLLER_CONF["ZHA_CLUSTER_TYPE"]): cv.string,
                 vol.Required(CONTROLLER_CONF["ZHA_COMMAND"]): cv.positive_int,
                 vol.Required(CONTROLLER_CONF["ZHA_COMMAND_TYPE"]): cv.string,
+                vol.Optional(CONTROLLER_CONF["TRANSMITTER_GAP"]): cv.positive_float,
             }
         ),
     )
@@ -129,11 +251,26 @@ def get_controller_schema(vol, cv):
 class AbstractController(ABC):
     """Representation of a controller."""
 
+    # controller data identifying the transmitter
+    _transmitter_conf = CONTROLLER_CONF["REMOTE_ENTITY"]
+
     def __init__(self, hass, controller, encoding, controller_data):
         self.hass = hass
         self._controller = controller
         self._encoding = encoding
         self._controller_data = controller_data
+        self._transmitter = get_transmitter_scheduler(hass).get(
+            self._transmitter_name()
+        )
+        self._transmitter_gap = controller_data.get(
+            CONTROLLER_CONF["TRANSMITTER_GAP"], 0
+        )
+
+    def _transmitter_name(self):
+        return "%s %s" % (
+            self._controller,
+            self._controller_data[self._transmitter_conf],
+        )
 
     @abstractmethod
     def check_encoding(self, encoding):
@@ -145,10 +282,46 @@ class AbstractController(ABC):
         """Send a command."""
         pass
 
+    async def send_sequence(self, commands, delay):
+        """Send commands separated by the delay.
+
+        Commands of all controllers using the same transmitter are sent one
+        sequence at a time. Services are called blocking, so it returns right
+        after the remote transmitted the last command (also when the remote
+        waits between the commands itself) and the next sequence on the
+        transmitter isn't sent before the delay passes.
+        """
+        await self._transmitter.async_emit(
+            self,
+            lambda: self._send_sequence(commands, delay),
+            max(self._transmitter_gap, delay),
+        )
+
+    async def send_repeated(self, command, count, delay):
+        """Send a command count times separated by the delay."""
+        await self._transmitter.async_emit(
+            self,
+            lambda: self._send_repeated(command, count, delay),
+            max(self._transmitter_gap, delay),
+        )
+
+    async def _send_sequence(self, commands, delay):
+        for index, command in enumerate(commands):
+            if index:
+                await asyncio.sleep(delay)
+            await self.send(command)
+
+    async def _send_repeated(self, command, count, delay):
+        await self._send_sequence([command] * count, delay)
+
 
 class BroadlinkController(AbstractController):
     """Controls a Broadlink device."""
 
+    def __init__(self, hass, controller, encoding, controller_data):
+        super().__init__(hass, controller, encoding, controller_data)
+        self._transcode_cache = get_transcode_cache(hass)
+
     def check_encoding(self, encoding):
         """Check if the encoding is supported by the controller."""
         if encoding not in BROADLINK_COMMANDS_ENCODING:
@@ -156,49 +329,72 @@ class BroadlinkController(AbstractController):
                 "The encoding is not supported " "by the Broadlink controller."
             )
 
+    def _transcode(self, command):
+        return "b64:" + broadlink_to_base64(self._encoding, command)
+
+    def _encode(self, command):
+        if self._encoding == ENC_BASE64:
+            return "b64:" + command
+        return self._transcode_cache.get(
+            (self._encoding, command), self._transcode, command
+        )
+
     async def send(self, command):
         """Send a command."""
-        commands = []
-
         if not isinstance(command, list):
             command = [command]
 
-        for _command in command:
-            if self._encoding == ENC_HEX:
-                try:
-                    _command = binascii.unhexlify(_command)
-                    _command = b64encode(_command).decode("utf-8")
-                except:
-                    raise Exception("Error while converting " "Hex to Base64 encoding")
-
-            if self._encoding == ENC_PRONTO:
-                try:
-                    _command = _command.replace(" ", "")
-                    _command = bytearray.fromhex(_command)
-                    _command = Helper.pronto2lirc(_command)
-                    _command = Helper.lirc2broadlink(_command)
-                    _command = b64encode(_command).decode("utf-8")
-                except:
-                    raise Exception(
-                        "Error while converting " "Pronto to Base64 encoding"
-                    )
-
-            commands.append("b64:" + _command)
+        await self._send_command(
+            [self._encode(_command) for _command in command],
+            self._controller_data.get(CONTROLLER_CONF["DELAY_SECS"]),
+        )
+
+    def _batched(self, command):
+        # configured repeats and delay apply to every single command, which
+        # a service call sending all the commands can't keep
+        return (
+            not isinstance(command, list)
+            and CONTROLLER_CONF["NUM_REPEATS"] not in self._controller_data
+            and CONTROLLER_CONF["DELAY_SECS"] not in self._controller_data
+        )
+
+    async def _send_sequence(self, commands, delay):
+        # single service call, the remote waits between the commands
+        if not commands:
+            return
+        if not all(self._batched(command) for command in commands):
+            await super()._send_sequence(commands, delay)
+            return
+
+        await self._send_command([self._encode(command) for command in commands], delay)
+
+    async def _send_repeated(self, command, count, delay):
+        # single service call, the remote repeats the command
+        if count < 1:
+            return
+        if not self._batched(command):
+            await super()._send_repeated(command, count, delay)
+            return
 
+        await self._send_command([self._encode(command)], delay, count)
+
+    async def _send_command(self, commands, delay, repeats=1):
         service_data = {
             ATTR_ENTITY_ID: self._controller_data[CONTROLLER_CONF["REMOTE_ENTITY"]],
             "command": commands,
         }
-        if CONTROLLER_CONF["DELAY_SECS"] in self._controller_data:
-            service_data["delay_secs"] = self._controller_data[
-                CONTROLLER_CONF["DELAY_SECS"]
-            ]
+        if delay is not None:
+            service_data["delay_secs"] = delay
         if CONTROLLER_CONF["NUM_REPEATS"] in self._controller_data:
             service_data["num_repeats"] = self._controller_data[
                 CONTROLLER_CONF["NUM_REPEATS"]
             ]
+        elif repeats > 1:
+            service_data["num_repeats"] = repeats
 
-        await self.hass.services.async_call("remote", "send_command", service_data)
+        await self.hass.services.async_call(
+            "remote", "send_command", service_data, blocking=True
+        )
 
 
 class XiaomiController(AbstractController):
@@ -218,12 +414,45 @@ class XiaomiController(AbstractController):
             "command": self._encoding.lower() + ":" + command,
         }
 
-        await self.hass.services.async_call("remote", "send_command", service_data)
+        await self.hass.services.async_call(
+            "remote", "send_command", service_data, blocking=True
+        )
+
+    async def _send_sequence(self, commands, delay):
+        # single service call, the remote waits between the commands
+        if not commands:
+            return
+        service_data = {
+            ATTR_ENTITY_ID: self._controller_data[CONTROLLER_CONF["REMOTE_ENTITY"]],
+            "command": [self._encoding.lower() + ":" + command for command in commands],
+            "delay_secs": delay,
+        }
+
+        await self.hass.services.async_call(
+            "remote", "send_command", service_data, blocking=True
+        )
+
+    async def _send_repeated(self, command, count, delay):
+        # single service call, the remote repeats the command
+        if count < 1:
+            return
+        service_data = {
+            ATTR_ENTITY_ID: self._controller_data[CONTROLLER_CONF["REMOTE_ENTITY"]],
+            "command": self._encoding.lower() + ":" + command,
+            "num_repeats": count,
+            "delay_secs": delay,
+        }
+
+        await self.hass.services.async_call(
+            "remote", "send_command", service_data, blocking=True
+        )
 
 
 class MQTTController(AbstractController):
     """Controls a MQTT device."""
 
+    _transmitter_conf = CONTROLLER_CONF["MQTT_TOPIC"]
+
     def check_encoding(self, encoding):
         """Check if the encoding is supported by the controller."""
         if encoding not in MQTT_COMMANDS_ENCODING:
@@ -236,12 +465,16 @@ class MQTTController(AbstractController):
             "payload": command,
         }
 
-        await self.hass.services.async_call("mqtt", "publish", service_data)
+        await self.hass.services.async_call(
+            "mqtt", "publish", service_data, blocking=True
+        )
 
 
 class LookinController(AbstractController):
     """Controls a Lookin device."""
 
+    _transmitter_conf = CONTROLLER_CONF["REMOTE_HOST"]
+
     def check_encoding(self, encoding):
         """Check if the encoding is supported by the controller."""
         if encoding not in LOOKIN_COMMANDS_ENCODING:
@@ -249,23 +482,23 @@ class LookinController(AbstractController):
                 "The encoding is not supported " "by the LOOKin controller."
             )
 
+    def __init__(self, hass, controller, encoding, controller_data):
+        super().__init__(hass, controller, encoding, controller_data)
+        self._client = get_lookin_client(
+            hass, controller_data[CONTROLLER_CONF["REMOTE_HOST"]]
+        )
+
     async def send(self, command):
         """Send a command."""
         encoding = self._encoding.lower().replace("pronto", "prontohex")
-        url = (
-            "http://"
-            + self._controller_data[CONTROLLER_CONF["REMOTE_HOST"]]
-            + "/commands/ir/"
-            + encoding
-            + "/"
-            + command
-        )
-        await self.hass.async_add_executor_job(requests.get, url)
+        await self._client.async_get("/commands/ir/" + encoding + "/" + command)
 
 
 class ESPHomeController(AbstractController):
     """Controls a ESPHome device."""
 
+    _transmitter_conf = CONTROLLER_CONF["ESPHOME_SERVICE"]
+
     def check_encoding(self, encoding):
         """Check if the encoding is supported by the controller."""
         if encoding not in ESPHOME_COMMANDS_ENCODING:
@@ -281,12 +514,20 @@ class ESPHomeController(AbstractController):
             "esphome",
             self._controller_data[CONTROLLER_CONF["ESPHOME_SERVICE"]],
             service_data,
+            blocking=True,
         )
 
 
 class ZHAController(AbstractController):
     """Controls a ZHA device."""
 
+    def _transmitter_name(self):
+        return "%s %s %s" % (
+            self._controller,
+            self._controller_data[CONTROLLER_CONF["ZHA_IEEE"]],
+            self._controller_data[CONTROLLER_CONF["ZHA_ENDPOINT_ID"]],
+        )
+
     def check_encoding(self, encoding):
         """Check if the encoding is supported by the controller."""
         if encoding not in ZHA_COMMANDS_ENCODING:
@@ -306,7 +547,7 @@ class ZHAController(AbstractController):
             "params": {"code": command},
         }
         await self.hass.services.async_call(
-            "zha", "issue_zigbee_cluster_command", service_data
+            "zha", "issue_zigbee_cluster_command", service_data, blocking=True
         )
 
 
@@ -325,7 +566,9 @@ class UFOR11Controller(MQTTController):
             "payload": json.dumps({"ir_code_to_send": command}),
         }
 
-        await self.hass.services.async_call("mqtt", "publish", service_data)
+        await self.hass.services.async_call(
+            "mqtt", "publish", service_data, blocking=True
+        )
 
 
 class Helper:
@@ -333,39 +576,8 @@ class Helper:
 
     @staticmethod
     def pronto2lirc(pronto):
-        codes = [
-            int(binascii.hexlify(pronto[i : i + 2]), 16)
-            for i in range(0, len(pronto), 2)
-        ]
-
-        if codes[0]:
-            raise ValueError("Pronto code should start with 0000")
-        if len(codes) != 4 + 2 * (codes[2] + codes[3]):
-            raise ValueError("Number of pulse widths does not match the preamble")
-
-        frequency = 1 / (codes[1] * 0.241246)
-        return [int(round(code / frequency)) for code in codes[4:]]
+        return pronto_to_pulses(pronto)
 
     @staticmethod
     def lirc2broadlink(pulses):
-        array = bytearray()
-
-        for pulse in pulses:
-            pulse = int(pulse * 269 / 8192)
-
-            if pulse < 256:
-                array += bytearray(struct.pack(">B", pulse))
-            else:
-                array += bytearray([0x00])
-                array += bytearray(struct.pack(">H", pulse))
-
-        packet = bytearray([0x26, 0x00])
-        packet += bytearray(struct.pack("<H", len(array)))
-        packet += array
-        packet += bytearray([0x0D, 0x05])
-
-        # Add 0s to make ultimate packet size a multiple of 16 for 128-bit AES encryption.
-        remainder = (len(packet) + 4) % 16
-        if remainder:
-            packet += bytearray(16 - remainder)
-        return packet
+        return pulses_to_broadlink(pulses)
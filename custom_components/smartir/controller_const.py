@@ -34,6 +34,8 @@ CONTROLLER_CONF = {
     "REMOTE_ENTITY": "remote_entity",
     "NUM_REPEATS": "num_repeats",
     "DELAY_SECS": "delay_secs",
+    "PRETRANSCODE": "pretranscode",
+    "TRANSMITTER_GAP": "transmitter_gap",
     "MQTT_TOPIC": "mqtt_topic",
     "REMOTE_HOST": "remote_host",
     "ESPHOME_SERVICE": "esphome_service",
@@ -0,0 +1,227 @@
+"""Compiled binary bundles of the device data files.
+
+A bundle keeps the device metadata as JSON and the commands tree as a set of
+offset tables, so single IR codes can be read from a memory mapped bundle
+without parsing or allocating the rest of the commands tree.
+
+Bundle layout (all integers are little endian):
+
+    header      magic, version, metadata offset and length, root node
+                offset, source file size and source file digest
+    metadata    JSON of all device data attributes except 'commands'
+    strings     pool of deduplicated keys and values encoded as UTF-8
+    nodes       commands tree nodes, each one a 32 bit entry count followed
+                by fixed size entries: key offset and length, value type,
+                value offset and length
+"""
+
+from collections.abc import Mapping
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+BUNDLE_EXTENSION = ".bin"
+BUNDLE_MAGIC = b"SIRB"
+BUNDLE_VERSION = 1
+
+HEADER = struct.Struct("<4sHHIIIQ20s")
+NODE = struct.Struct("<I")
+ENTRY = struct.Struct("<IHBxII")
+
+TYPE_STRING = 0
+TYPE_NODE = 1
+TYPE_JSON = 2
+
+
+def source_digest(file_path: str) -> bytes:
+    """Return the digest of a device JSON file stored in its bundle."""
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as file:
+        while chunk := file.read(65536):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def compile_bundle(device_data: dict, source_size=0, digest=bytes(20)) -> bytes:
+    """Compile device data into the bundle binary format."""
+    if not isinstance(device_data.get("commands"), dict):
+        raise ValueError("Device data without 'commands' can't be compiled.")
+
+    metadata = json.dumps(
+        {key: value for key, value in device_data.items() if key != "commands"}
+    ).encode("utf-8")
+    meta_offset = HEADER.size
+    pool_offset = meta_offset + len(metadata)
+
+    pool = bytearray()
+    pooled = {}
+
+    def pool_add(data):
+        if data not in pooled:
+            pooled[data] = (pool_offset + len(pool), len(data))
+            pool.extend(data)
+        return pooled[data]
+
+    # strings pool has to be complete before any node offsets are known
+    nodes = []
+
+    def collect(commands):
+        entries = []
+        for key, value in commands.items():
+            key_offset, key_length = pool_add(key.encode("utf-8"))
+            if isinstance(value, dict):
+                entries.append((key_offset, key_length, TYPE_NODE, collect(value)))
+            elif isinstance(value, str):
+                entries.append(
+                    (
+                        key_offset,
+                        key_length,
+                        TYPE_STRING,
+                        pool_add(value.encode("utf-8")),
+                    )
+                )
+            else:
+                entries.append(
+                    (
+                        key_offset,
+                        key_length,
+                        TYPE_JSON,
+                        pool_add(json.dumps(value).encode("utf-8")),
+                    )
+                )
+        nodes.append(entries)
+        return len(nodes) - 1
+
+    root = collect(device_data["commands"])
+
+    # children are always collected before their parents
+    nodes_data = bytearray()
+    node_offsets = []
+    nodes_offset = pool_offset + len(pool)
+    for entries in nodes:
+        node_offsets.append(nodes_offset + len(nodes_data))
+        nodes_data += NODE.pack(len(entries))
+        for key_offset, key_length, value_type, value in entries:
+            if value_type == TYPE_NODE:
+                value = (node_offsets[value], 0)
+            nodes_data += ENTRY.pack(key_offset, key_length, value_type, *value)
+
+    return (
+        HEADER.pack(
+            BUNDLE_MAGIC,
+            BUNDLE_VERSION,
+            0,
+            meta_offset,
+            len(metadata),
+            node_offsets[root],
+            source_size,
+            digest,
+        )
+        + metadata
+        + pool
+        + nodes_data
+    )
+
+
+def compile_bundle_file(file_path: str) -> str:
+    """Compile a device JSON file into a bundle stored next to it."""
+    with open(file_path, "r") as file:
+        device_data = json.load(file)
+
+    bundle_path = os.path.splitext(file_path)[0] + BUNDLE_EXTENSION
+    data = compile_bundle(
+        device_data, os.path.getsize(file_path), source_digest(file_path)
+    )
+
+    # replace atomically, so already mapped bundles stay valid
+    with open(bundle_path + ".tmp", "wb") as file:
+        file.write(data)
+    os.replace(bundle_path + ".tmp", bundle_path)
+    return bundle_path
+
+
+class BundleNode(Mapping):
+    """Read-only mapping of a commands tree node in a bundle."""
+
+    __slots__ = ("_buffer", "_offset", "_count", "_index")
+
+    def __init__(self, buffer, offset):
+        self._buffer = buffer
+        self._offset = offset
+        self._index = None
+        (self._count,) = NODE.unpack_from(buffer, offset)
+
+    def _entries(self):
+        start = self._offset + NODE.size
+        return ENTRY.iter_unpack(
+            memoryview(self._buffer)[start : start + self._count * ENTRY.size]
+        )
+
+    def _value(self, value_type, value_offset, value_length):
+        if value_type == TYPE_NODE:
+            return BundleNode(self._buffer, value_offset)
+        data = self._buffer[value_offset : value_offset + value_length]
+        if value_type == TYPE_STRING:
+            return data.decode("utf-8")
+        return json.loads(data)
+
+    def __getitem__(self, key):
+        if self._index is None:
+            # keys lookup table is built on the first access of the node
+            buffer = self._buffer
+            self._index = {
+                buffer[key_offset : key_offset + key_length].decode("utf-8"): value
+                for key_offset, key_length, *value in self._entries()
+            }
+        return self._value(*self._index[key])
+
+    def __iter__(self):
+        if self._index is not None:
+            yield from self._index
+            return
+        buffer = self._buffer
+        for key_offset, key_length, *_ in self._entries():
+            yield buffer[key_offset : key_offset + key_length].decode("utf-8")
+
+    def __len__(self):
+        return self._count
+
+    def __repr__(self):
+        return f"<BundleNode {self._offset} ({self._count} entries)>"
+
+
+def open_bundle(bundle_path: str, source_path: str = None, digest: bytes = None):
+    """Memory map a bundle and return its device data.
+
+    If the source JSON file path is provided, None is returned when the bundle
+    was not compiled from the current content of that file. The digest of the
+    file is computed unless already known by the caller.
+    """
+    with open(bundle_path, "rb") as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    (
+        magic,
+        version,
+        _,
+        meta_offset,
+        meta_length,
+        root_offset,
+        source_size,
+        bundle_digest,
+    ) = HEADER.unpack_from(buffer, 0)
+    if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+        raise ValueError("Unsupported device data bundle format.")
+
+    if source_path is not None and (
+        os.path.getsize(source_path) != source_size
+        or (digest or source_digest(source_path)) != bundle_digest
+    ):
+        buffer.close()
+        return None
+
+    device_data = json.loads(buffer[meta_offset : meta_offset + meta_length])
+    device_data["commands"] = BundleNode(buffer, root_offset)
+    return device_data
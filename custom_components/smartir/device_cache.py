@@ -0,0 +1,431 @@
+import asyncio
+import logging
+import os
+
+from homeassistant.core import callback
+from homeassistant.helpers.storage import Store
+from homeassistant.loader import async_get_integration
+
+from .const import (
+    DOMAIN,
+    DATA_DEVICE_CACHE,
+    DATA_VALIDATION_CACHE,
+    DATA_CODE_STORE,
+    DATA_DEVICE_INDEX,
+)
+from .code_store import CodeStore
+from .device_bundle import source_digest
+from .device_data import DeviceData
+from .device_index import DeviceIndex, index_entry
+from .lazy_commands import LazyCommands
+from .transcoder import get_transcoder, transcode_commands
+
+_LOGGER = logging.getLogger(__name__)
+
+VALIDATION_STORAGE_VERSION = 1
+VALIDATION_STORAGE_KEY = "smartir.validation_cache"
+VALIDATION_SAVE_DELAY = 10
+
+DEVICE_FILES_DIRS = ["custom_codes", "codes"]
+
+
+def get_device_cache(hass):
+    """Return the device data cache shared by all entities."""
+    data = hass.data.setdefault(DOMAIN, {})
+    if DATA_DEVICE_CACHE not in data:
+        data[DATA_DEVICE_CACHE] = DeviceDataCache(
+            get_validation_cache(hass), get_code_store(hass), get_device_index(hass)
+        )
+    return data[DATA_DEVICE_CACHE]
+
+
+def get_code_store(hass):
+    """Return the store of IR codes interned across all device files."""
+    data = hass.data.setdefault(DOMAIN, {})
+    if DATA_CODE_STORE not in data:
+        data[DATA_CODE_STORE] = CodeStore()
+    return data[DATA_CODE_STORE]
+
+
+def get_validation_cache(hass):
+    """Return the persistent validation results cache."""
+    data = hass.data.setdefault(DOMAIN, {})
+    if DATA_VALIDATION_CACHE not in data:
+        data[DATA_VALIDATION_CACHE] = ValidationCache(hass)
+    return data[DATA_VALIDATION_CACHE]
+
+
+def get_device_index(hass):
+    """Return the index of the device files directories."""
+    data = hass.data.setdefault(DOMAIN, {})
+    if DATA_DEVICE_INDEX not in data:
+        base_path = os.path.dirname(os.path.abspath(__file__))
+        data[DATA_DEVICE_INDEX] = DeviceIndex(
+            [os.path.join(base_path, directory) for directory in DEVICE_FILES_DIRS]
+        )
+    return data[DATA_DEVICE_INDEX]
+
+
+class DeviceDataCache:
+    """Process wide cache of parsed and validated device data files.
+
+    Entries are keyed by the device class and device code and are reused only
+    while the file path, modification time and size stay the same. Cached
+    device data is shared by all entities using the same device code, so it
+    has to be treated as read-only. Codes of all loaded commands are interned
+    in the code store. Device data converted for other controllers (or
+    transcoded in advance for the same one) are cached per device file and
+    controller, so they are converted once and shared as well.
+    """
+
+    def __init__(self, validation_cache, code_store, device_index):
+        self._validation_cache = validation_cache
+        self._code_store = code_store
+        self._device_index = device_index
+        self._entries = {}
+        self._transcoded = {}
+        self._locks = {}
+
+    async def async_get(self, hass, device_class, device_code, file_path, check_data):
+        """Return the cached device data, loading and validating it if needed."""
+        key = (device_class, device_code)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            stat = await hass.async_add_executor_job(os.stat, file_path)
+            fingerprint = (file_path, stat.st_mtime_ns, stat.st_size)
+
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                _LOGGER.debug(
+                    "Using cached %s device data for device code '%s'.",
+                    device_class,
+                    device_code,
+                )
+                return entry[1]
+
+            # file reading and validation are single job out of the event loop
+            inputs = dict(check_data)
+            await self._validation_cache.async_load()
+            device_data, valid, result = await hass.async_add_executor_job(
+                self._load_file, file_path, device_class, check_data
+            )
+            if result is not None:
+                self._validation_cache.async_store(file_path, result)
+            if not valid:
+                self._entries.pop(key, None)
+                return None
+
+            self._entries[key] = (fingerprint, device_data, inputs)
+            return device_data
+
+    async def async_transcode(
+        self, hass, device_class, device_code, controller, transcoder=None
+    ):
+        """Return the cached device data converted for another controller.
+
+        Device data has to be loaded by async_get first. Commands are converted
+        by the transcoder, if provided, otherwise by the transcoder between the
+        controllers. Returns None if the commands can't be converted.
+        """
+        key = (device_class, device_code)
+        async with self._locks[key]:
+            if (entry := self._entries.get(key)) is None:
+                return None
+            fingerprint, device_data, _ = entry
+
+            transcoded = self._transcoded.get((key, controller))
+            if transcoded is not None and transcoded[0] == fingerprint:
+                _LOGGER.debug(
+                    "Using cached %s device data for device code '%s' converted "
+                    "for %s controller.",
+                    device_class,
+                    device_code,
+                    controller,
+                )
+                return transcoded[1]
+
+            transcoded_data = await self._async_transcode(
+                hass, fingerprint[0], device_data, controller, transcoder
+            )
+            if transcoded_data is None:
+                self._transcoded.pop((key, controller), None)
+                return None
+            self._transcoded[(key, controller)] = (
+                fingerprint,
+                transcoded_data,
+                transcoder,
+            )
+            return transcoded_data
+
+    async def _async_transcode(
+        self, hass, file_path, device_data, controller, transcoder
+    ):
+        if transcoder is None:
+            transcoder = get_transcoder(
+                device_data["supportedController"],
+                device_data["commandsEncoding"],
+                controller,
+            )
+        if transcoder is None:
+            _LOGGER.error(
+                "Commands of device JSON file '%s' can't be converted from %s "
+                "%s encoding for %s controller.",
+                file_path,
+                device_data["supportedController"],
+                device_data["commandsEncoding"],
+                controller,
+            )
+            return None
+
+        encoding, transcode = transcoder
+
+        def report(errors):
+            command, error = next(iter(errors.items()))
+            _LOGGER.error(
+                "%d commands of device JSON file '%s' can't be converted for %s "
+                "controller and were dropped, first of them '%s': '%s'.",
+                len(errors),
+                file_path,
+                controller,
+                command,
+                error,
+            )
+
+        try:
+            commands = await hass.async_add_executor_job(
+                transcode_commands,
+                device_data["commands"],
+                transcode,
+                report,
+                self._code_store,
+            )
+        except Exception as e:
+            _LOGGER.error(
+                "Error converting commands of device JSON file '%s' for %s "
+                "controller: '%s'.",
+                file_path,
+                controller,
+                e,
+            )
+            return None
+
+        _LOGGER.debug(
+            "Converted commands of device JSON file '%s' for %s controller.",
+            file_path,
+            controller,
+        )
+        return {
+            **device_data,
+            "supportedController": controller,
+            "commandsEncoding": encoding,
+            "commands": commands,
+        }
+
+    async def async_reload(self, hass):
+        """Reload changed device files, swapping commands of loaded devices.
+
+        Only files which changed since they were loaded are validated again.
+        Commands trees are replaced in place, so entities using them send
+        the new commands without being reloaded.
+        """
+        await self._validation_cache.async_load()
+        reloaded = 0
+        for key in list(self._entries):
+            device_class, device_code = key
+            async with self._locks[key]:
+                if (entry := self._entries.get(key)) is None:
+                    continue
+                fingerprint, device_data, inputs = entry
+                index_entry = await hass.async_add_executor_job(
+                    self._device_index.lookup, device_class, device_code
+                )
+                if index_entry is None:
+                    _LOGGER.warning(
+                        "Device JSON file of %s device code '%s' was removed, "
+                        "keeping loaded device data.",
+                        device_class,
+                        device_code,
+                    )
+                    continue
+
+                file_path = index_entry["path"]
+                stat = await hass.async_add_executor_job(os.stat, file_path)
+                new_fingerprint = (file_path, stat.st_mtime_ns, stat.st_size)
+                if new_fingerprint == fingerprint:
+                    continue
+
+                check_data = dict(inputs)
+                new_data, valid, result = await hass.async_add_executor_job(
+                    self._load_file, file_path, device_class, check_data
+                )
+                if result is not None:
+                    self._validation_cache.async_store(file_path, result)
+                if not valid:
+                    _LOGGER.error(
+                        "Device JSON file '%s' was not reloaded, keeping loaded "
+                        "device data.",
+                        file_path,
+                    )
+                    continue
+
+                commands = device_data["commands"]
+                if not (
+                    isinstance(commands, LazyCommands)
+                    and isinstance(new_data["commands"], LazyCommands)
+                ):
+                    _LOGGER.warning(
+                        "Commands of device JSON file '%s' can't be reloaded, "
+                        "restart is required.",
+                        file_path,
+                    )
+                    continue
+                if commands.preloaded:
+                    await hass.async_add_executor_job(new_data["commands"].preload)
+                commands.replace(new_data["commands"])
+                new_data["commands"] = commands
+
+                if {
+                    attr: value
+                    for attr, value in device_data.items()
+                    if attr != "commands"
+                } != {
+                    attr: value
+                    for attr, value in new_data.items()
+                    if attr != "commands"
+                }:
+                    _LOGGER.warning(
+                        "Device JSON file '%s' attributes changed, only its "
+                        "commands were reloaded. Restart is required to apply "
+                        "the other changes to existing entities.",
+                        file_path,
+                    )
+
+                self._entries[key] = (new_fingerprint, new_data, inputs)
+                await self._async_reload_transcoded(
+                    hass, key, new_fingerprint, new_data
+                )
+                reloaded += 1
+                _LOGGER.info("Reloaded device JSON file '%s'.", file_path)
+
+        _LOGGER.info("Reloaded %d changed device JSON files.", reloaded)
+
+    async def _async_reload_transcoded(self, hass, key, fingerprint, device_data):
+        for transcoded_key in [item for item in self._transcoded if item[0] == key]:
+            _, transcoded_data, transcoder = self._transcoded[transcoded_key]
+            new_data = await self._async_transcode(
+                hass, fingerprint[0], device_data, transcoded_key[1], transcoder
+            )
+            if new_data is None:
+                _LOGGER.error(
+                    "Converted commands of device JSON file '%s' were not "
+                    "reloaded, keeping loaded commands.",
+                    fingerprint[0],
+                )
+                continue
+            if transcoded_data["commands"].preloaded:
+                await hass.async_add_executor_job(new_data["commands"].preload)
+            transcoded_data["commands"].replace(new_data["commands"])
+            new_data["commands"] = transcoded_data["commands"]
+            self._transcoded[transcoded_key] = (fingerprint, new_data, transcoder)
+
+    def _load_file(self, file_path, device_class, check_data):
+        # digest of the file both checks its bundle and keys validation results
+        stat = os.stat(file_path)
+        digest = source_digest(file_path)
+        if (
+            device_data := DeviceData.read_file(file_path, self._code_store, digest)
+        ) is None:
+            return None, False, None
+        self._device_index.update(
+            index_entry(file_path, stat, digest.hex(), device_data)
+        )
+        valid, result = self._validation_cache.check(
+            file_path, digest.hex(), device_data, device_class, check_data
+        )
+        return device_data, valid, result
+
+
+class ValidationCache:
+    """Persistent cache of device data files validation results.
+
+    Results are stored per file together with the file content digest, the
+    integration version and the validation input data, so unchanged files
+    are not validated again after restart.
+    """
+
+    def __init__(self, hass):
+        self._hass = hass
+        self._store = Store(hass, VALIDATION_STORAGE_VERSION, VALIDATION_STORAGE_KEY)
+        self._version = None
+        self._results = None
+        self._lock = asyncio.Lock()
+
+    async def async_load(self):
+        """Load stored validation results."""
+        async with self._lock:
+            if self._results is None:
+                integration = await async_get_integration(self._hass, DOMAIN)
+                self._version = str(integration.version)
+                self._results = await self._store.async_load() or {}
+
+    def check(self, file_path, digest, device_data, device_class, check_data):
+        """Validate device data unless a cached result exists.
+
+        Returns the validation verdict and a new result to be stored, or None
+        if the stored result was used. Doesn't run in the event loop.
+        """
+        file_name = os.path.basename(file_path)
+        result = self._results.get(file_path)
+        if (
+            result is not None
+            and result["digest"] == digest
+            and result["version"] == self._version
+            and result["device_class"] == device_class
+            and result["check_data"] == check_data
+        ):
+            if not result["valid"]:
+                _LOGGER.error(
+                    "Invalid %s device JSON file '%s': cached validation result, "
+                    "call the 'smartir.clear_validation_cache' service to validate "
+                    "it again.",
+                    device_class,
+                    file_name,
+                )
+                return False, None
+            _LOGGER.debug(
+                "Using cached validation result of %s device JSON file '%s'.",
+                device_class,
+                file_name,
+            )
+            check_data.update(result["result"])
+            return True, None
+
+        inputs = dict(check_data)
+        valid = bool(
+            DeviceData.check_file(file_name, device_data, device_class, check_data)
+        )
+        return valid, {
+            "digest": digest,
+            "version": self._version,
+            "device_class": device_class,
+            "check_data": inputs,
+            "valid": valid,
+            "result": {
+                key: value
+                for key, value in check_data.items()
+                if key not in inputs or inputs[key] != value
+            },
+        }
+
+    @callback
+    def async_store(self, file_path, result):
+        """Store a new validation result."""
+        self._results[file_path] = result
+        self._store.async_delay_save(lambda: self._results, VALIDATION_SAVE_DELAY)
+
+    async def async_clear(self):
+        """Remove all cached validation results."""
+        await self.async_load()
+        self._results = {}
+        await self._store.async_save(self._results)
+        _LOGGER.info("Device data files validation cache cleared.")
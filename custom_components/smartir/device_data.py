@@ -1,7 +1,10 @@
+from collections.abc import Mapping
 import logging
-import hashlib
 import json
+import os
 
+from .device_bundle import BUNDLE_EXTENSION, open_bundle
+from .lazy_commands import lazy_bundle_commands, read_json_lazy
 from .smartir_helpers import precision_round
 from .controller_const import CONTROLLER_SUPPORT
 
@@ -25,7 +28,42 @@ class DeviceData:
                 return None
 
     @staticmethod
-    async def check_file(file_name, device_data, device_class, check_data):
+    def read_file(file_path: str, code_store=None, digest=None) -> dict:
+        """Read a device file, preferring its compiled bundle if up to date.
+
+        Only metadata are loaded, commands subtrees are loaded on demand and
+        their codes are interned in the code store, if provided. The digest
+        of the file, if already known, is used to check the bundle.
+        """
+        bundle_path = os.path.splitext(file_path)[0] + BUNDLE_EXTENSION
+        if os.path.exists(bundle_path):
+            try:
+                if device_data := open_bundle(bundle_path, file_path, digest):
+                    device_data["commands"] = lazy_bundle_commands(
+                        device_data["commands"], code_store
+                    )
+                    _LOGGER.debug("Loaded device bundle file '%s'.", bundle_path)
+                    return device_data
+                _LOGGER.debug(
+                    "Device bundle file '%s' is outdated, using JSON file.",
+                    bundle_path,
+                )
+            except Exception as e:
+                _LOGGER.warning(
+                    "Error opening device bundle file '%s': '%s'.", bundle_path, e
+                )
+
+        try:
+            _LOGGER.debug("Loading device JSON file '%s'.", file_path)
+            device_data = read_json_lazy(file_path, code_store)
+            _LOGGER.debug("Loaded device JSON file '%s'.", file_path)
+            return device_data
+        except Exception as e:
+            _LOGGER.error("Error opening device JSON file '%s': '%s'.", file_path, e)
+            return None
+
+    @staticmethod
+    def check_file(file_name, device_data, device_class, check_data):
         if not isinstance(device_data, dict):
             _LOGGER.error(
                 "Invalid %s device JSON file '%s': invalid JSON format.",
@@ -108,7 +146,6 @@ class DeviceData:
     @staticmethod
     def check_file_climate(file_name, device_data, device_class, check_data):
         modes_used = {}
-        commands_used = {}
 
         if not (
             "operationModes" in device_data
@@ -232,212 +269,197 @@ class DeviceData:
             )
             return False
 
-        results = DeviceData.check_file_climate_commands(
+        return DeviceData.check_file_climate_commands(
             file_name,
-            0,
             modes_list,
             modes_used,
-            commands_used,
             device_class,
             check_data,
             device_data["commands"],
         )
 
-        # check if same IR command were find in the device data
-        if list(filter(lambda key: commands_used[key] > 1, commands_used.keys())):
-            _LOGGER.info(
-                "Invalid %s device JSON file '%s': duplicated commands detected.",
-                device_class,
-                file_name,
-            )
-
-        return results
-
     @staticmethod
     def check_file_climate_commands(
         file_name,
-        depth,
         modes_list,
         modes_used,
-        commands_used,
         device_class,
         check_data,
         commands,
     ):
-        level = modes_list[depth]
+        """Check climate commands tree in a single iterative pass.
 
-        if not (isinstance(commands, dict) and len(commands)):
+        Expected keys of every level are precomputed as sets, so each command
+        node is visited only once without any recursion.
+        """
+        if not (isinstance(commands, Mapping) and len(commands)):
             _LOGGER.error(
                 "Invalid %s device JSON file '%s': invalid format at %s level.",
                 device_class,
                 file_name,
-                level,
+                "operation",
             )
             return False
-        elif level == "operation":
-            check = []
-            # operation modes level
-            if "on" in commands:
-                if not (isinstance(commands["on"], str) and commands["on"]):
-                    _LOGGER.error(
-                        "Invalid %s device JSON file '%s': missing or invalid 'on' operation mode command.",
-                        device_class,
-                        file_name,
-                    )
-                    return False
-                check.append("on")
-            if "off" in commands:
-                if not (isinstance(commands["off"], str) and commands["off"]):
-                    _LOGGER.error(
-                        "Invalid %s device JSON file '%s': missing or invalid 'off' operation mode command.",
-                        device_class,
-                        file_name,
-                    )
-                    return False
-                check.append("off")
-            else:
-                for mode in modes_used[level]:
-                    off_mode = "off_" + mode
-                    if not (
-                        off_mode in commands
-                        and isinstance(commands[off_mode], str)
-                        and commands[off_mode]
-                    ):
-                        _LOGGER.error(
-                            "Invalid %s device JSON file '%s': missing or invalid 'off' or '%s' operation mode command.",
-                            device_class,
-                            file_name,
-                            off_mode,
-                        )
-                        return False
-                    check.append(off_mode)
-            for mode in modes_used[level]:
-                if not mode in commands:
+
+        # operation modes level
+        check = set(modes_used["operation"])
+        if "on" in commands:
+            if not (isinstance(commands["on"], str) and commands["on"]):
+                _LOGGER.error(
+                    "Invalid %s device JSON file '%s': missing or invalid 'on' operation mode command.",
+                    device_class,
+                    file_name,
+                )
+                return False
+            check.add("on")
+        if "off" in commands:
+            if not (isinstance(commands["off"], str) and commands["off"]):
+                _LOGGER.error(
+                    "Invalid %s device JSON file '%s': missing or invalid 'off' operation mode command.",
+                    device_class,
+                    file_name,
+                )
+                return False
+            check.add("off")
+        else:
+            for mode in modes_used["operation"]:
+                off_mode = "off_" + mode
+                if not (
+                    off_mode in commands
+                    and isinstance(commands[off_mode], str)
+                    and commands[off_mode]
+                ):
                     _LOGGER.error(
-                        "Invalid %s device JSON file '%s': not defined operation mode '%s' command key used. %s",
+                        "Invalid %s device JSON file '%s': missing or invalid 'off' or '%s' operation mode command.",
                         device_class,
                         file_name,
-                        mode,
-                        commands.keys(),
+                        off_mode,
                     )
                     return False
-                elif not DeviceData.check_file_climate_commands(
-                    file_name,
-                    depth + 1,
-                    modes_list,
-                    modes_used,
-                    commands_used,
-                    device_class,
-                    check_data,
-                    commands[mode],
-                ):
-                    return False
-                check.append(mode)
+                check.add(off_mode)
 
-            # check for non defined operational modes in commands
-            invalid = [mode for mode in commands.keys() if mode not in check]
-            if invalid:
+        stack = []
+        for mode in modes_used["operation"]:
+            if mode not in commands:
                 _LOGGER.error(
-                    "Invalid %s device JSON file '%s': operation mode '%s' is not defined, but it is used in commands.",
+                    "Invalid %s device JSON file '%s': not defined operation mode '%s' command key used. %s",
                     device_class,
                     file_name,
-                    invalid[0],
+                    mode,
+                    commands.keys(),
                 )
                 return False
+            stack.append((1, commands[mode]))
 
-            # check for missing commands for declared modes and temperatures
-            for level in modes_used:
-                for attr in modes_used[level]:
-                    if attr == 0:
-                        _LOGGER.error(
-                            "Invalid %s device JSON file '%s': '%s' '%s' is defined, but not used in commands.",
-                            device_class,
-                            file_name,
-                            level,
-                            attr,
-                        )
-                        return False
+        # check for non defined operational modes in commands
+        invalid = [mode for mode in commands.keys() if mode not in check]
+        if invalid:
+            _LOGGER.error(
+                "Invalid %s device JSON file '%s': operation mode '%s' is not defined, but it is used in commands.",
+                device_class,
+                file_name,
+                invalid[0],
+            )
+            return False
 
-        else:
-            if "-" in commands:
-                if len(commands) != 1:
+        expected = [set(modes_used[level]) for level in modes_list]
+        temperature_depth = len(modes_list) - 1
+        temperatures = expected[temperature_depth]
+        precision = check_data["precision"]
+        rounded = {}
+        codes = set()
+        duplicated = False
+
+        while stack:
+            depth, node = stack.pop()
+            if not (isinstance(node, Mapping) and len(node)):
+                _LOGGER.error(
+                    "Invalid %s device JSON file '%s': invalid format at %s level.",
+                    device_class,
+                    file_name,
+                    modes_list[depth],
+                )
+                return False
+            elif "-" in node:
+                if len(node) != 1:
                     _LOGGER.error(
                         "Invalid %s device JSON file '%s': command '%s' mode key '-' can't be combined with any named modes.",
                         device_class,
                         file_name,
-                        level,
+                        modes_list[depth],
                     )
                     return False
-            elif level == "temperature":
-                for temp in commands.keys():
-                    if not (isinstance(commands[temp], str) and commands[temp]):
+            elif depth == temperature_depth:
+                for temp, command in node.items():
+                    if not (isinstance(command, str) and command):
                         _LOGGER.error(
                             "Invalid %s device JSON file '%s': invalid 'temperature' '%s' command value '%s'.",
                             device_class,
                             file_name,
                             temp,
-                            commands[temp],
+                            command,
                         )
                         return False
 
-                    string = commands[temp]
-                    result = hashlib.md5(string.encode())
-                    hash = result.hexdigest()
-                    if hash in commands_used:
-                        _LOGGER.debug(
-                            "Invalid %s device JSON file '%s': 'temperature' '%s' command '%s' already used.",
-                            device_class,
-                            file_name,
-                            temp,
-                            commands[temp],
-                        )
-                        commands_used[hash] += 1
+                    if command in codes:
+                        duplicated = True
                     else:
-                        commands_used[hash] = 1
+                        codes.add(command)
 
-                    try:
-                        temp = precision_round(temp, check_data["precision"])
-                    except ValueError:
-                        _LOGGER.error(
-                            "Invalid %s device JSON file '%s': invalid 'temperature' command key '%s' value.",
-                            device_class,
-                            file_name,
-                            temp,
-                        )
-                        return False
+                    # the same temperature keys repeat in every modes combination
+                    if temp not in rounded:
+                        try:
+                            rounded[temp] = precision_round(temp, precision)
+                        except ValueError:
+                            _LOGGER.error(
+                                "Invalid %s device JSON file '%s': invalid 'temperature' command key '%s' value.",
+                                device_class,
+                                file_name,
+                                temp,
+                            )
+                            return False
 
-                    if temp not in modes_used[level].keys():
+                    if rounded[temp] not in temperatures:
                         _LOGGER.error(
                             "Invalid %s device JSON file '%s': invalid 'temperature' '%s' command key used.",
                             device_class,
                             file_name,
-                            temp,
+                            rounded[temp],
                         )
                         return False
-                    modes_used[level][temp] += 1
             else:
-                for mode in commands.keys():
-                    if mode not in modes_used[level].keys():
+                modes = expected[depth]
+                for mode, subtree in node.items():
+                    if mode not in modes:
                         _LOGGER.error(
                             "Invalid %s device JSON file '%s': not defined '%s' mode '%s' command key used.",
                             device_class,
                             file_name,
-                            level,
+                            modes_list[depth],
                             mode,
                         )
                         return False
-                    elif not DeviceData.check_file_climate_commands(
-                        file_name,
-                        depth + 1,
-                        modes_list,
-                        modes_used,
-                        commands_used,
-                        device_class,
-                        check_data,
-                        commands[mode],
-                    ):
-                        return False
-                    modes_used[level][mode] += 1
+                    stack.append((depth + 1, subtree))
+
+        # check if same IR command were find in the device data
+        if duplicated:
+            _LOGGER.info(
+                "Invalid %s device JSON file '%s': duplicated commands detected.",
+                device_class,
+                file_name,
+            )
+
+        # modes are usage counted only by their keys, so only a zero
+        # temperature key is ever reported as defined, but not used
+        if 0 in temperatures:
+            _LOGGER.error(
+                "Invalid %s device JSON file '%s': '%s' '%s' is defined, but not used in commands.",
+                device_class,
+                file_name,
+                "temperature",
+                0,
+            )
+            return False
 
         return True
 
@@ -0,0 +1,134 @@
+"""Index of the device data files directories.
+
+Device files of every device class directory are indexed by their device
+code. Directories are scanned again only when their modification time
+changes, so looking up a device file is a dictionary hit. Scanned entries
+hold the file path, size and modification time. Complete entries, with the
+content digest and the device metadata, are stored when the device file is
+loaded (or validated by the device files validator) and kept until the file
+changes.
+"""
+
+import os
+import threading
+
+DEVICE_FILE_EXTENSION = ".json"
+
+
+def index_entry(file_path: str, stat: os.stat_result, digest: str, device_data) -> dict:
+    """Return complete index entry of a device file with the content digest."""
+    if not isinstance(device_data, dict):
+        device_data = {}
+
+    return {
+        "path": file_path,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "digest": digest,
+        "manufacturer": device_data.get("manufacturer"),
+        "models": device_data.get("supportedModels"),
+        "controller": device_data.get("supportedController"),
+        "encoding": device_data.get("commandsEncoding"),
+    }
+
+
+def _unchanged(entry, stat):
+    return (
+        entry is not None
+        and entry["size"] == stat.st_size
+        and entry["mtime"] == stat.st_mtime_ns
+    )
+
+
+class DeviceIndex:
+    """Index of device files in the codes directories.
+
+    Directories are searched in the given order, so device files of the
+    first directories take precedence over the same device codes in the
+    following ones.
+    """
+
+    def __init__(self, directories, classes=None):
+        self._directories = directories
+        # device class directory path: [directory mtime, {device code: entry}]
+        self._classes = classes or {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def load(directories, data) -> "DeviceIndex":
+        """Return index restored from the data returned by dump."""
+        return DeviceIndex(directories, {path: list(item) for path, item in data})
+
+    def dump(self) -> list:
+        """Return JSON serializable index data."""
+        with self._lock:
+            return [[path, item] for path, item in self._classes.items()]
+
+    def _scan(self, path):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            self._classes.pop(path, None)
+            return {}
+
+        item = self._classes.get(path)
+        if item is not None and item[0] == mtime:
+            return item[1]
+
+        previous = item[1] if item is not None else {}
+        entries = {}
+        with os.scandir(path) as files:
+            for file in files:
+                if not (file.name.endswith(DEVICE_FILE_EXTENSION) and file.is_file()):
+                    continue
+                code = file.name[: -len(DEVICE_FILE_EXTENSION)]
+                stat = file.stat()
+                if _unchanged(entry := previous.get(code), stat):
+                    entries[code] = entry
+                else:
+                    entries[code] = {
+                        "path": file.path,
+                        "size": stat.st_size,
+                        "mtime": stat.st_mtime_ns,
+                    }
+        self._classes[path] = [mtime, entries]
+        return entries
+
+    def lookup(self, device_class: str, device_code) -> dict:
+        """Return index entry of the device file, or None if it doesn't exist.
+
+        Doesn't run in the event loop.
+        """
+        with self._lock:
+            for directory in self._directories:
+                entries = self._scan(os.path.join(directory, device_class))
+                if (entry := entries.get(str(device_code))) is not None:
+                    return entry
+        return None
+
+    def entries(self, device_class: str) -> dict:
+        """Return index entries of all device files of the device class."""
+        with self._lock:
+            entries = {}
+            for directory in reversed(self._directories):
+                entries.update(self._scan(os.path.join(directory, device_class)))
+            return entries
+
+    def cached(self, file_path: str) -> dict:
+        """Return complete index entry of an unchanged file, otherwise None."""
+        directory, name = os.path.split(file_path)
+        code = name[: -len(DEVICE_FILE_EXTENSION)]
+        with self._lock:
+            item = self._classes.get(directory)
+            entry = item[1].get(code) if item is not None else None
+        if entry is None or "digest" not in entry:
+            return None
+        return entry if _unchanged(entry, os.stat(file_path)) else None
+
+    def update(self, entry: dict):
+        """Store complete index entry of a device file."""
+        directory, name = os.path.split(entry["path"])
+        with self._lock:
+            # unknown directory mtime, entries are reused by the next scan
+            item = self._classes.setdefault(directory, [None, {}])
+            item[1][name[: -len(DEVICE_FILE_EXTENSION)]] = entry
@@ -1,5 +1,5 @@
-import asyncio
 import logging
+from collections.abc import Mapping
 
 import voluptuous as vol
 
@@ -52,7 +52,7 @@ async def async_setup_platform(
     async_add_entities([SmartIRFan(hass, config, device_data)])
 
 
-class SmartIRFan(FanEntity, RestoreEntity):
+class SmartIRFan(SmartIR, FanEntity, RestoreEntity):
     _enable_turn_on_off_backwards_compatibility = False
 
     def __init__(self, hass: HomeAssistant, config: ConfigType, device_data):
@@ -150,6 +150,7 @@ class SmartIRFan(FanEntity, RestoreEntity):
             "supported_models": self._supported_models,
             "supported_controller": self._supported_controller,
             "commands_encoding": self._commands_encoding,
+            "sends_suppressed": self._send_filter.suppressed,
         }
 
     async def async_set_percentage(self, percentage: int) -> None:
@@ -219,12 +220,14 @@ class SmartIRFan(FanEntity, RestoreEntity):
                             )
                         else:
                             _LOGGER.debug("Found 'off' operation mode command.")
-                            await self._controller.send(self._commands["off"])
-                            await asyncio.sleep(self._delay)
+                            await self._async_send_sequence(
+                                [self._commands["off"]], STATE_OFF
+                            )
                     else:
                         _LOGGER.error("Missing device IR code for 'off' mode.")
                         return
                 else:
+                    commands = []
                     if "on" in self._commands.keys() and isinstance(
                         self._commands["on"], str
                     ):
@@ -243,13 +246,11 @@ class SmartIRFan(FanEntity, RestoreEntity):
                         else:
                             # if on code is not present, the on bit can be still set later in the all operation/fan codes"""
                             _LOGGER.debug("Found 'on' operation mode command.")
-                            await self._controller.send(self._commands["on"])
-                            await asyncio.sleep(self._delay)
+                            commands.append(self._commands["on"])
 
                     if oscillate:
                         if "oscillate" in self._commands:
-                            await self._controller.send(self._commands["oscillate"])
-                            await asyncio.sleep(self._delay)
+                            commands.append(self._commands["oscillate"])
                         else:
                             _LOGGER.error(
                                 "Missing device IR code for 'oscillate' mode."
@@ -258,13 +259,10 @@ class SmartIRFan(FanEntity, RestoreEntity):
                     else:
                         if (
                             direction in self._commands
-                            and isinstance(self._commands[direction], dict)
+                            and isinstance(self._commands[direction], Mapping)
                             and speed in self._commands[direction]
                         ):
-                            await self._controller.send(
-                                self._commands[direction][speed]
-                            )
-                            await asyncio.sleep(self._delay)
+                            commands.append(self._commands[direction][speed])
                         else:
                             _LOGGER.error(
                                 "Missing device IR code for direction '%s' speed '%s'.",
@@ -272,6 +270,7 @@ class SmartIRFan(FanEntity, RestoreEntity):
                                 speed,
                             )
                             return
+                    await self._async_send_sequence(commands, STATE_ON)
 
                 self._state = state
                 self._speed = speed
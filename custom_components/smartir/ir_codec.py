@@ -0,0 +1,256 @@
+"""Encoders and decoders of IR codes formats.
+
+Pulses are lists of alternating mark and space durations in microseconds.
+Decoders of the Broadlink packets round the durations up, so encoding the
+decoded pulses again gives the same Broadlink packet pulses. Tuya codes are
+little endian 16 bit pulses compressed by the FastLZ like Tuya compression.
+"""
+
+import array
+import struct
+import sys
+
+PRONTO_CLOCK = 0.241246
+PRONTO_FREQUENCY = 38000
+
+BROADLINK_IR = 0x26
+BROADLINK_HEADER = struct.Struct("<BBH")
+BROADLINK_TRAILER = (0x0D, 0x05)
+BROADLINK_TICK = 269
+BROADLINK_TICKS = 8192
+
+TUYA_WINDOW = 1 << 13
+TUYA_MAX_LITERAL = 32
+TUYA_MAX_MATCH = 7 + 255 + 2
+TUYA_MIN_MATCH = 3
+
+# pulse durations of all Broadlink time units, rounded up
+BROADLINK_PULSES = [
+    -(-tick * BROADLINK_TICKS // BROADLINK_TICK) for tick in range(0x10000)
+]
+
+
+def pronto_to_pulses(pronto: bytes) -> list:
+    """Decode Pronto hex code bytes into pulses."""
+    codes = array.array("H", pronto)
+    if sys.byteorder == "little":
+        codes.byteswap()
+
+    if codes[0]:
+        raise ValueError("Pronto code should start with 0000")
+    if len(codes) != 4 + 2 * (codes[2] + codes[3]):
+        raise ValueError("Number of pulse widths does not match the preamble")
+
+    frequency = 1 / (codes[1] * PRONTO_CLOCK)
+    return [round(code / frequency) for code in codes[4:]]
+
+
+def pulses_to_pronto(pulses, frequency=PRONTO_FREQUENCY) -> bytes:
+    """Encode pulses into Pronto hex code bytes, sent once without repeat."""
+    if len(pulses) % 2:
+        raise ValueError("Number of pulses has to be even")
+
+    carrier = round(1000000 / (frequency * PRONTO_CLOCK))
+    unit = carrier * PRONTO_CLOCK
+    codes = array.array("H", (0, carrier, len(pulses) // 2, 0))
+    codes.extend(max(1, round(pulse / unit)) for pulse in pulses)
+    if sys.byteorder == "little":
+        codes.byteswap()
+    return codes.tobytes()
+
+
+def pulses_to_broadlink(pulses, repeat=0) -> bytearray:
+    """Encode pulses into Broadlink IR packet."""
+    ticks = [int(pulse * BROADLINK_TICK / BROADLINK_TICKS) for pulse in pulses]
+
+    # short pulses are copied in runs, long pulses are prefixed by zero byte
+    packet = bytearray(BROADLINK_HEADER.size)
+    start = 0
+    for index in [index for index, tick in enumerate(ticks) if tick > 255]:
+        packet += bytes(ticks[start:index])
+        packet.append(0)
+        packet += ticks[index].to_bytes(2, "big")
+        start = index + 1
+    packet += bytes(ticks[start:])
+    BROADLINK_HEADER.pack_into(
+        packet, 0, BROADLINK_IR, repeat, len(packet) - BROADLINK_HEADER.size
+    )
+    packet.extend(BROADLINK_TRAILER)
+
+    # Add 0s to make ultimate packet size a multiple of 16 for 128-bit AES encryption.
+    remainder = (len(packet) + 4) % 16
+    if remainder:
+        packet.extend(bytes(16 - remainder))
+    return packet
+
+
+def broadlink_to_ticks(packet: bytes) -> array.array:
+    """Decode Broadlink IR packet into pulses in the Broadlink time units."""
+    if len(packet) < BROADLINK_HEADER.size:
+        raise ValueError("Broadlink packet is too short")
+    packet_type, _, length = BROADLINK_HEADER.unpack_from(packet)
+    if packet_type != BROADLINK_IR:
+        raise ValueError("Broadlink packet is not an IR packet")
+    data = bytes(memoryview(packet)[BROADLINK_HEADER.size :])
+    if len(data) < length:
+        raise ValueError("Broadlink packet is truncated")
+
+    # long pulses are zero byte followed by 16 bit big endian value, learned
+    # packets may count only the zero byte of the last one in the length
+    ticks = array.array("H")
+    start = 0
+    while (end := data.find(0, start, length)) >= 0:
+        ticks.extend(data[start:end])
+        if end + 3 > len(data):
+            raise ValueError("Broadlink packet is truncated")
+        ticks.append(data[end + 1] << 8 | data[end + 2])
+        start = end + 3
+    ticks.extend(data[start:length])
+
+    # learned packets include their trailer in the length
+    if tuple(ticks[-2:]) == BROADLINK_TRAILER:
+        del ticks[-2:]
+    return ticks
+
+
+def broadlink_to_pulses(packet: bytes) -> list:
+    """Decode Broadlink IR packet into pulses."""
+    return list(map(BROADLINK_PULSES.__getitem__, broadlink_to_ticks(packet)))
+
+
+def raw_to_pulses(durations) -> list:
+    """Decode signed durations, positive marks and negative spaces, into pulses.
+
+    Consecutive durations of the same sign are merged and a leading space is
+    dropped, so the pulses always start with a mark.
+    """
+    pulses = []
+    for duration in durations:
+        if not duration:
+            continue
+        if (duration > 0) == (len(pulses) % 2 == 0):
+            pulses.append(abs(duration))
+        elif pulses:
+            pulses[-1] += abs(duration)
+    return pulses
+
+
+def pulses_to_raw(pulses) -> list:
+    """Encode pulses into signed durations, positive marks and negative spaces."""
+    durations = list(pulses)
+    durations[1::2] = [-pulse for pulse in durations[1::2]]
+    return durations
+
+
+def _tuya_literals(out: bytearray, data: bytes, start: int, end: int):
+    for start in range(start, end, TUYA_MAX_LITERAL):
+        block = data[start : min(end, start + TUYA_MAX_LITERAL)]
+        out.append(len(block) - 1)
+        out += block
+
+
+def tuya_compress(data: bytes) -> bytes:
+    """Compress data by the Tuya compression.
+
+    Matches are found through a table of the last positions of every three
+    bytes sequence, like the FastLZ level 1 compressor does. It's bound by
+    the CPU (about a thousand IR codes per second), so it must not run in the
+    event loop: commands are compressed only when the whole commands tree is
+    converted for the UFO-R11 controller in the executor.
+    """
+    out = bytearray()
+    table = {}
+    length = len(data)
+    anchor = pos = 0
+    while pos + TUYA_MIN_MATCH <= length:
+        key = data[pos : pos + TUYA_MIN_MATCH]
+        ref = table.get(key)
+        table[key] = pos
+        if ref is None or pos - ref > TUYA_WINDOW:
+            pos += 1
+            continue
+
+        # extend the match by slices, then find the first different byte
+        limit = min(length - pos, TUYA_MAX_MATCH)
+        match = TUYA_MIN_MATCH
+        while match < limit:
+            step = min(16, limit - match)
+            if (
+                data[ref + match : ref + match + step]
+                != data[pos + match : pos + match + step]
+            ):
+                while data[ref + match] == data[pos + match]:
+                    match += 1
+                break
+            match += step
+
+        _tuya_literals(out, data, anchor, pos)
+        distance = pos - ref - 1
+        size = match - 2
+        if size < 7:
+            out += bytes((size << 5 | distance >> 8, distance & 0xFF))
+        else:
+            out += bytes((7 << 5 | distance >> 8, size - 7, distance & 0xFF))
+        # sequences inside the match are candidates of the following matches
+        for index in range(max(pos + 1, pos + match - 2), pos + match):
+            table[data[index : index + TUYA_MIN_MATCH]] = index
+        pos += match
+        anchor = pos
+    _tuya_literals(out, data, anchor, length)
+    return bytes(out)
+
+
+def tuya_decompress(data: bytes) -> bytearray:
+    """Decompress data compressed by the Tuya compression."""
+    out = bytearray()
+    length = len(data)
+    pos = 0
+    while pos < length:
+        header = data[pos]
+        pos += 1
+        size = header >> 5
+        if not size:
+            # literal run
+            end = pos + (header & 0x1F) + 1
+            if end > length:
+                raise ValueError("Tuya code is truncated")
+            out += data[pos:end]
+            pos = end
+            continue
+
+        # match of the already decompressed data
+        if pos + (size == 7) >= length:
+            raise ValueError("Tuya code is truncated")
+        if size == 7:
+            size += data[pos]
+            pos += 1
+        size += 2
+        distance = ((header & 0x1F) << 8 | data[pos]) + 1
+        pos += 1
+        if distance > len(out):
+            raise ValueError("Tuya code refers before its start")
+        chunk = out[-distance:]
+        if distance < size:
+            # overlapping match repeats the chunk
+            chunk *= size // distance + 1
+        out += chunk[:size]
+    return out
+
+
+def pulses_to_tuya(pulses) -> bytes:
+    """Encode pulses into compressed Tuya code, long pulses are clipped."""
+    codes = array.array("H", [min(pulse, 0xFFFF) for pulse in pulses])
+    if sys.byteorder == "big":
+        codes.byteswap()
+    return tuya_compress(codes.tobytes())
+
+
+def tuya_to_pulses(data: bytes) -> list:
+    """Decode compressed Tuya code into pulses."""
+    raw = tuya_decompress(data)
+    if len(raw) % 2:
+        raise ValueError("Tuya code has odd number of bytes")
+    codes = array.array("H", raw)
+    if sys.byteorder == "big":
+        codes.byteswap()
+    return codes.tolist()
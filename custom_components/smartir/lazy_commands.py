@@ -0,0 +1,423 @@
+from collections import OrderedDict
+from collections.abc import Mapping
+import json
+import os
+import re
+import threading
+import weakref
+
+from .device_bundle import BundleNode
+
+# bytes of the device file source of the subtrees kept loaded
+LAZY_COMMANDS_CACHE_SIZE = 2 * 1024 * 1024
+
+WHITESPACE = re.compile(r"\s*")
+STRING = re.compile(r'"[^"\\]*+(?:\\.[^"\\]*+)*+"')
+
+_DECODER = json.JSONDecoder()
+
+
+class LazyCommands(Mapping):
+    """Read-only commands tree loading its subtrees on demand.
+
+    Top level commands which are not objects (like 'on' or 'off' codes) are
+    loaded eagerly. Every other subtree (usually an operation mode) is loaded
+    by the loader when it is accessed for the first time. The loader returns
+    the subtree and its size, the least recently used subtrees are unloaded
+    when the total size of the loaded ones exceeds the cache size.
+
+    Subtrees already loaded with the commands can be passed to the cache.
+    Loading reads the device file, so it must not run in the event loop.
+    Commands read in the event loop are preloaded in the executor, preloaded
+    subtrees are never unloaded.
+
+    If a code store is provided, all loaded codes are interned in it and
+    released again when their subtree is unloaded. Content can be replaced
+    in place, so all holders of the commands see the new commands tree.
+    """
+
+    def __init__(
+        self,
+        commands,
+        lazy,
+        loader,
+        cache_size=LAZY_COMMANDS_CACHE_SIZE,
+        code_store=None,
+        loaded=None,
+    ):
+        self._cache_size = cache_size
+        self._code_store = code_store
+        self._generation = 0
+        self._preloaded = False
+        self._eager = {}
+        self._loaded = OrderedDict()
+        self._loaded_size = 0
+        self._pinned = {}
+        self._lock = threading.Lock()
+
+        if code_store is not None:
+            self._eager.update(self._acquire_eager(commands, lazy))
+            commands = {**commands, **self._eager}
+            weakref.finalize(
+                self, _release, code_store, self._eager, self._loaded, self._pinned
+            )
+        # commands of the lazy keys hold loader references, not values, and
+        # all three are swapped at once, so eager commands are read unlocked
+        self._content = (commands, lazy, loader)
+
+        # subtrees already loaded with the commands
+        for key, (subtree, size) in (loaded or {}).items():
+            if code_store is not None:
+                subtree = code_store.acquire(subtree)
+            self._loaded[key] = (subtree, size)
+            self._loaded_size += size
+        self._release(self._evict())
+
+    def _acquire_eager(self, commands, lazy):
+        return self._code_store.acquire(
+            {key: value for key, value in commands.items() if key not in lazy}
+        )
+
+    def _load(self, loader, value):
+        subtree, size = loader(value)
+        if self._code_store is not None:
+            subtree = self._code_store.acquire(subtree)
+        return subtree, size
+
+    def __getitem__(self, key):
+        commands, lazy, _ = self._content
+        value = commands[key]
+        if key not in lazy:
+            return value
+
+        with self._lock:
+            commands, lazy, loader = self._content
+            if key in self._pinned:
+                return self._pinned[key]
+            if key in self._loaded:
+                self._loaded.move_to_end(key)
+                return self._loaded[key][0]
+            value = commands[key]
+            generation = self._generation
+
+        subtree, size = self._load(loader, value)
+        with self._lock:
+            if generation != self._generation:
+                # content was replaced while loading, don't keep stale subtree
+                unloaded = [subtree]
+            elif key in self._loaded:
+                # loaded concurrently by another thread
+                unloaded = [subtree]
+                subtree = self._loaded[key][0]
+                self._loaded.move_to_end(key)
+            elif key in self._pinned:
+                unloaded = [subtree]
+                subtree = self._pinned[key]
+            else:
+                self._loaded[key] = (subtree, size)
+                self._loaded_size += size
+                unloaded = self._evict()
+        self._release(unloaded)
+        return subtree
+
+    def __contains__(self, key):
+        return key in self._content[0]
+
+    def _evict(self):
+        unloaded = []
+        # the last loaded subtree is kept even if it's bigger than the cache
+        while self._loaded_size > self._cache_size and len(self._loaded) > 1:
+            subtree, size = self._loaded.popitem(last=False)[1]
+            self._loaded_size -= size
+            unloaded.append(subtree)
+        return unloaded
+
+    def _release(self, trees):
+        if self._code_store is not None:
+            for tree in trees:
+                self._code_store.release(tree)
+
+    def preload(self):
+        """Load all subtrees and keep them loaded, doesn't run in the event loop."""
+        with self._lock:
+            self._preloaded = True
+            commands, lazy, loader = self._content
+            generation = self._generation
+            for key, (subtree, _) in self._loaded.items():
+                self._pinned[key] = subtree
+            self._loaded.clear()
+            self._loaded_size = 0
+            missing = [key for key in lazy if key not in self._pinned]
+
+        loaded = {key: self._load(loader, commands[key])[0] for key in missing}
+        with self._lock:
+            if generation != self._generation:
+                # the replacing commands are preloaded by the caller of replace
+                unloaded = list(loaded.values())
+            else:
+                unloaded = [
+                    subtree for key, subtree in loaded.items() if key in self._pinned
+                ]
+                self._pinned.update(
+                    (key, subtree)
+                    for key, subtree in loaded.items()
+                    if key not in self._pinned
+                )
+        self._release(unloaded)
+
+    @property
+    def preloaded(self) -> bool:
+        """Return if all subtrees are kept loaded."""
+        return self._preloaded
+
+    @property
+    def generation(self) -> int:
+        """Number of times the content was replaced."""
+        return self._generation
+
+    def replace(self, other: "LazyCommands"):
+        """Replace content by the content of other lazy commands.
+
+        Subtrees loaded by the other commands are taken over, so preloaded
+        commands have to be replaced by preloaded ones. The other commands
+        must not be used afterwards.
+        """
+        if self._code_store is not other._code_store:
+            raise ValueError("Commands of another code store can't be taken over.")
+        with other._lock:
+            content = other._content
+            eager = dict(other._eager)
+            loaded = OrderedDict(other._loaded)
+            loaded_size = other._loaded_size
+            pinned = dict(other._pinned)
+            # codes are released by these commands from now on
+            other._eager.clear()
+            other._loaded.clear()
+            other._pinned.clear()
+        with self._lock:
+            unloaded = [
+                dict(self._eager),
+                *(subtree for subtree, _ in self._loaded.values()),
+                *self._pinned.values(),
+            ]
+            self._eager.clear()
+            self._eager.update(eager)
+            self._loaded.clear()
+            self._loaded.update(loaded)
+            self._loaded_size = loaded_size
+            self._pinned.clear()
+            self._pinned.update(pinned)
+            self._content = content
+            self._generation += 1
+        self._release(unloaded)
+
+    def __iter__(self):
+        return iter(self._content[0])
+
+    def __len__(self):
+        return len(self._content[0])
+
+    def __repr__(self):
+        return (
+            f"<LazyCommands {list(self._content[0])} loaded "
+            f"{list(self._pinned) + list(self._loaded)}>"
+        )
+
+
+class CommandsOverlay(Mapping):
+    """Shared commands with some top level commands replaced.
+
+    Replaced commands are computed by the overlay function from the shared
+    commands, again whenever the shared commands are replaced. All other
+    commands are read through, so lazy subtrees stay lazy.
+    """
+
+    def __init__(self, commands, overlay):
+        self._commands = commands
+        self._overlay = overlay
+        self._replaced = None
+        self._replaced_generation = None
+
+    def _get_replaced(self):
+        if (generation := self.generation) != self._replaced_generation:
+            self._replaced = self._overlay(self._commands)
+            self._replaced_generation = generation
+        return self._replaced
+
+    def __getitem__(self, key):
+        if key in (replaced := self._get_replaced()):
+            return replaced[key]
+        return self._commands[key]
+
+    def __contains__(self, key):
+        return key in self._get_replaced() or key in self._commands
+
+    @property
+    def generation(self) -> int:
+        """Number of times the shared commands were replaced."""
+        return getattr(self._commands, "generation", 0)
+
+    def __iter__(self):
+        replaced = self._get_replaced()
+        yield from self._commands
+        yield from (key for key in replaced if key not in self._commands)
+
+    def __len__(self):
+        return len(self._commands.keys() | self._get_replaced().keys())
+
+
+def _release(code_store, eager, loaded, pinned):
+    code_store.release(eager)
+    for subtree, _ in loaded.values():
+        code_store.release(subtree)
+    for subtree in pinned.values():
+        code_store.release(subtree)
+
+
+def _decode_value(data, text, pos):
+    """Return the JSON value starting at pos and its end.
+
+    Values are decoded from the single byte text by the C decoder, only
+    values with other than ASCII characters are decoded again from their
+    bytes.
+    """
+    value, end = _DECODER.raw_decode(text, pos)
+    if not data[pos:end].isascii():
+        value = json.loads(data[pos:end])
+    return value, end
+
+
+def _scan_object(data, text, pos, decode=None):
+    """Return keys, values and spans of the JSON object starting at pos, and its end.
+
+    The decode function can decode values itself and return them with their
+    end.
+    """
+    if text[pos] != "{":
+        raise ValueError("Expected JSON object at position %d." % pos)
+    items = []
+    pos = WHITESPACE.match(text, pos + 1).end()
+    if text[pos] == "}":
+        return items, pos + 1
+    while True:
+        if not (match := STRING.match(text, pos)):
+            raise ValueError("Expected JSON key at position %d." % pos)
+        # keys are decoded from their bytes, the text has single byte characters
+        key = data[pos + 1 : match.end() - 1]
+        key = json.loads(data[pos : match.end()]) if b"\\" in key else key.decode()
+        pos = WHITESPACE.match(text, match.end()).end()
+        if text[pos] != ":":
+            raise ValueError("Expected ':' at position %d." % pos)
+        start = WHITESPACE.match(text, pos + 1).end()
+        if decode:
+            value, end = decode(key, start)
+        else:
+            value, end = _decode_value(data, text, start)
+        items.append((key, value, start, end))
+        pos = WHITESPACE.match(text, end).end()
+        if text[pos] == "}":
+            return items, pos + 1
+        if text[pos] != ",":
+            raise ValueError("Expected ',' or '}' at position %d." % pos)
+        pos = WHITESPACE.match(text, pos + 1).end()
+
+
+def _index_json(data: bytes, keep=0):
+    """Return device data with commands subtrees replaced by their spans.
+
+    Returns device data, commands, byte spans of the commands subtrees and
+    the first decoded subtrees with their sizes, up to keep bytes of them.
+    Other subtrees are dropped right after they are decoded. Commands are
+    None if they aren't an object.
+    """
+    # single byte decoding keeps character positions equal to byte offsets
+    text = data.decode("latin-1")
+    commands = None
+    spans = {}
+    subtrees = {}
+
+    def decode(key, start):
+        nonlocal commands, keep
+        if key != "commands" or text[start] != "{":
+            return _decode_value(data, text, start)
+        commands = {}
+        items, end = _scan_object(data, text, start)
+        for command, value, command_start, command_end in items:
+            if not isinstance(value, dict):
+                commands[command] = value
+                continue
+            spans[command] = (command_start, command_end)
+            if (size := command_end - command_start) <= keep:
+                subtrees[command] = (value, size)
+                keep -= size
+        return None, end
+
+    items, _ = _scan_object(data, text, WHITESPACE.match(text).end(), decode)
+    device_data = {key: value for key, value, _, _ in items}
+    return device_data, commands, spans, subtrees
+
+
+class _JsonLoader:
+    """Loader of the commands subtrees of a device JSON file.
+
+    Subtrees are read at their byte spans only while the file keeps the size
+    and modification time it had when it was indexed and validated. Changed
+    file (edited in place or replaced) has to be reloaded, so content which
+    wasn't validated is never loaded. The file is open only while a subtree
+    is read.
+    """
+
+    def __init__(self, file_path, stat, spans):
+        self._file_path = file_path
+        self._signature = (stat.st_mtime_ns, stat.st_size)
+        self._spans = spans
+
+    def __call__(self, key):
+        with open(self._file_path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            if self._signature != (stat.st_mtime_ns, stat.st_size):
+                raise ValueError(
+                    "Device JSON file '%s' changed since it was loaded, call the "
+                    "'smartir.reload_codes' service to load it again." % self._file_path
+                )
+            start, end = self._spans[key]
+            file.seek(start)
+            return json.loads(file.read(end - start)), end - start
+
+
+def read_json_lazy(file_path: str, code_store=None) -> dict:
+    """Read device JSON file metadata, commands subtrees are loaded lazily."""
+    with open(file_path, "rb") as file:
+        stat = os.fstat(file.fileno())
+        data = file.read()
+
+    # subtrees are decoded while indexing anyway, so the first ones are kept
+    device_data, commands, spans, subtrees = _index_json(data, LAZY_COMMANDS_CACHE_SIZE)
+    if commands is None:
+        return device_data
+
+    # lazy subtrees are referenced by their key in the commands
+    commands.update((key, key) for key in spans)
+    device_data["commands"] = LazyCommands(
+        commands,
+        set(spans),
+        _JsonLoader(file_path, stat, spans),
+        code_store=code_store,
+        loaded=subtrees,
+    )
+    return device_data
+
+
+def lazy_bundle_commands(root: BundleNode, code_store=None) -> LazyCommands:
+    """Return lazy commands of a bundle commands tree.
+
+    Subtrees are the bundle nodes themselves, which read their codes from the
+    memory mapped bundle, so they don't count into the cache size.
+    """
+    commands = {}
+    lazy = set()
+    for key, value in root.items():
+        commands[key] = value
+        if isinstance(value, BundleNode):
+            lazy.add(key)
+    return LazyCommands(commands, lazy, lambda node: (node, 0), code_store=code_store)
@@ -1,5 +1,5 @@
-import asyncio
 import logging
+from collections.abc import Mapping
 
 import voluptuous as vol
 
@@ -14,7 +14,7 @@ from homeassistant.core import HomeAssistant, Event, EventStateChangedData
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.typing import ConfigType
-from .smartir_helpers import closest_match_index
+from .smartir_helpers import ClosestMatch
 from .smartir_entity import load_device_data_file, SmartIR, PLATFORM_SCHEMA
 
 _LOGGER = logging.getLogger(__name__)
@@ -31,6 +31,14 @@ CMD_NIGHTLIGHT = "night"
 CMD_COLOR_TEMPERATURE = "colorTemperature"
 CMD_BRIGHTNESS = "brightness"
 
+# commands changing the light state by steps
+STEP_COMMANDS = (
+    CMD_BRIGHTNESS_INCREASE,
+    CMD_BRIGHTNESS_DECREASE,
+    CMD_COLOR_MODE_COLDER,
+    CMD_COLOR_MODE_WARMER,
+)
+
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
     {vol.Optional(CONF_NAME, default=DEFAULT_NAME): cv.string}
 )
@@ -55,7 +63,7 @@ async def async_setup_platform(
     async_add_entities([SmartIRLight(hass, config, device_data)])
 
 
-class SmartIRLight(LightEntity, RestoreEntity):
+class SmartIRLight(SmartIR, LightEntity, RestoreEntity):
 
     def __init__(self, hass: HomeAssistant, config: ConfigType, device_data):
         # Initialize SmartIR device
@@ -66,6 +74,8 @@ class SmartIRLight(LightEntity, RestoreEntity):
 
         self._brightnesses = device_data["brightness"]
         self._colortemps = device_data["colorTemperature"]
+        self._brightness_match = ClosestMatch(self._brightnesses)
+        self._colortemp_match = ClosestMatch(self._colortemps)
 
         if CMD_COLOR_TEMPERATURE in self._commands or (
             CMD_COLOR_MODE_COLDER in self._commands
@@ -148,6 +158,7 @@ class SmartIRLight(LightEntity, RestoreEntity):
             "supported_models": self._supported_models,
             "supported_controller": self._supported_controller,
             "commands_encoding": self._commands_encoding,
+            "sends_suppressed": self._send_filter.suppressed,
         }
 
     async def async_turn_on(self, **params):
@@ -176,12 +187,12 @@ class SmartIRLight(LightEntity, RestoreEntity):
         ):
             did_something = True
             target = params.get(ATTR_COLOR_TEMP_KELVIN)
-            old_color_temp = closest_match_index(self._colortemp, self._colortemps)
-            new_color_temp = closest_match_index(target, self._colortemps)
+            old_color_temp = self._colortemp_match.index(self._colortemp)
+            new_color_temp = self._colortemp_match.index(target)
             final_color_temp = f"{self._colortemps[new_color_temp]}"
             if (
                 CMD_COLOR_TEMPERATURE in self._commands
-                and isinstance(self._commands[CMD_COLOR_TEMPERATURE], dict)
+                and isinstance(self._commands[CMD_COLOR_TEMPERATURE], Mapping)
                 and final_color_temp in self._commands[CMD_COLOR_TEMPERATURE]
             ):
                 _LOGGER.debug(
@@ -225,14 +236,12 @@ class SmartIRLight(LightEntity, RestoreEntity):
             elif self._brightnesses:
                 did_something = True
                 target = params.get(ATTR_BRIGHTNESS)
-                old_brightness = closest_match_index(
-                    self._brightness, self._brightnesses
-                )
-                new_brightness = closest_match_index(target, self._brightnesses)
+                old_brightness = self._brightness_match.index(self._brightness)
+                new_brightness = self._brightness_match.index(target)
                 final_brightness = f"{self._brightnesses[new_brightness]}"
                 if (
                     CMD_BRIGHTNESS in self._commands
-                    and isinstance(self._commands[CMD_BRIGHTNESS], dict)
+                    and isinstance(self._commands[CMD_BRIGHTNESS], Mapping)
                     and final_brightness in self._commands[CMD_BRIGHTNESS]
                 ):
                     _LOGGER.debug(
@@ -272,7 +281,8 @@ class SmartIRLight(LightEntity, RestoreEntity):
         # on and off are the same remote code.
         if not did_something and not self._on_by_remote:
             self._state = STATE_ON
-            await self.send_command(CMD_POWER_ON)
+            # resync is never skipped as a redundant send
+            await self.send_command(CMD_POWER_ON, force=True)
 
         self.async_write_ha_state()
 
@@ -285,20 +295,26 @@ class SmartIRLight(LightEntity, RestoreEntity):
     async def async_toggle(self):
         await (self.async_turn_on() if not self.is_on else self.async_turn_off())
 
-    async def send_command(self, cmd, count=1):
+    async def send_command(self, cmd, count=1, force=False):
         if cmd not in self._commands:
             _LOGGER.error(f"Unknown command '{cmd}'")
             return
         _LOGGER.debug(f"Sending {cmd} remote command {count} times.")
         remote_cmd = self._commands.get(cmd)
-        await self.send_remote_command(remote_cmd, count)
+        await self.send_remote_command(
+            remote_cmd, count, cmd not in STEP_COMMANDS, force
+        )
 
-    async def send_remote_command(self, remote_cmd, count=1):
+    async def send_remote_command(
+        self, remote_cmd, count=1, absolute=True, force=False
+    ):
         async with self._temp_lock:
             self._on_by_remote = False
             try:
-                for _ in range(count):
-                    await self._controller.send(remote_cmd)
-                    await asyncio.sleep(self._delay)
+                if absolute and count == 1:
+                    await self._async_send_sequence([remote_cmd], self._state, force)
+                else:
+                    await self._controller.send_repeated(remote_cmd, count, self._delay)
+                    self._send_filter.invalidate()
             except Exception as e:
                 _LOGGER.exception(e)
@@ -0,0 +1,58 @@
+import asyncio
+import logging
+
+import aiohttp
+
+_LOGGER = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = 5
+REQUEST_ATTEMPTS = 3
+RETRY_BACKOFF = 0.2
+# LOOKin remote sends one command at a time
+CONCURRENT_REQUESTS = 1
+
+
+class LookinClient:
+    """HTTP client of a LOOKin remote.
+
+    Requests are sent through the shared session, which keeps connections to
+    the remote alive. Only requests failed to connect to the remote are
+    retried with exponential backoff. Requests which may have reached the
+    remote (timed out, disconnected or failed by the remote) aren't retried,
+    as the remote might have sent the command already.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        host: str,
+        timeout=REQUEST_TIMEOUT,
+        attempts=REQUEST_ATTEMPTS,
+        backoff=RETRY_BACKOFF,
+        limit=CONCURRENT_REQUESTS,
+    ):
+        self._session = session
+        self._url = "http://" + host
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._attempts = attempts
+        self._backoff = backoff
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def async_get(self, path: str):
+        """Send GET request to the remote, raise an error if it failed."""
+        url = self._url + path
+        async with self._semaphore:
+            for attempt in range(self._attempts):
+                if attempt:
+                    await asyncio.sleep(self._backoff * 2 ** (attempt - 1))
+                try:
+                    async with self._session.get(
+                        url, timeout=self._timeout
+                    ) as response:
+                        response.raise_for_status()
+                        await response.read()
+                        return
+                except aiohttp.ClientConnectorError as e:
+                    if attempt + 1 == self._attempts:
+                        raise
+                    _LOGGER.debug("Request '%s' failed, retrying: %s", url, repr(e))
@@ -1,5 +1,5 @@
-import asyncio
 import logging
+from collections.abc import Mapping
 
 import voluptuous as vol
 
@@ -13,6 +13,7 @@ from homeassistant.core import HomeAssistant, Event, EventStateChangedData
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.typing import ConfigType
+from .lazy_commands import CommandsOverlay
 from .smartir_entity import load_device_data_file, SmartIR, PLATFORM_SCHEMA
 
 _LOGGER = logging.getLogger(__name__)
@@ -20,6 +21,8 @@ _LOGGER = logging.getLogger(__name__)
 DEFAULT_NAME = "SmartIR Media Player"
 DEFAULT_DEVICE_CLASS = "tv"
 
+CHANNEL_MACROS_SIZE = 256
+
 CONF_SOURCE_NAMES = "source_names"
 CONF_DEVICE_CLASS = "device_class"
 
@@ -51,7 +54,19 @@ async def async_setup_platform(
     async_add_entities([SmartIRMediaPlayer(hass, config, device_data)])
 
 
-class SmartIRMediaPlayer(MediaPlayerEntity, RestoreEntity):
+def rename_sources(sources, source_names):
+    """Return a copy of the sources renamed, sources renamed to None are removed."""
+    sources = dict(sources)
+    for source, new_name in source_names.items():
+        if source in sources:
+            if new_name is not None:
+                sources[new_name] = sources[source]
+
+            del sources[source]
+    return sources
+
+
+class SmartIRMediaPlayer(SmartIR, MediaPlayerEntity, RestoreEntity):
 
     def __init__(self, hass: HomeAssistant, config: ConfigType, device_data):
         # Initialize SmartIR device
@@ -63,6 +78,10 @@ class SmartIRMediaPlayer(MediaPlayerEntity, RestoreEntity):
         self._source = None
         self._support_flags = 0
 
+        # IR codes of the channel numbers digits
+        self._channel_macros = {}
+        self._channel_macros_generation = getattr(self._commands, "generation", 0)
+
         # Supported features
         if "off" in self._commands and self._commands["off"] is not None:
             self._support_flags = (
@@ -107,14 +126,16 @@ class SmartIRMediaPlayer(MediaPlayerEntity, RestoreEntity):
                 | MediaPlayerEntityFeature.PLAY_MEDIA
             )
 
-            for source, new_name in config.get(CONF_SOURCE_NAMES, {}).items():
-                if source in self._commands["sources"]:
-                    if new_name is not None:
-                        self._commands["sources"][new_name] = self._commands["sources"][
-                            source
-                        ]
-
-                    del self._commands["sources"][source]
+            source_names = config.get(CONF_SOURCE_NAMES, {})
+            if source_names:
+                # device data are shared with other entities, so the renamed
+                # sources are kept in an overlay of the shared commands
+                self._commands = CommandsOverlay(
+                    self._commands,
+                    lambda commands: {
+                        "sources": rename_sources(commands["sources"], source_names)
+                    },
+                )
 
             # Sources list
             for key in self._commands["sources"]:
@@ -165,6 +186,7 @@ class SmartIRMediaPlayer(MediaPlayerEntity, RestoreEntity):
             "supported_models": self._supported_models,
             "supported_controller": self._supported_controller,
             "commands_encoding": self._commands_encoding,
+            "sends_suppressed": self._send_filter.suppressed,
         }
 
     async def async_turn_off(self):
@@ -177,23 +199,23 @@ class SmartIRMediaPlayer(MediaPlayerEntity, RestoreEntity):
 
     async def async_media_previous_track(self):
         """Send previous track command."""
-        await self._send_command(self._state, [["previousChannel"]])
+        await self._send_command(self._state, [["previousChannel"]], False)
 
     async def async_media_next_track(self):
         """Send next track command."""
-        await self._send_command(self._state, [["nextChannel"]])
+        await self._send_command(self._state, [["nextChannel"]], False)
 
     async def async_volume_down(self):
         """Turn volume down for media player."""
-        await self._send_command(self._state, [["volumeDown"]])
+        await self._send_command(self._state, [["volumeDown"]], False)
 
     async def async_volume_up(self):
         """Turn volume up for media player."""
-        await self._send_command(self._state, [["volumeUp"]])
+        await self._send_command(self._state, [["volumeUp"]], False)
 
     async def async_mute_volume(self, mute):
         """Mute the volume."""
-        await self._send_command(self._state, [["mute"]])
+        await self._send_command(self._state, [["mute"]], False)
 
     async def async_select_source(self, source):
         """Select channel from source."""
@@ -210,12 +232,66 @@ class SmartIRMediaPlayer(MediaPlayerEntity, RestoreEntity):
             return
 
         self._source = "Channel {}".format(media_id)
-        commands = []
-        for digit in media_id:
-            commands.append(["sources", "Channel {}".format(digit)])
-        await self._send_command(STATE_ON, commands)
+        if (codes := self._channel_macro(media_id)) is not None:
+            await self._send_codes(STATE_ON, codes)
+
+    def _channel_macro(self, media_id):
+        """Return cached IR codes of the channel number digits."""
+        generation = getattr(self._commands, "generation", 0)
+        if generation != self._channel_macros_generation:
+            # commands were reloaded
+            self._channel_macros.clear()
+            self._channel_macros_generation = generation
+
+        if (codes := self._channel_macros.get(media_id)) is None:
+            codes = self._resolve_codes(
+                [["sources", "Channel {}".format(digit)] for digit in media_id]
+            )
+            if codes is None:
+                return None
+            if len(self._channel_macros) >= CHANNEL_MACROS_SIZE:
+                self._channel_macros.clear()
+            self._channel_macros[media_id] = codes
+        return codes
+
+    def _resolve_codes(self, commands):
+        """Return IR codes of the commands key paths, None if any is missing."""
+        codes = []
+        for keys in commands:
+            data = self._commands
+            for idx in range(len(keys)):
+                if not (isinstance(data, Mapping) and keys[idx] in data):
+                    _LOGGER.error(
+                        "Missing device IR code for '%s' command.",
+                        keys[idx],
+                    )
+                    return None
+                elif idx + 1 == len(keys):
+                    if not isinstance(data[keys[idx]], str):
+                        _LOGGER.error(
+                            "Missing device IR code for '%s' command.",
+                            keys[idx],
+                        )
+                        return None
+                    else:
+                        codes.append(data[keys[idx]])
+                elif isinstance(data[keys[idx]], Mapping):
+                    data = data[keys[idx]]
+                else:
+                    _LOGGER.error(
+                        "Missing device IR code for '%s' command.",
+                        keys[idx],
+                    )
+                    return None
+        return codes
+
+    async def _send_command(self, state, commands, absolute=True):
+        codes = []
+        if state != STATE_OFF and (codes := self._resolve_codes(commands)) is None:
+            return
+        await self._send_codes(state, codes, absolute)
 
-    async def _send_command(self, state, commands):
+    async def _send_codes(self, state, codes, absolute=True):
         async with self._temp_lock:
 
             if self._power_sensor and self._state != state:
@@ -240,8 +316,9 @@ class SmartIRMediaPlayer(MediaPlayerEntity, RestoreEntity):
                             )
                         else:
                             _LOGGER.debug("Found 'off' operation mode command.")
-                            await self._controller.send(self._commands["off"])
-                            await asyncio.sleep(self._delay)
+                            await self._async_send_sequence(
+                                [self._commands["off"]], STATE_OFF
+                            )
                     else:
                         _LOGGER.error("Missing device IR code for 'off' mode.")
                         return
@@ -264,36 +341,9 @@ class SmartIRMediaPlayer(MediaPlayerEntity, RestoreEntity):
                         else:
                             # if on code is not present, the on bit can be still set later in the all operation/fan codes"""
                             _LOGGER.debug("Found 'on' operation mode command.")
-                            await self._controller.send(self._commands["on"])
-                            await asyncio.sleep(self._delay)
-
-                    for keys in commands:
-                        data = self._commands
-                        for idx in range(len(keys)):
-                            if not (isinstance(data, dict) and keys[idx] in data):
-                                _LOGGER.error(
-                                    "Missing device IR code for '%s' command.",
-                                    keys[idx],
-                                )
-                                return
-                            elif idx + 1 == len(keys):
-                                if not isinstance(data[keys[idx]], str):
-                                    _LOGGER.error(
-                                        "Missing device IR code for '%s' command.",
-                                        keys[idx],
-                                    )
-                                    return
-                                else:
-                                    await self._controller.send(data[keys[idx]])
-                                    await asyncio.sleep(self._delay)
-                            elif isinstance(data[keys[idx]], dict):
-                                data = data[keys[idx]]
-                            else:
-                                _LOGGER.error(
-                                    "Missing device IR code for '%s' command.",
-                                    keys[idx],
-                                )
-                                return
+                            codes = [self._commands["on"], *codes]
+
+                    await self._async_send_sequence(codes, state if absolute else None)
 
                 self._state = state
                 self._on_by_remote = False
@@ -0,0 +1,59 @@
+import time
+
+
+class RedundantSendFilter:
+    """Last state codes sent by an entity.
+
+    State codes, which set an absolute device state, are redundant if they
+    set the same on/off state by the same codes as the last state codes sent
+    within the max age. Relative codes (like volume up) change the device
+    state in an unknown way, so the following state codes are never
+    redundant. Disabled filter, without max age, finds no codes redundant,
+    but still remembers the last state codes.
+    """
+
+    def __init__(self, max_age=None, clock=time.monotonic):
+        self._max_age = max_age
+        self._clock = clock
+        self._state = None
+        self._codes = None
+        self._sent_at = None
+        self._suppressed = 0
+
+    def is_redundant(self, state, codes) -> bool:
+        """Return if the state codes repeat the last ones, counting them."""
+        if (
+            self._max_age is None
+            or self._sent_at is None
+            or self._clock() - self._sent_at > self._max_age
+            or state != self._state
+            or codes != self._codes
+        ):
+            return False
+        self._suppressed += 1
+        return True
+
+    def update(self, state, codes):
+        """Remember the sent state codes and the state they set."""
+        self._state = state
+        self._codes = list(codes)
+        self._sent_at = self._clock()
+
+    def invalidate(self):
+        """Forget when the state codes were sent, after relative codes."""
+        self._sent_at = None
+
+    @property
+    def state(self):
+        """State set by the last sent state codes."""
+        return self._state
+
+    @property
+    def codes(self):
+        """Last sent state codes, None if no state codes were sent."""
+        return self._codes
+
+    @property
+    def suppressed(self) -> int:
+        """Number of redundant state codes which weren't sent."""
+        return self._suppressed
@@ -0,0 +1,96 @@
+import logging
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.service import async_extract_entity_ids
+
+from .const import DOMAIN, DATA_ENTITIES
+from .controller import get_transcode_cache, get_transmitter_scheduler
+from .device_cache import get_code_store, get_device_cache, get_validation_cache
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_CLEAR_VALIDATION_CACHE = "clear_validation_cache"
+SERVICE_CODE_STORE_STATISTICS = "code_store_statistics"
+SERVICE_FORCE_RESEND = "force_resend"
+SERVICE_RELOAD_CODES = "reload_codes"
+SERVICE_TRANSCODE_CACHE_STATISTICS = "transcode_cache_statistics"
+SERVICE_TRANSMITTER_STATISTICS = "transmitter_statistics"
+
+
+def get_entities(hass):
+    """Return the SmartIR entities added to Home Assistant by entity id."""
+    data = hass.data.setdefault(DOMAIN, {})
+    if DATA_ENTITIES not in data:
+        data[DATA_ENTITIES] = {}
+    return data[DATA_ENTITIES]
+
+
+@callback
+def async_setup_services(hass: HomeAssistant):
+    """Register the SmartIR services, if not registered yet."""
+    if hass.services.has_service(DOMAIN, SERVICE_CLEAR_VALIDATION_CACHE):
+        return
+
+    async def async_clear_validation_cache(service: ServiceCall) -> None:
+        await get_validation_cache(hass).async_clear()
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_CLEAR_VALIDATION_CACHE, async_clear_validation_cache
+    )
+
+    async def async_code_store_statistics(service: ServiceCall) -> ServiceResponse:
+        return get_code_store(hass).statistics()
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_CODE_STORE_STATISTICS,
+        async_code_store_statistics,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def async_force_resend(service: ServiceCall) -> None:
+        entities = get_entities(hass)
+        for entity_id in await async_extract_entity_ids(hass, service):
+            if (entity := entities.get(entity_id)) is not None:
+                await entity.async_force_resend()
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_FORCE_RESEND,
+        async_force_resend,
+        schema=cv.make_entity_service_schema({}),
+    )
+
+    async def async_reload_codes(service: ServiceCall) -> None:
+        await get_device_cache(hass).async_reload(hass)
+
+    hass.services.async_register(DOMAIN, SERVICE_RELOAD_CODES, async_reload_codes)
+
+    async def async_transcode_cache_statistics(
+        service: ServiceCall,
+    ) -> ServiceResponse:
+        return get_transcode_cache(hass).statistics()
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_TRANSCODE_CACHE_STATISTICS,
+        async_transcode_cache_statistics,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def async_transmitter_statistics(service: ServiceCall) -> ServiceResponse:
+        return get_transmitter_scheduler(hass).statistics()
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_TRANSMITTER_STATISTICS,
+        async_transmitter_statistics,
+        supports_response=SupportsResponse.ONLY,
+    )
@@ -10,13 +10,17 @@ from homeassistant.helpers.event import async_track_state_change_event, async_ca
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.typing import ConfigType
 
-from .device_data import DeviceData
-from .controller import get_controller, get_controller_schema
+from .device_cache import get_device_cache, get_device_index
+from .send_filter import RedundantSendFilter
+from .services import async_setup_services, get_entities
+from .controller import get_controller, get_controller_schema, get_pretranscoder
+from .controller_const import CONTROLLER_CONF
 
 _LOGGER = logging.getLogger(__name__)
 
 DEFAULT_DELAY = 0.5
 DEFAULT_POWER_SENSOR_DELAY = 10
+DEFAULT_SKIP_UNCHANGED_MAX_AGE = 300
 
 CONF_UNIQUE_ID = "unique_id"
 CONF_DEVICE_CODE = "device_code"
@@ -25,6 +29,8 @@ CONF_DELAY = "delay"
 CONF_POWER_SENSOR = "power_sensor"
 CONF_POWER_SENSOR_DELAY = "power_sensor_delay"
 CONF_POWER_SENSOR_RESTORE_STATE = "power_sensor_restore_state"
+CONF_SKIP_UNCHANGED = "skip_unchanged"
+CONF_SKIP_UNCHANGED_MAX_AGE = "skip_unchanged_max_age"
 
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
     {
@@ -37,10 +43,24 @@ PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
             CONF_POWER_SENSOR_DELAY, default=DEFAULT_POWER_SENSOR_DELAY
         ): cv.positive_int,
         vol.Optional(CONF_POWER_SENSOR_RESTORE_STATE, default=True): cv.boolean,
+        vol.Optional(CONF_SKIP_UNCHANGED, default=False): cv.boolean,
+        vol.Optional(
+            CONF_SKIP_UNCHANGED_MAX_AGE, default=DEFAULT_SKIP_UNCHANGED_MAX_AGE
+        ): cv.positive_int,
     }
 )
 
 
+def find_device_file(device_index, device_class, device_code):
+    """Look up device file in the index, doesn't run in the event loop."""
+    custom_files_absdir = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "custom_codes", device_class
+    )
+    if not os.path.isdir(custom_files_absdir):
+        os.makedirs(custom_files_absdir)
+    return device_index.lookup(device_class, device_code)
+
+
 @staticmethod
 async def load_device_data_file(config, device_class, check_data, hass):
     device_code = config.get(CONF_DEVICE_CODE)
@@ -48,67 +68,59 @@ async def load_device_data_file(config, device_class, check_data, hass):
     """Load device JSON file."""
     device_json_file_name = str(device_code) + ".json"
 
-    device_files_subdir = os.path.join("custom_codes", device_class)
-    device_files_absdir = os.path.join(
-        os.path.dirname(os.path.abspath(__file__)), device_files_subdir
-    )
-    if os.path.isdir(device_files_absdir):
-        device_json_file_path = os.path.join(device_files_absdir, device_json_file_name)
-        if os.path.exists(device_json_file_path):
-            _LOGGER.debug(
-                "Loading custom %s device JSON file '%s'.",
-                device_class,
-                device_json_file_name,
-            )
-            device_data = await hass.async_add_executor_job(
-                DeviceData.read_file_as_json, device_json_file_path
-            )
-            if await DeviceData.check_file(
-                device_json_file_name,
-                device_data,
-                device_class,
-                check_data,
-            ):
-                return device_data
-            else:
-                return None
-    else:
-        os.makedirs(device_files_absdir)
+    async_setup_services(hass)
 
-    device_files_subdir = os.path.join("codes", device_class)
-    device_files_absdir = os.path.join(
-        os.path.dirname(os.path.abspath(__file__)), device_files_subdir
+    # parsed and validated device data are shared by all entities
+    device_cache = get_device_cache(hass)
+
+    entry = await hass.async_add_executor_job(
+        find_device_file, get_device_index(hass), device_class, device_code
     )
-    if os.path.isdir(device_files_absdir):
-        device_json_file_path = os.path.join(device_files_absdir, device_json_file_name)
-        if os.path.exists(device_json_file_path):
-            _LOGGER.debug(
-                "Loading %s device JSON file '%s'.",
-                device_class,
-                device_json_file_name,
-            )
-            device_data = await hass.async_add_executor_job(
-                DeviceData.read_file_as_json, device_json_file_path
-            )
-            if await DeviceData.check_file(
-                device_json_file_name,
-                device_data,
-                device_class,
-                check_data,
-            ):
-                return device_data
-            else:
-                return None
-        else:
-            _LOGGER.error(
-                "Device JSON file '%s' doesn't exists!", device_json_file_name
-            )
-    else:
-        _LOGGER.error(
-            "Devices JSON files directory '%s' doesn't exists!", device_files_absdir
+    if entry is None:
+        _LOGGER.error("Device JSON file '%s' doesn't exists!", device_json_file_name)
+        return None
+
+    _LOGGER.debug(
+        "Loading %s device JSON file '%s'.",
+        device_class,
+        entry["path"],
+    )
+    device_data = await device_cache.async_get(
+        hass, device_class, device_code, entry["path"], check_data
+    )
+
+    # commands of other controllers are converted for the configured one
+    controller_data = config.get(CONF_CONTROLLER_DATA)
+    controller = controller_data[CONTROLLER_CONF["CONTROLLER_TYPE"]]
+    if device_data is not None and device_data["supportedController"] != controller:
+        _LOGGER.debug(
+            "Converting %s device JSON file '%s' commands for %s controller.",
+            device_class,
+            entry["path"],
+            controller,
+        )
+        device_data = await device_cache.async_transcode(
+            hass, device_class, device_code, controller
+        )
+    elif device_data is not None and (
+        transcoder := get_pretranscoder(
+            controller, device_data["commandsEncoding"], controller_data
+        )
+    ):
+        _LOGGER.debug(
+            "Transcoding %s device JSON file '%s' commands in advance.",
+            device_class,
+            entry["path"],
+        )
+        device_data = await device_cache.async_transcode(
+            hass, device_class, device_code, controller, transcoder
         )
 
-    return None
+    if device_data is not None and device_class != "climate":
+        # entities read their commands in the event loop, which must not wait
+        # for the device file, climate reads them through its command index
+        await hass.async_add_executor_job(device_data["commands"].preload)
+    return device_data
 
 
 class SmartIR:
@@ -146,6 +158,13 @@ class SmartIR:
         # Init exclusive lock for sending IR commands
         self._temp_lock = asyncio.Lock()
 
+        # Skip sending of the same state codes again, if enabled
+        self._send_filter = RedundantSendFilter(
+            config.get(CONF_SKIP_UNCHANGED_MAX_AGE)
+            if config.get(CONF_SKIP_UNCHANGED)
+            else None
+        )
+
         # Init the IR/RF controller
         self._controller = get_controller(
             self.hass,
@@ -155,6 +174,7 @@ class SmartIR:
         )
 
     async def async_added_to_hass(self):
+        get_entities(self.hass)[self.entity_id] = self
         last_state = await self.async_get_last_state()
 
         if last_state is not None:
@@ -171,6 +191,45 @@ class SmartIR:
                 self.hass, self._power_sensor, self._async_power_sensor_changed
             )
 
+    async def async_will_remove_from_hass(self):
+        get_entities(self.hass).pop(self.entity_id, None)
+
+    def _power_toggle(self):
+        """Return if the device is turned on and off by the same code."""
+        return "on" in self._commands and self._commands["on"] == self._commands.get(
+            "off"
+        )
+
+    async def _async_send_sequence(self, codes, state=None, force=False):
+        """Send codes, skipping state codes equal to the last sent ones.
+
+        State codes set the device on/off state. Relative codes (state None),
+        like volume up, and forced codes are always sent, as well as codes of
+        devices toggled on and off by the same code.
+        """
+        if state is None:
+            await self._controller.send_sequence(codes, self._delay)
+            self._send_filter.invalidate()
+        elif (
+            not force
+            and not self._power_toggle()
+            and self._send_filter.is_redundant(state, codes)
+        ):
+            _LOGGER.debug(
+                "Skipping sending of the same codes as the last sent ones to '%s'.",
+                self._name,
+            )
+        else:
+            await self._controller.send_sequence(codes, self._delay)
+            self._send_filter.update(state, codes)
+
+    async def async_force_resend(self):
+        """Send the last state codes again, even if they are redundant."""
+        if (codes := self._send_filter.codes) is None:
+            return
+        async with self._temp_lock:
+            await self._async_send_sequence(codes, self._send_filter.state, True)
+
     async def _async_power_sensor_changed(
         self, event: Event[EventStateChangedData]
     ) -> None:
@@ -183,6 +242,9 @@ class SmartIR:
         if old_state is not None and new_state.state == old_state.state:
             return
 
+        # the device state was possibly changed by its own remote
+        self._send_filter.invalidate()
+
         if new_state.state == STATE_ON and self._state != STATE_ON:
             self._state = STATE_ON
             self._on_by_remote = True
@@ -194,6 +256,10 @@ class SmartIR:
                 await self._async_update_hvac_action()
         self.async_write_ha_state()
 
+    async def _async_update_hvac_action(self):
+        """Update the HVAC action, only climate entities have it."""
+        pass
+
     @callback
     def _async_power_sensor_check_schedule(self, state):
         if self._power_sensor_check_cancel:
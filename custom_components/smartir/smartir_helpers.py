@@ -1,3 +1,6 @@
+from bisect import bisect_left, bisect_right
+
+
 # round to given precision
 @staticmethod
 def precision_round(number, precision):
@@ -43,3 +46,63 @@ def closest_match_value(value, list):
         return temp[0]
     else:
         return None
+
+
+class ClosestMatch:
+    """Numeric values of keys sorted for O(log n) closest match lookups.
+
+    Lookups return the same results as closest_match_value and
+    closest_match_index, but the keys are converted and sorted only once.
+    """
+
+    def __init__(self, keys):
+        self._keys = list(keys or [])
+        self._numbers = [float(key) for key in self._keys]
+        self._ascending = all(
+            lo <= hi for lo, hi in zip(self._numbers, self._numbers[1:])
+        )
+
+        # the same number of several keys resolves to the first one of them
+        first = {}
+        for position, (number, key) in enumerate(zip(self._numbers, self._keys)):
+            first.setdefault(number, (position, key))
+        self._sorted = sorted(first)
+        self._sorted_keys = [first[number] for number in self._sorted]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def value(self, value):
+        """Return the key with the closest value, the first one of equally close."""
+        if value is None or not self._keys:
+            return None
+
+        index = bisect_left(self._sorted, value)
+        if index == 0:
+            return self._sorted_keys[0][1]
+        if index == len(self._sorted):
+            return self._sorted_keys[-1][1]
+
+        diff_lo = value - self._sorted[index - 1]
+        diff_hi = self._sorted[index] - value
+        if diff_lo < diff_hi:
+            return self._sorted_keys[index - 1][1]
+        if diff_hi < diff_lo:
+            return self._sorted_keys[index][1]
+        return min(self._sorted_keys[index - 1], self._sorted_keys[index])[1]
+
+    def index(self, value):
+        """Return position of the closest key, the higher one of equally close."""
+        if not self._ascending:
+            return closest_match_index(value, self._numbers)
+
+        index = bisect_right(self._numbers, value or 0)
+        if index == len(self._numbers):
+            return len(self._numbers) - 1
+        if index == 0:
+            return 0
+        diff_lo = value - self._numbers[index - 1]
+        diff_hi = self._numbers[index] - value
+        if diff_lo < diff_hi:
+            return index - 1
+        return index
@@ -0,0 +1,145 @@
+"""Conversion of device commands between the controllers.
+
+Commands are decoded from the encoding of the device file controller into
+pulses and encoded again for the configured controller. The whole commands
+tree is converted once when the device file is loaded, so converted commands
+are sent as they are.
+"""
+
+from base64 import b64decode, b64encode
+from collections.abc import Mapping
+import json
+
+from .controller_const import (
+    BROADLINK_CONTROLLER,
+    XIAOMI_CONTROLLER,
+    LOOKIN_CONTROLLER,
+    ESPHOME_CONTROLLER,
+    UFOR11_CONTROLLER,
+    ENC_BASE64,
+    ENC_HEX,
+    ENC_PRONTO,
+    ENC_RAW,
+)
+from .ir_codec import (
+    broadlink_to_pulses,
+    pronto_to_pulses,
+    pulses_to_broadlink,
+    pulses_to_pronto,
+    pulses_to_raw,
+    pulses_to_tuya,
+    raw_to_pulses,
+    tuya_to_pulses,
+)
+from .lazy_commands import LazyCommands
+
+# space closing the Pronto codes which end with a mark
+PRONTO_TRAILING_SPACE = 100000
+
+# marker of commands which can't be converted
+DROPPED = object()
+
+
+def _decode_broadlink(packet: bytes) -> list:
+    # repeated packets are sent repeat + 1 times
+    return broadlink_to_pulses(packet) * (packet[1] + 1)
+
+
+def _decode_pronto(command: str) -> list:
+    return pronto_to_pulses(bytes.fromhex(command.replace(" ", "")))
+
+
+def _encode_pronto(pulses) -> str:
+    if len(pulses) % 2:
+        pulses = [*pulses, PRONTO_TRAILING_SPACE]
+    return pulses_to_pronto(pulses).hex().upper()
+
+
+DECODERS = {
+    (BROADLINK_CONTROLLER, ENC_BASE64): lambda command: _decode_broadlink(
+        # some learned codes miss their padding
+        b64decode(command + "=" * (-len(command) % 4))
+    ),
+    (BROADLINK_CONTROLLER, ENC_HEX): lambda command: _decode_broadlink(
+        bytes.fromhex(command)
+    ),
+    (BROADLINK_CONTROLLER, ENC_PRONTO): _decode_pronto,
+    (XIAOMI_CONTROLLER, ENC_PRONTO): _decode_pronto,
+    (LOOKIN_CONTROLLER, ENC_PRONTO): _decode_pronto,
+    (LOOKIN_CONTROLLER, ENC_RAW): lambda command: raw_to_pulses(
+        int(duration) for duration in command.split()
+    ),
+    (ESPHOME_CONTROLLER, ENC_RAW): lambda command: raw_to_pulses(json.loads(command)),
+    (UFOR11_CONTROLLER, ENC_RAW): lambda command: tuya_to_pulses(b64decode(command)),
+}
+
+ENCODERS = {
+    BROADLINK_CONTROLLER: (
+        ENC_BASE64,
+        lambda pulses: b64encode(pulses_to_broadlink(pulses)).decode("utf-8"),
+    ),
+    XIAOMI_CONTROLLER: (ENC_PRONTO, _encode_pronto),
+    LOOKIN_CONTROLLER: (
+        ENC_RAW,
+        lambda pulses: " ".join(map(str, pulses_to_raw(pulses))),
+    ),
+    ESPHOME_CONTROLLER: (
+        ENC_RAW,
+        lambda pulses: json.dumps(pulses_to_raw(pulses)),
+    ),
+    UFOR11_CONTROLLER: (
+        ENC_RAW,
+        lambda pulses: b64encode(pulses_to_tuya(pulses)).decode("utf-8"),
+    ),
+}
+
+
+def get_transcoder(controller, encoding, target_controller):
+    """Return target encoding and function converting commands to it.
+
+    Returns None if the commands can't be converted.
+    """
+    decode = DECODERS.get((controller, encoding))
+    if decode is None or target_controller not in ENCODERS:
+        return None
+    target_encoding, encode = ENCODERS[target_controller]
+    return target_encoding, lambda command: encode(decode(command))
+
+
+def transcode_commands(commands, transcode, report, code_store=None):
+    """Return commands with the whole commands tree converted.
+
+    Commands which can't be converted are dropped and their errors are passed
+    to the report function, so a wrong encoding is never sent. All lazy
+    subtrees are loaded, so it doesn't run in the event loop.
+    """
+    converted = {}
+    errors = {}
+
+    def convert(node):
+        if isinstance(node, Mapping):
+            result = {}
+            for key, value in node.items():
+                if (value := convert(value)) is not DROPPED:
+                    result[key] = value
+            return result
+        if isinstance(node, list):
+            values = [convert(value) for value in node]
+            return DROPPED if any(value is DROPPED for value in values) else values
+        if not isinstance(node, str):
+            return node
+        # codes repeated across the modes are converted only once
+        if (value := converted.get(node)) is None:
+            try:
+                value = transcode(node)
+            except Exception as e:
+                errors[node] = e
+                value = DROPPED
+            converted[node] = value
+        return value
+
+    tree = convert(commands)
+    if errors:
+        report(errors)
+    # nothing is lazy, lazy commands only let reload replace the converted tree
+    return LazyCommands(tree, set(), None, code_store=code_store)
@@ -0,0 +1,118 @@
+import asyncio
+from collections import OrderedDict, deque
+
+
+class Transmitter:
+    """Serialized access to a single IR/RF transmitter.
+
+    Emissions are run one at a time. Waiting clients (usually entities) are
+    served round robin, every client in the order of its requests, so busy
+    entities don't starve the others sharing the transmitter. Spacing is
+    enforced as a deadline: the emission returns right after it is sent and
+    only the next emission waits until the gap after the previous one passes.
+    Used only in the event loop.
+    """
+
+    def __init__(self):
+        # client: deque of futures of waiting emissions
+        self._waiting = OrderedDict()
+        self._busy = False
+        self._ready_at = 0
+        self._depth = 0
+        self._max_depth = 0
+        self._emissions = 0
+        self._wait_total = 0
+        self._wait_max = 0
+
+    async def async_emit(self, client, emit, gap=0):
+        """Run the emit coroutine function exclusively on the transmitter.
+
+        The next emission doesn't start before the gap after this one passes.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        if self._busy:
+            future = loop.create_future()
+            self._waiting.setdefault(client, deque()).append(future)
+            self._depth += 1
+            self._max_depth = max(self._max_depth, self._depth)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # cancelled after the transmitter was passed over
+                    self._release()
+                else:
+                    self._remove(client, future)
+                raise
+        else:
+            self._busy = True
+
+        wait = loop.time() - start
+        self._emissions += 1
+        self._wait_total += wait
+        self._wait_max = max(self._wait_max, wait)
+        try:
+            if (delay := self._ready_at - loop.time()) > 0:
+                await asyncio.sleep(delay)
+            return await emit()
+        finally:
+            # keep the previous deadline when cancelled while waiting for it
+            self._ready_at = max(self._ready_at, loop.time() + gap)
+            self._release()
+
+    def _remove(self, client, future):
+        queue = self._waiting[client]
+        queue.remove(future)
+        self._depth -= 1
+        if not queue:
+            del self._waiting[client]
+
+    def _release(self):
+        while self._waiting:
+            client, queue = next(iter(self._waiting.items()))
+            future = queue.popleft()
+            self._depth -= 1
+            if queue:
+                self._waiting.move_to_end(client)
+            else:
+                del self._waiting[client]
+            if not future.done():
+                future.set_result(None)
+                return
+        self._busy = False
+
+    def statistics(self) -> dict:
+        """Return queue depth, number of emissions and their wait times."""
+        return {
+            "queue_depth": self._depth,
+            "max_queue_depth": self._max_depth,
+            "emissions": self._emissions,
+            "wait_average": (
+                self._wait_total / self._emissions if self._emissions else 0
+            ),
+            "wait_max": self._wait_max,
+        }
+
+
+class TransmitterScheduler:
+    """Transmitters shared by all entities, keyed by transmitter identity.
+
+    Emissions of different transmitters run in parallel.
+    """
+
+    def __init__(self):
+        self._transmitters = {}
+
+    def get(self, name: str) -> Transmitter:
+        """Return the transmitter, creating it on the first use."""
+        if (transmitter := self._transmitters.get(name)) is None:
+            transmitter = self._transmitters[name] = Transmitter()
+        return transmitter
+
+    def statistics(self) -> dict:
+        """Return statistics of all transmitters."""
+        return {
+            name: transmitter.statistics()
+            for name, transmitter in self._transmitters.items()
+        }
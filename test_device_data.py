@@ -1,9 +1,14 @@
-import asyncio
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import os
 import pathlib
 import json
 import sys
+import time
 
 from custom_components.smartir.device_data import DeviceData
+from custom_components.smartir.device_index import DeviceIndex, index_entry
 
 CHECK_DATA = {
     "climate": {
@@ -14,57 +19,168 @@ CHECK_DATA = {
     "light": {},
 }
 
+MANIFEST_FILE = ".device_data_manifest.json"
 
-async def test_json(file_path, docs):
+# manifest results are invalidated by any change of the validator
+VALIDATOR_FILES = [
+    "custom_components/smartir/device_data.py",
+    "custom_components/smartir/controller_const.py",
+    "custom_components/smartir/smartir_helpers.py",
+    "custom_components/smartir/device_index.py",
+]
+
+SLOWEST_FILES = 5
+
+
+def validator_digest():
+    digest = hashlib.sha1()
+    for file_path in VALIDATOR_FILES:
+        with open(file_path, "rb") as file:
+            digest.update(file.read())
+    digest.update(json.dumps(CHECK_DATA, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def test_json(file_path):
+    """Validate device file, return its verdict, index entry and duration."""
+    start = time.perf_counter()
     p = pathlib.Path(file_path)
     path = p.parts
     if path[0] != "codes" and path[0] != "custom_codes":
-        return True
+        return True, None, 0
     file_name = path[-1]
     device_class = path[-2]
-    if device_data := DeviceData.read_file_as_json(file_path):
-        if result := await DeviceData.check_file(
+
+    with open(file_path, "rb") as file:
+        stat = os.fstat(file.fileno())
+        data = file.read()
+    try:
+        device_data = json.loads(data)
+    except ValueError as e:
+        print("Error opening device JSON file '%s': '%s'." % (file_path, e))
+        device_data = None
+    entry = index_entry(file_path, stat, hashlib.sha1(data).hexdigest(), device_data)
+
+    valid = bool(
+        device_data
+        and DeviceData.check_file(
             file_name,
             device_data,
             device_class,
-            CHECK_DATA[device_class],
-        ):
-            docs[device_class].append(
-                {
-                    "file": file_name,
-                    "manufacturer": device_data["manufacturer"],
-                    "models": ", ".join(device_data["supportedModels"]),
-                    "controller": device_data["supportedController"],
-                }
-            )
-            return True
-    return False
+            dict(CHECK_DATA[device_class]),
+        )
+    )
+    return valid, entry, time.perf_counter() - start
+
+
+def docs_entry(entry):
+    return {
+        "file": os.path.basename(entry["path"]),
+        "manufacturer": entry["manufacturer"],
+        "models": ", ".join(entry["models"]),
+        "controller": entry["controller"],
+    }
+
 
+def load_manifest(manifest_file, validator):
+    """Return device files index and validation verdicts of the manifest.
+
+    Verdicts of another validator are dropped, the index is kept.
+    """
+    try:
+        with open(manifest_file, "r") as file:
+            manifest = json.load(file)
+        index = DeviceIndex.load([], manifest["index"])
+        if manifest.get("validator") == validator:
+            return index, manifest["verdicts"]
+        return index, {}
+    except (OSError, ValueError, KeyError):
+        return DeviceIndex([]), {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate SmartIR device files.")
+    parser.add_argument(
+        "--docs", action="store_true", help="generate docs/*_codes.json files"
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="number of parallel validation processes"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="validate only files changed since the previous run",
+    )
+    parser.add_argument("--manifest", default=MANIFEST_FILE, help="manifest file path")
+    parser.add_argument("files", nargs="*")
+    args = parser.parse_args()
 
-async def main():
     exit = 0
-    generate_docs = False
     docs = {"climate": [], "fan": [], "media_player": [], "light": []}
 
-    files = sys.argv
-    files.pop(0)
-    if not len(files):
+    if not len(args.files):
         sys.exit(0)
-    if files[0] == "--docs":
-        files.pop(0)
-        generate_docs = True
 
-    if len(files):
-        for file_path in files:
-            if not await test_json(file_path, docs):
-                exit = 1
+    validator = validator_digest()
+    # docs are generated from the index, files are validated again unless
+    # incremental
+    index, verdicts = load_manifest(args.manifest, validator)
+    if not args.incremental:
+        verdicts = {}
+
+    # unchanged files are recognized by the index without reading them
+    pending = []
+    for file_path in args.files:
+        entry = index.cached(file_path)
+        verdict = verdicts.get(file_path)
+        if entry is None or verdict is None or verdict["digest"] != entry["digest"]:
+            pending.append(file_path)
+
+    if args.jobs > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            results = dict(zip(pending, executor.map(test_json, pending, chunksize=4)))
+    else:
+        results = {file_path: test_json(file_path) for file_path in pending}
+
+    timings = []
+    for file_path in args.files:
+        if file_path in results:
+            valid, entry, duration = results[file_path]
+            timings.append((duration, file_path))
+            print(
+                "%8.1fms %-7s %s"
+                % (duration * 1000, "OK" if valid else "INVALID", file_path)
+            )
+            if entry is not None:
+                index.update(entry)
+                verdicts[file_path] = {"digest": entry["digest"], "valid": valid}
+        else:
+            valid = verdicts[file_path]["valid"]
+            print("%10s %-7s %s" % ("cached", "OK" if valid else "INVALID", file_path))
+
+        if not valid:
+            exit = 1
+        elif (entry := index.cached(file_path)) is not None:
+            docs[pathlib.Path(file_path).parts[-2]].append(docs_entry(entry))
+
+    if timings:
+        print("Slowest files:")
+        for duration, file_path in sorted(timings, reverse=True)[:SLOWEST_FILES]:
+            print("%8.1fms %s" % (duration * 1000, file_path))
+
+    with open(args.manifest, "w") as outfile:
+        json.dump(
+            {"validator": validator, "index": index.dump(), "verdicts": verdicts},
+            outfile,
+        )
 
-        if generate_docs:
-            for device_class in docs.keys():
-                with open("docs/" + device_class + "_codes.json", "w") as outfile:
-                    json.dump(docs[device_class], outfile)
+    if args.docs:
+        for device_class in docs.keys():
+            with open("docs/" + device_class + "_codes.json", "w") as outfile:
+                json.dump(docs[device_class], outfile)
 
     sys.exit(exit)
 
 
-asyncio.run(main())
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Helpers of the SmartIR tests."""
+
+import asyncio
+
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.setup import async_setup_component
+
+from .conftest import DEVICE_CODE
+
+REMOTE_ENTITY = "remote.test"
+
+
+async def async_setup_smartir(hass: HomeAssistant, domain: str, **config) -> str:
+    """Set up a SmartIR entity of the platform, return its entity id."""
+    assert await async_setup_component(
+        hass,
+        domain,
+        {
+            domain: {
+                "platform": "smartir",
+                "name": "test",
+                "device_code": DEVICE_CODE,
+                "controller_data": {
+                    "controller_type": "Broadlink",
+                    "remote_entity": REMOTE_ENTITY,
+                },
+                "delay": 0,
+                **config,
+            }
+        },
+    )
+    await hass.async_block_till_done()
+    entity_id = domain + ".test"
+    assert hass.states.get(entity_id) is not None
+    return entity_id
+
+
+class RemoteMock:
+    """Remote send_command service recording the sent codes.
+
+    Sending can be paused to keep the codes in flight.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self.calls = []
+        self.sending = asyncio.Event()
+        self.released = asyncio.Event()
+        self.released.set()
+        hass.services.async_register("remote", "send_command", self._async_send)
+
+    async def _async_send(self, call: ServiceCall):
+        self.calls.append(call.data)
+        self.sending.set()
+        await self.released.wait()
+
+    @property
+    def commands(self) -> list:
+        """Codes of all the service calls."""
+        return [call["command"] for call in self.calls]
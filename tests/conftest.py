@@ -0,0 +1,95 @@
+"""Fixtures of the SmartIR tests."""
+
+import json
+
+import pytest
+
+from custom_components.smartir import device_cache
+
+pytest_plugins = "pytest_homeassistant_custom_component"
+
+CLIMATE_DEVICE = {
+    "manufacturer": "Test",
+    "supportedModels": ["Climate"],
+    "supportedController": "Broadlink",
+    "commandsEncoding": "Base64",
+    "temperatureUnit": "C",
+    "minTemperature": 16,
+    "maxTemperature": 17,
+    "precision": 1,
+    "operationModes": ["heat", "cool"],
+    "fanModes": ["auto"],
+    "commands": {
+        "off_heat": "T0ZGSA==",
+        "off_cool": "T0ZGQw==",
+        "heat": {"auto": {"16": "SDE2", "17": "SDE3"}},
+        "cool": {"auto": {"16": "QzE2", "17": "QzE3"}},
+    },
+}
+
+FAN_DEVICE = {
+    "manufacturer": "Test",
+    "supportedModels": ["Fan"],
+    "supportedController": "Broadlink",
+    "commandsEncoding": "Base64",
+    "speed": ["low", "high"],
+    "commands": {
+        "off": "T0ZG",
+        "default": {"low": "TE9X", "high": "SElHSA=="},
+    },
+}
+
+LIGHT_DEVICE = {
+    "manufacturer": "Test",
+    "supportedModels": ["Light"],
+    "supportedController": "Broadlink",
+    "commandsEncoding": "Base64",
+    "brightness": [128, 255],
+    "colorTemperature": [2700, 6500],
+    "commands": {
+        "on": "T04=",
+        "off": "T0ZG",
+        "brighten": "VVA=",
+        "dim": "RE9XTg==",
+        "night": "TklHSFQ=",
+    },
+}
+
+MEDIA_PLAYER_DEVICE = {
+    "manufacturer": "Test",
+    "supportedModels": ["Media player"],
+    "supportedController": "Broadlink",
+    "commandsEncoding": "Base64",
+    "commands": {
+        "on": "T04=",
+        "off": "T0ZG",
+        "volumeUp": "VVA=",
+        "volumeDown": "RE9XTg==",
+        "sources": {"TV": "VFY="},
+    },
+}
+
+DEVICE_CODE = 9000
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Enable loading of the SmartIR integration."""
+    yield
+
+
+@pytest.fixture(autouse=True)
+def device_files(tmp_path, monkeypatch):
+    """Provide device files of every platform in a temporary directory."""
+    devices = {
+        "climate": CLIMATE_DEVICE,
+        "fan": FAN_DEVICE,
+        "light": LIGHT_DEVICE,
+        "media_player": MEDIA_PLAYER_DEVICE,
+    }
+    for device_class, device_data in devices.items():
+        directory = tmp_path / device_class
+        directory.mkdir()
+        (directory / ("%d.json" % DEVICE_CODE)).write_text(json.dumps(device_data))
+    monkeypatch.setattr(device_cache, "DEVICE_FILES_DIRS", [str(tmp_path)])
+    return devices
@@ -0,0 +1,110 @@
+"""Tests of the SmartIR climate platform."""
+
+import asyncio
+
+from homeassistant.components.climate import (
+    DOMAIN as CLIMATE_DOMAIN,
+    SERVICE_SET_HVAC_MODE,
+    SERVICE_SET_TEMPERATURE,
+    HVACMode,
+)
+from homeassistant.const import (
+    ATTR_ENTITY_ID,
+    ATTR_TEMPERATURE,
+    SERVICE_TURN_OFF,
+    UnitOfTemperature,
+)
+from homeassistant.core import HomeAssistant
+
+from custom_components.smartir.climate import (
+    TemperatureTable,
+    convert_temp,
+    temperature_steps,
+)
+
+from .common import RemoteMock, async_setup_smartir
+
+
+async def test_turn_off_after_merged_mode_change(hass: HomeAssistant) -> None:
+    """Set mode then turn off while a send is in flight."""
+    remote = RemoteMock(hass)
+    entity_id = await async_setup_smartir(hass, CLIMATE_DOMAIN)
+
+    await hass.services.async_call(
+        CLIMATE_DOMAIN,
+        SERVICE_SET_HVAC_MODE,
+        {ATTR_ENTITY_ID: entity_id, "hvac_mode": HVACMode.COOL},
+        blocking=True,
+    )
+    assert remote.commands == [["b64:QzE2"]]
+
+    remote.released.clear()
+    remote.sending.clear()
+    in_flight = hass.async_create_task(
+        hass.services.async_call(
+            CLIMATE_DOMAIN,
+            SERVICE_SET_TEMPERATURE,
+            {ATTR_ENTITY_ID: entity_id, ATTR_TEMPERATURE: 17},
+            blocking=True,
+        )
+    )
+    await remote.sending.wait()
+
+    # merged into a single pending change while the temperature is sent
+    set_mode = hass.async_create_task(
+        hass.services.async_call(
+            CLIMATE_DOMAIN,
+            SERVICE_SET_HVAC_MODE,
+            {ATTR_ENTITY_ID: entity_id, "hvac_mode": HVACMode.HEAT},
+            blocking=True,
+        )
+    )
+    turn_off = hass.async_create_task(
+        hass.services.async_call(
+            CLIMATE_DOMAIN, SERVICE_TURN_OFF, {ATTR_ENTITY_ID: entity_id}, blocking=True
+        )
+    )
+    await asyncio.sleep(0)
+    remote.released.set()
+    await asyncio.gather(in_flight, set_mode, turn_off)
+
+    # heat mode was never sent, so the device is turned off from cool mode
+    assert remote.commands == [["b64:QzE2"], ["b64:QzE3"], ["b64:T0ZGQw=="]]
+    assert hass.states.get(entity_id).state == HVACMode.OFF
+
+    await hass.services.async_call(
+        CLIMATE_DOMAIN, SERVICE_TURN_OFF, {ATTR_ENTITY_ID: entity_id}, blocking=True
+    )
+    assert remote.commands[-1] == ["b64:T0ZGQw=="]
+
+
+def test_temperature_table() -> None:
+    """Convert temperatures the same way with and without the table."""
+    table = TemperatureTable(
+        60,
+        86,
+        1,
+        UnitOfTemperature.FAHRENHEIT,
+        16,
+        30,
+        0.5,
+        UnitOfTemperature.CELSIUS,
+    )
+    ha_temperatures = temperature_steps(16, 30, 0.5)
+    assert table.device_temperatures() == [
+        convert_temp(
+            temperature, UnitOfTemperature.CELSIUS, UnitOfTemperature.FAHRENHEIT, None
+        )
+        for temperature in ha_temperatures
+    ]
+
+    for temperature in [*ha_temperatures, 15.5, 22.25, 31]:
+        assert table.to_device(temperature) == convert_temp(
+            temperature, UnitOfTemperature.CELSIUS, UnitOfTemperature.FAHRENHEIT, None
+        )
+    for temperature in ["60", "71", 71, "71.0", 86.0, "90", "-"]:
+        assert table.to_ha(temperature) == convert_temp(
+            temperature, UnitOfTemperature.FAHRENHEIT, UnitOfTemperature.CELSIUS, 0.5
+        )
+    assert table.to_ha("71") == 21.5
+    assert table.to_ha("-") is None
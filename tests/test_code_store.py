@@ -0,0 +1,75 @@
+"""Tests of the store of interned IR codes."""
+
+import gc
+
+from custom_components.smartir.code_store import CodeStore
+from custom_components.smartir.lazy_commands import LazyCommands
+
+
+def _code(code: str) -> str:
+    # new string object equal to the code
+    return "".join(list(code))
+
+
+def test_intern() -> None:
+    """Point equal codes of all acquired trees to a single string."""
+    code_store = CodeStore()
+    first = code_store.acquire({"on": _code("T04="), "heat": {"16": _code("SDE2")}})
+    second = code_store.acquire({"heat": [_code("SDE2"), 16], "off": _code("T04=")})
+
+    assert first == {"on": "T04=", "heat": {"16": "SDE2"}}
+    assert second == {"heat": ["SDE2", 16], "off": "T04="}
+    assert second["off"] is first["on"]
+    assert second["heat"][0] is first["heat"]["16"]
+    statistics = code_store.statistics()
+    assert statistics["codes"] == 2
+    assert statistics["references"] == 4
+    assert statistics["bytes_saved"] > 0
+
+
+def test_release() -> None:
+    """Drop the codes when the last tree using them is released."""
+    code_store = CodeStore()
+    first = code_store.acquire({"on": _code("T04="), "off": _code("T0ZG")})
+    second = code_store.acquire({"on": _code("T04=")})
+
+    code_store.release(first)
+    statistics = code_store.statistics()
+    assert statistics["codes"] == 1
+    assert statistics["references"] == 1
+    assert statistics["bytes_saved"] == 0
+    third = code_store.acquire({"on": _code("T04=")})
+    assert third["on"] is second["on"]
+
+    code_store.release(second)
+    code_store.release(third)
+    assert code_store.statistics() == {
+        "codes": 0,
+        "references": 0,
+        "bytes": 0,
+        "bytes_saved": 0,
+    }
+
+
+def test_lazy_commands() -> None:
+    """Release codes of the unloaded subtrees and of the collected commands."""
+    code_store = CodeStore()
+    subtrees = {"heat": {"16": "SDE2"}, "cool": {"16": "QzE2"}}
+    commands = LazyCommands(
+        {"off": _code("T0ZG"), "heat": "heat", "cool": "cool"},
+        {"heat", "cool"},
+        lambda key: ({"16": _code(subtrees[key]["16"])}, 10),
+        cache_size=10,
+        code_store=code_store,
+    )
+    assert code_store.statistics()["codes"] == 1
+
+    assert commands["heat"]["16"] == "SDE2"
+    assert code_store.statistics()["codes"] == 2
+    # heat subtree is unloaded
+    assert commands["cool"]["16"] == "QzE2"
+    assert code_store.statistics()["codes"] == 2
+
+    del commands
+    gc.collect()
+    assert code_store.statistics()["references"] == 0
@@ -0,0 +1,132 @@
+"""Tests of the flat index of climate commands."""
+
+import pathlib
+
+import pytest
+
+import benchmark
+from custom_components.smartir.command_index import ClimateCommandIndex
+from custom_components.smartir.device_data import DeviceData
+from custom_components.smartir.lazy_commands import LazyCommands
+
+CODES_DIR = pathlib.Path(__file__).parent.parent / "codes" / "climate"
+
+COMMANDS = {
+    "off": "T0ZG",
+    "heat": {"-": {"low": {"16": "SEwxNg==", "18": "SEwxOA=="}, "high": {"-": "SEg="}}},
+    "cool": {"eco": {"low": {"16": "Q0wxNg=="}}},
+}
+
+
+def _index(commands=COMMANDS) -> ClimateCommandIndex:
+    index = ClimateCommandIndex(
+        commands,
+        ["heat", "cool"],
+        ["eco", "boost"],
+        ["low", "high"],
+        None,
+        [16, 17, 18],
+    )
+    index.build()
+    return index
+
+
+def test_resolve() -> None:
+    """Return the command with the modes and temperature it was found for."""
+    index = _index()
+    assert index.resolve("heat", "boost", "low", None, 18) == (
+        "SEwxOA==",
+        "-",
+        "low",
+        None,
+        "18",
+    )
+    assert index.resolve("heat", "eco", "high", None, 30) == (
+        "SEg=",
+        "-",
+        "high",
+        None,
+        "-",
+    )
+
+
+def test_resolve_closest_temperature() -> None:
+    """Resolve temperatures out of the index by the closest one."""
+    index = _index()
+    assert index.resolve("heat", "eco", "low", None, 17)[0] == "SEwxNg=="
+    assert index.resolve("heat", "eco", "low", None, 17.6)[0] == "SEwxOA=="
+    assert index.resolve("heat", "eco", "low", None, 25)[0] == "SEwxOA=="
+
+
+def test_resolve_declared_mode_fallback() -> None:
+    """Fall back to the first declared mode with commands."""
+    index = _index()
+    assert index.resolve("cool", "boost", "high", None, 16) == (
+        "Q0wxNg==",
+        "eco",
+        "low",
+        None,
+        "16",
+    )
+
+
+def test_resolve_missing(caplog) -> None:
+    """Log the reason of the missing command."""
+    index = ClimateCommandIndex(
+        COMMANDS, ["heat", "dry"], None, ["low", "high"], ["swing"], [16]
+    )
+    index.build()
+    assert index.resolve("dry", None, "low", "swing", 16) is None
+    assert "Missing device IR code for 'dry' operation mode." in caplog.text
+    assert index.resolve("heat", None, "low", "swing", 16) is None
+    assert "Missing device IR codes for selected 'swing' swing mode." in caplog.text
+
+
+def test_outdated() -> None:
+    """Build the index again when the commands were replaced."""
+    commands = LazyCommands(
+        {"heat": "heat"}, {"heat"}, lambda key: (COMMANDS["heat"], 0)
+    )
+    index = _index(commands)
+    assert not index.outdated
+    assert index.resolve("heat", "eco", "low", None, 16)[0] == "SEwxNg=="
+
+    commands.replace(
+        LazyCommands(
+            {"heat": "heat"},
+            {"heat"},
+            lambda key: ({"-": {"low": {"16": "SE5FVw=="}}}, 0),
+        )
+    )
+    assert index.outdated
+    index.build()
+    assert not index.outdated
+    assert index.resolve("heat", "eco", "low", None, 16)[0] == "SE5FVw=="
+
+
+@pytest.mark.parametrize(
+    "file_path", sorted(CODES_DIR.glob("*.json")), ids=lambda path: path.name
+)
+def test_tree_walk_equivalence(file_path) -> None:
+    """Resolve the same commands as the walk of the commands tree."""
+    device_data = DeviceData.read_file_as_json(str(file_path))
+    requests = benchmark.climate_requests(device_data)
+    levels = [
+        device_data.get(attr) for attr in ("presetModes", "fanModes", "swingModes")
+    ]
+    index = ClimateCommandIndex(
+        device_data["commands"],
+        device_data["operationModes"],
+        device_data.get("presetModes"),
+        device_data.get("fanModes"),
+        device_data.get("swingModes"),
+        sorted({temperature for *_, temperature in requests}),
+    )
+    index.build()
+
+    for hvac_mode, *modes, temperature in requests:
+        assert index.resolve(hvac_mode, *modes, temperature) == (
+            benchmark.walk_commands(
+                device_data["commands"], levels, hvac_mode, modes, temperature
+            )
+        )
@@ -0,0 +1,120 @@
+"""Tests of the SmartIR controllers."""
+
+import json
+
+from homeassistant.const import ATTR_ENTITY_ID, SERVICE_TURN_OFF, SERVICE_TURN_ON
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+
+from custom_components.smartir.controller import (
+    Helper,
+    TranscodeCache,
+    broadlink_to_base64,
+    get_transcode_cache,
+)
+from custom_components.smartir.services import get_entities
+
+from .common import REMOTE_ENTITY, RemoteMock
+from .conftest import DEVICE_CODE, FAN_DEVICE
+
+PRONTO = "0000 006D 0005 0000 0157 00AB 0015 0040 0015 0015 0015 0040 0015 0E80"
+
+HEX_FAN_DEVICE = {
+    **FAN_DEVICE,
+    "commandsEncoding": "Hex",
+    "commands": {
+        "off": b"OFF".hex(),
+        "default": {"low": b"LOW".hex(), "high": b"HIGH".hex()},
+    },
+}
+
+
+def test_transcode_cache() -> None:
+    """Keep the least recently used transcoded commands."""
+    transcoded = []
+
+    def transcode(command):
+        transcoded.append(command)
+        return command.upper()
+
+    cache = TranscodeCache(size=2)
+    assert cache.get("a", transcode, "a") == "A"
+    assert cache.get("b", transcode, "b") == "B"
+    assert cache.get("a", transcode, "a") == "A"
+    assert cache.get("c", transcode, "c") == "C"
+    assert cache.get("a", transcode, "a") == "A"
+    assert cache.get("b", transcode, "b") == "B"
+    assert transcoded == ["a", "b", "c", "b"]
+    assert cache.statistics() == {"size": 2, "max_size": 2, "hits": 2, "misses": 4}
+
+
+def test_broadlink_to_base64() -> None:
+    """Transcode Hex and Pronto commands into Broadlink Base64 encoding."""
+    assert broadlink_to_base64("Base64", "T0ZG") == "T0ZG"
+    assert broadlink_to_base64("Hex", b"OFF".hex()) == "T0ZG"
+    packet = Helper.lirc2broadlink(Helper.pronto2lirc(bytes.fromhex(PRONTO)))
+    assert broadlink_to_base64("Pronto", PRONTO) == broadlink_to_base64(
+        "Hex", packet.hex()
+    )
+
+
+async def _async_setup_fans(hass: HomeAssistant, tmp_path, *names, **config):
+    (tmp_path / "fan" / ("%d.json" % DEVICE_CODE)).write_text(
+        json.dumps(HEX_FAN_DEVICE)
+    )
+    assert await async_setup_component(
+        hass,
+        "fan",
+        {
+            "fan": [
+                {
+                    "platform": "smartir",
+                    "name": name,
+                    "device_code": DEVICE_CODE,
+                    "controller_data": {
+                        "controller_type": "Broadlink",
+                        "remote_entity": REMOTE_ENTITY,
+                        **config,
+                    },
+                    "delay": 0,
+                }
+                for name in names
+            ]
+        },
+    )
+    await hass.async_block_till_done()
+
+
+async def test_transcoded_on_send(hass: HomeAssistant, tmp_path) -> None:
+    """Transcode commands when they are sent, only once."""
+    remote = RemoteMock(hass)
+    await _async_setup_fans(hass, tmp_path, "test")
+
+    for service in (SERVICE_TURN_ON, SERVICE_TURN_OFF, SERVICE_TURN_ON):
+        await hass.services.async_call(
+            "fan", service, {ATTR_ENTITY_ID: "fan.test"}, blocking=True
+        )
+    assert remote.commands == [["b64:TE9X"], ["b64:T0ZG"], ["b64:TE9X"]]
+    statistics = get_transcode_cache(hass).statistics()
+    assert statistics["misses"] == 2
+    assert statistics["hits"] == 1
+
+
+async def test_pretranscoded(hass: HomeAssistant, tmp_path) -> None:
+    """Share the commands transcoded in advance by all entities."""
+    remote = RemoteMock(hass)
+    await _async_setup_fans(hass, tmp_path, "first", "second", pretranscode=True)
+
+    entities = get_entities(hass)
+    commands = entities["fan.first"]._commands
+    assert commands is entities["fan.second"]._commands
+    assert dict(commands) == {
+        "off": "T0ZG",
+        "default": {"low": "TE9X", "high": "SElHSA=="},
+    }
+
+    await hass.services.async_call(
+        "fan", SERVICE_TURN_ON, {ATTR_ENTITY_ID: "fan.second"}, blocking=True
+    )
+    assert remote.commands == [["b64:TE9X"]]
+    assert get_transcode_cache(hass).statistics()["misses"] == 0
@@ -0,0 +1,72 @@
+"""Tests of the compiled device data bundles."""
+
+import json
+
+from custom_components.smartir.device_bundle import (
+    BundleNode,
+    compile_bundle_file,
+    open_bundle,
+)
+from custom_components.smartir.device_data import DeviceData
+from custom_components.smartir.lazy_commands import LazyCommands
+
+from .conftest import CLIMATE_DEVICE
+
+DEVICE = {
+    **CLIMATE_DEVICE,
+    "commands": {
+        **CLIMATE_DEVICE["commands"],
+        "dry": {"-": {"16": "SDE2", "17": ["ÄÖ", 1]}},
+        "šéřě": "ü",
+    },
+}
+
+
+def _write_device(tmp_path, device_data=DEVICE) -> str:
+    file_path = tmp_path / "1000.json"
+    file_path.write_text(json.dumps(device_data))
+    return str(file_path)
+
+
+def test_round_trip(tmp_path) -> None:
+    """Read the same device data back from the compiled bundle."""
+    file_path = _write_device(tmp_path)
+    bundle_path = compile_bundle_file(file_path)
+
+    device_data = open_bundle(bundle_path, file_path)
+    commands = device_data.pop("commands")
+    assert device_data == {
+        key: value for key, value in DEVICE.items() if key != "commands"
+    }
+    assert isinstance(commands, BundleNode)
+    assert list(commands) == list(DEVICE["commands"])
+    assert commands == DEVICE["commands"]
+    assert isinstance(commands["heat"]["auto"], BundleNode)
+    assert commands["dry"]["-"]["17"] == ["ÄÖ", 1]
+    assert commands["šéřě"] == "ü"
+    assert len(commands["cool"]["auto"]) == 2
+
+
+def test_outdated_bundle(tmp_path) -> None:
+    """Ignore the bundle compiled from another content of the device file."""
+    file_path = _write_device(tmp_path)
+    bundle_path = compile_bundle_file(file_path)
+    commands = {**DEVICE["commands"], "off_heat": "T0ZGMQ=="}
+    _write_device(tmp_path, {**DEVICE, "commands": commands})
+
+    assert open_bundle(bundle_path, file_path) is None
+    device_data = DeviceData.read_file(file_path)
+    assert device_data["commands"]["off_heat"] == "T0ZGMQ=="
+
+
+def test_read_file_prefers_bundle(tmp_path) -> None:
+    """Serve the commands of the device file from its up to date bundle."""
+    file_path = _write_device(tmp_path)
+    compile_bundle_file(file_path)
+
+    device_data = DeviceData.read_file(file_path)
+    commands = device_data["commands"]
+    assert isinstance(commands, LazyCommands)
+    assert isinstance(commands["heat"], BundleNode)
+    assert commands["heat"]["auto"]["17"] == "SDE3"
+    assert commands["off_cool"] == "T0ZGQw=="
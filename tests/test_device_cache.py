@@ -0,0 +1,209 @@
+"""Tests of the SmartIR device data cache."""
+
+from datetime import timedelta
+import json
+import os
+
+import pytest
+
+from homeassistant.const import ATTR_ENTITY_ID, SERVICE_TURN_OFF, SERVICE_TURN_ON
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.smartir.device_cache import (
+    VALIDATION_SAVE_DELAY,
+    VALIDATION_STORAGE_KEY,
+    ValidationCache,
+    get_device_cache,
+    get_validation_cache,
+)
+from custom_components.smartir.const import DOMAIN
+from custom_components.smartir.device_data import DeviceData
+from custom_components.smartir.services import SERVICE_RELOAD_CODES
+
+from .common import RemoteMock, async_setup_smartir
+from .conftest import DEVICE_CODE, FAN_DEVICE
+
+
+def _device_file(tmp_path, device_class: str) -> str:
+    return str(tmp_path / device_class / ("%d.json" % DEVICE_CODE))
+
+
+def _rewrite(file_path: str, device_data: dict):
+    with open(file_path, "w") as file:
+        json.dump(device_data, file)
+    stat = os.stat(file_path)
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+async def test_shared_device_data(hass: HomeAssistant, tmp_path) -> None:
+    """Share device data loaded once by all entities using the device code."""
+    device_cache = get_device_cache(hass)
+    file_path = _device_file(tmp_path, "fan")
+
+    device_data = await device_cache.async_get(hass, "fan", DEVICE_CODE, file_path, {})
+    assert device_data["speed"] == ["low", "high"]
+    assert device_data["commands"]["off"] == "T0ZG"
+    assert (
+        await device_cache.async_get(hass, "fan", DEVICE_CODE, file_path, {})
+        is device_data
+    )
+
+
+async def test_changed_device_file(hass: HomeAssistant, tmp_path, device_files) -> None:
+    """Load the device file again when its fingerprint changed."""
+    device_cache = get_device_cache(hass)
+    file_path = _device_file(tmp_path, "fan")
+    device_data = await device_cache.async_get(hass, "fan", DEVICE_CODE, file_path, {})
+
+    _rewrite(file_path, {**device_files["fan"], "speed": ["low", "medium"]})
+
+    new_data = await device_cache.async_get(hass, "fan", DEVICE_CODE, file_path, {})
+    assert new_data is not device_data
+    assert new_data["speed"] == ["low", "medium"]
+
+
+async def test_invalid_device_file(hass: HomeAssistant, tmp_path, device_files) -> None:
+    """Don't cache device data failing the validation."""
+    device_cache = get_device_cache(hass)
+    file_path = _device_file(tmp_path, "fan")
+    with open(file_path, "w") as file:
+        json.dump({**device_files["fan"], "speed": []}, file)
+
+    assert await device_cache.async_get(hass, "fan", DEVICE_CODE, file_path, {}) is None
+
+
+@pytest.fixture
+def check_file(monkeypatch):
+    """Record device data validations."""
+    checked = []
+    check_file = DeviceData.check_file
+
+    def record(file_name, device_data, device_class, check_data):
+        checked.append(file_name)
+        return check_file(file_name, device_data, device_class, check_data)
+
+    monkeypatch.setattr(DeviceData, "check_file", record)
+    return checked
+
+
+async def test_validation_cache(
+    hass: HomeAssistant, tmp_path, device_files, check_file
+) -> None:
+    """Validate device data again only if its validation inputs changed."""
+    validation_cache = get_validation_cache(hass)
+    await validation_cache.async_load()
+    file_path = _device_file(tmp_path, "fan")
+    device_data = device_files["fan"]
+
+    valid, result = validation_cache.check(file_path, "1", device_data, "fan", {})
+    assert valid
+    assert result["valid"]
+    validation_cache.async_store(file_path, result)
+    assert validation_cache.check(file_path, "1", device_data, "fan", {}) == (
+        True,
+        None,
+    )
+    assert len(check_file) == 1
+
+    for digest, device_class, check_data in (
+        ("2", "fan", {}),
+        ("1", "light", {}),
+        ("1", "fan", {"temperature_unit": "°C"}),
+    ):
+        valid, result = validation_cache.check(
+            file_path, digest, device_data, device_class, check_data
+        )
+        assert result is not None
+    assert len(check_file) == 4
+
+
+async def test_validation_cache_invalid(
+    hass: HomeAssistant, tmp_path, device_files, check_file
+) -> None:
+    """Keep the device data invalid until the cache is cleared."""
+    validation_cache = get_validation_cache(hass)
+    await validation_cache.async_load()
+    file_path = _device_file(tmp_path, "fan")
+    device_data = {**device_files["fan"], "speed": []}
+
+    valid, result = validation_cache.check(file_path, "1", device_data, "fan", {})
+    assert not valid
+    validation_cache.async_store(file_path, result)
+    assert validation_cache.check(file_path, "1", device_data, "fan", {}) == (
+        False,
+        None,
+    )
+    assert len(check_file) == 1
+
+    await validation_cache.async_clear()
+    valid, result = validation_cache.check(file_path, "1", device_data, "fan", {})
+    assert not valid
+    assert result is not None
+    assert len(check_file) == 2
+
+
+async def test_validation_cache_stored(
+    hass: HomeAssistant, tmp_path, device_files, check_file, hass_storage
+) -> None:
+    """Use the validation results stored before restart."""
+    validation_cache = get_validation_cache(hass)
+    await validation_cache.async_load()
+    file_path = _device_file(tmp_path, "fan")
+    device_data = device_files["fan"]
+    _, result = validation_cache.check(file_path, "1", device_data, "fan", {})
+    validation_cache.async_store(file_path, result)
+
+    async_fire_time_changed(
+        hass, dt_util.utcnow() + timedelta(seconds=VALIDATION_SAVE_DELAY + 1)
+    )
+    await hass.async_block_till_done()
+    assert hass_storage[VALIDATION_STORAGE_KEY]["data"] == {file_path: result}
+
+    validation_cache = ValidationCache(hass)
+    await validation_cache.async_load()
+    assert validation_cache.check(file_path, "1", device_data, "fan", {}) == (
+        True,
+        None,
+    )
+    assert len(check_file) == 1
+
+
+async def test_reload_codes(hass: HomeAssistant, tmp_path, device_files) -> None:
+    """Send the reloaded commands without reloading the entity."""
+    remote = RemoteMock(hass)
+    entity_id = await async_setup_smartir(hass, "fan")
+    await hass.services.async_call(
+        "fan", SERVICE_TURN_ON, {ATTR_ENTITY_ID: entity_id}, blocking=True
+    )
+    await hass.services.async_call(
+        "fan", SERVICE_TURN_OFF, {ATTR_ENTITY_ID: entity_id}, blocking=True
+    )
+
+    commands = {
+        **FAN_DEVICE["commands"],
+        "default": {"low": "TE9XMg==", "high": "SElHSA=="},
+    }
+    _rewrite(_device_file(tmp_path, "fan"), {**FAN_DEVICE, "commands": commands})
+    await hass.services.async_call(DOMAIN, SERVICE_RELOAD_CODES, blocking=True)
+    await hass.services.async_call(
+        "fan", SERVICE_TURN_ON, {ATTR_ENTITY_ID: entity_id}, blocking=True
+    )
+    assert remote.commands == [["b64:TE9X"], ["b64:T0ZG"], ["b64:TE9XMg=="]]
+
+
+async def test_reload_invalid_codes(
+    hass: HomeAssistant, tmp_path, device_files, caplog
+) -> None:
+    """Keep the loaded commands when the changed file is invalid."""
+    remote = RemoteMock(hass)
+    entity_id = await async_setup_smartir(hass, "fan")
+
+    _rewrite(_device_file(tmp_path, "fan"), {**FAN_DEVICE, "speed": []})
+    await hass.services.async_call(DOMAIN, SERVICE_RELOAD_CODES, blocking=True)
+    assert "was not reloaded" in caplog.text
+    await hass.services.async_call(
+        "fan", SERVICE_TURN_ON, {ATTR_ENTITY_ID: entity_id}, blocking=True
+    )
+    assert remote.commands == [["b64:TE9X"]]
@@ -0,0 +1,89 @@
+"""Tests of the device data validation."""
+
+import pytest
+
+from custom_components.smartir.device_data import DeviceData
+
+from .conftest import CLIMATE_DEVICE
+
+CHECK_DATA = {"hvac_modes": ["auto", "heat", "cool", "dry"]}
+
+
+def _check_climate(commands, **attributes) -> bool:
+    device_data = {**CLIMATE_DEVICE, **attributes, "commands": commands}
+    return DeviceData.check_file("1000.json", device_data, "climate", dict(CHECK_DATA))
+
+
+def test_climate() -> None:
+    """Accept climate commands of all declared modes and temperatures."""
+    check_data = dict(CHECK_DATA)
+    assert DeviceData.check_file("1000.json", CLIMATE_DEVICE, "climate", check_data)
+    assert check_data["precision"] == 1
+
+
+def test_climate_wildcards() -> None:
+    """Accept the '-' key of any modes and temperatures."""
+    assert _check_climate(
+        {
+            "off": "T0ZG",
+            "heat": {"-": {"16": "SDE2"}},
+            "dry": {"auto": {"-": "RFJZ"}},
+        },
+        operationModes=["heat", "dry"],
+    )
+
+
+def test_climate_fractional_temperatures() -> None:
+    """Round temperature keys by the precision."""
+    assert _check_climate(
+        {"off": "T0ZG", "heat": {"auto": {"16": "SDE2", "16.5": "SDE2NQ=="}}},
+        operationModes=["heat"],
+        precision=0.5,
+    )
+
+
+@pytest.mark.parametrize(
+    ("commands", "error"),
+    [
+        (
+            {"heat": {"auto": {"16": "SDE2"}}, "cool": {"auto": {"16": "QzE2"}}},
+            "'off' or 'off_heat' operation mode command",
+        ),
+        (
+            {**CLIMATE_DEVICE["commands"], "dry": {"auto": {"16": "RDE2"}}},
+            "operation mode 'dry' is not defined",
+        ),
+        (
+            {"off": "T0ZG", "heat": {"auto": {"16": "SDE2"}}},
+            "not defined operation mode 'cool' command key",
+        ),
+        (
+            {**CLIMATE_DEVICE["commands"], "cool": {"high": {"16": "QzE2"}}},
+            "not defined 'fan' mode 'high' command key",
+        ),
+        (
+            {**CLIMATE_DEVICE["commands"], "cool": {"auto": {"19": "QzE5"}}},
+            "invalid 'temperature' '19' command key",
+        ),
+        (
+            {**CLIMATE_DEVICE["commands"], "cool": {"auto": {"warm": "QzE4"}}},
+            "invalid 'temperature' command key 'warm'",
+        ),
+        (
+            {**CLIMATE_DEVICE["commands"], "cool": {"auto": {"16": ["QzE2"]}}},
+            "invalid 'temperature' '16' command value",
+        ),
+        (
+            {**CLIMATE_DEVICE["commands"], "cool": {"auto": {}}},
+            "invalid format at temperature level",
+        ),
+        (
+            {**CLIMATE_DEVICE["commands"], "cool": {"-": {}, "auto": {}}},
+            "mode key '-' can't be combined",
+        ),
+    ],
+)
+def test_climate_invalid(commands, error, caplog) -> None:
+    """Reject climate commands of the modes and temperatures not declared."""
+    assert not _check_climate(commands)
+    assert error in caplog.text
@@ -0,0 +1,94 @@
+"""Tests of the index of the device data files directories."""
+
+import json
+import os
+import shutil
+
+from custom_components.smartir.device_index import DeviceIndex, index_entry
+
+
+def _write(directory, device_code, device_data):
+    """Write the device file, changing the modification times."""
+    directory.mkdir(parents=True, exist_ok=True)
+    file_path = directory / ("%d.json" % device_code)
+    file_path.write_text(json.dumps(device_data))
+    for path in (file_path, directory):
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    return str(file_path)
+
+
+def test_lookup(tmp_path) -> None:
+    """Prefer the device files of the first directories."""
+    custom = tmp_path / "custom"
+    codes = tmp_path / "codes"
+    _write(codes / "fan", 1000, {})
+    custom_path = _write(custom / "fan", 1000, {})
+    codes_path = _write(codes / "fan", 1001, {})
+    index = DeviceIndex([str(custom), str(codes)])
+
+    assert index.lookup("fan", 1000)["path"] == custom_path
+    assert index.lookup("fan", "1001")["path"] == codes_path
+    assert index.lookup("fan", 1002) is None
+    assert index.lookup("light", 1000) is None
+    assert {code: entry["path"] for code, entry in index.entries("fan").items()} == {
+        "1000": custom_path,
+        "1001": codes_path,
+    }
+
+
+def test_rescan(tmp_path) -> None:
+    """Scan the directory again only when it changes."""
+    index = DeviceIndex([str(tmp_path)])
+    _write(tmp_path / "fan", 1000, {})
+    assert index.lookup("fan", 1001) is None
+
+    # directory with the same modification time isn't scanned
+    mtime = os.stat(tmp_path / "fan").st_mtime_ns
+    (tmp_path / "fan" / "1001.json").write_text("{}")
+    os.utime(tmp_path / "fan", ns=(mtime, mtime))
+    assert index.lookup("fan", 1001) is None
+
+    file_path = _write(tmp_path / "fan", 1002, {})
+    assert index.lookup("fan", 1001) is not None
+    assert index.lookup("fan", 1002)["path"] == file_path
+
+    shutil.rmtree(tmp_path / "fan")
+    assert index.lookup("fan", 1000) is None
+
+
+def test_cached(tmp_path) -> None:
+    """Keep the complete entries of the unchanged files."""
+    device_data = {"manufacturer": "Test", "supportedModels": ["T1"]}
+    file_path = _write(tmp_path / "fan", 1000, device_data)
+    index = DeviceIndex([str(tmp_path)])
+    assert index.lookup("fan", 1000) is not None
+    assert index.cached(file_path) is None
+
+    entry = index_entry(file_path, os.stat(file_path), "digest", device_data)
+    index.update(entry)
+    assert index.cached(file_path) == entry
+    assert entry["manufacturer"] == "Test"
+    assert entry["models"] == ["T1"]
+
+    # complete entries of unchanged files survive rescans and restarts
+    _write(tmp_path / "fan", 1001, {})
+    assert index.lookup("fan", 1000) == entry
+    restored = DeviceIndex.load([str(tmp_path)], json.loads(json.dumps(index.dump())))
+    assert restored.cached(file_path) == entry
+
+    _write(tmp_path / "fan", 1000, {**device_data, "manufacturer": "Other"})
+    assert index.cached(file_path) is None
+    assert "digest" not in index.lookup("fan", 1000)
+
+
+def test_update_unscanned(tmp_path) -> None:
+    """Reuse the entries stored before the directory is scanned."""
+    file_path = _write(tmp_path / "fan", 1000, {})
+    index = DeviceIndex([str(tmp_path)])
+    entry = index_entry(file_path, os.stat(file_path), "digest", None)
+    index.update(entry)
+
+    assert index.cached(file_path) == entry
+    assert index.lookup("fan", 1000) == entry
+    assert entry["manufacturer"] is None
@@ -0,0 +1,221 @@
+"""Tests of the IR codes encoders and decoders."""
+
+import base64
+import binascii
+import json
+import pathlib
+
+import pytest
+
+import benchmark
+from custom_components.smartir.ir_codec import (
+    BROADLINK_PULSES,
+    TUYA_WINDOW,
+    broadlink_to_pulses,
+    broadlink_to_ticks,
+    pronto_to_pulses,
+    pulses_to_broadlink,
+    pulses_to_pronto,
+    pulses_to_raw,
+    pulses_to_tuya,
+    raw_to_pulses,
+    tuya_compress,
+    tuya_decompress,
+    tuya_to_pulses,
+)
+
+CODES_DIR = pathlib.Path(__file__).parent.parent / "codes"
+
+# number of the library codes compared with the previous conversions
+LEGACY_CODES = 2000
+# number of the library codes compressed into Tuya codes
+TUYA_CODES = 200
+
+PULSES = [9000, 4500, 560, 560, 560, 1690, 560, 39000, 9000, 2250, 560, 96000]
+
+
+def _library_pulses(limit):
+    """Return pulses of the Broadlink Base64 codes of the codes directory."""
+    pulses = []
+    for file_path in sorted(CODES_DIR.glob("*/*.json")):
+        device_data = json.loads(file_path.read_bytes())
+        if (
+            device_data.get("supportedController") != "Broadlink"
+            or device_data.get("commandsEncoding") != "Base64"
+        ):
+            continue
+        for command in benchmark.command_leaves(device_data["commands"]):
+            try:
+                item = broadlink_to_pulses(base64.b64decode(command))
+            except (ValueError, binascii.Error):
+                continue
+            if item and not len(item) % 2:
+                pulses.append(item)
+            if len(pulses) == limit:
+                return pulses
+    return pulses
+
+
+def test_broadlink_round_trip() -> None:
+    """Decode the same pulses from the encoded Broadlink packet."""
+    packet = pulses_to_broadlink(PULSES)
+    assert packet[:2] == b"\x26\x00"
+    assert not (len(packet) + 4) % 16
+
+    pulses = broadlink_to_pulses(packet)
+    assert len(pulses) == len(PULSES)
+    for pulse, decoded in zip(PULSES, pulses):
+        assert decoded in BROADLINK_PULSES
+        assert abs(decoded - pulse) < 31
+    assert pulses_to_broadlink(pulses) == packet
+    assert broadlink_to_pulses(pulses_to_broadlink(pulses)) == pulses
+
+
+def test_broadlink_repeat() -> None:
+    """Encode the repeat count into the packet header."""
+    packet = pulses_to_broadlink(PULSES, repeat=3)
+    assert packet[1] == 3
+    assert broadlink_to_pulses(packet) == broadlink_to_pulses(
+        pulses_to_broadlink(PULSES)
+    )
+
+
+def test_broadlink_learned_trailer() -> None:
+    """Drop the trailer counted into the length of learned packets."""
+    packet = pulses_to_broadlink(PULSES)
+    packet[2] += 2
+    assert (
+        broadlink_to_ticks(packet).tolist()
+        == broadlink_to_ticks(pulses_to_broadlink(PULSES)).tolist()
+    )
+
+
+@pytest.mark.parametrize(
+    ("packet", "error"),
+    [
+        (b"\x26\x00", "too short"),
+        (b"\xb2\x00\x02\x00\x10\x10", "not an IR packet"),
+        (b"\x26\x00\x08\x00\x10\x10", "truncated"),
+        (b"\x26\x00\x03\x00\x10\x10\x00\x01", "truncated"),
+    ],
+)
+def test_broadlink_invalid(packet, error) -> None:
+    """Reject packets which aren't complete Broadlink IR packets."""
+    with pytest.raises(ValueError, match=error):
+        broadlink_to_pulses(packet)
+
+
+def test_pronto_round_trip() -> None:
+    """Decode the same pulses, in the carrier units, from the Pronto code."""
+    pronto = pulses_to_pronto(PULSES)
+    assert pronto[:8].hex() == "0000006d00060000"
+
+    pulses = pronto_to_pulses(pronto)
+    for pulse, decoded in zip(PULSES, pulses):
+        assert abs(decoded - pulse) <= 14
+    assert pulses_to_pronto(pulses) == pronto
+    with pytest.raises(ValueError, match="has to be even"):
+        pulses_to_pronto(PULSES[:-1])
+
+
+@pytest.mark.parametrize(
+    ("pronto", "error"),
+    [
+        ("0100 006D 0001 0000 0010 0010", "should start with 0000"),
+        ("0000 006D 0002 0000 0010 0010", "does not match the preamble"),
+    ],
+)
+def test_pronto_invalid(pronto, error) -> None:
+    """Reject Pronto codes of other than learned format or with wrong length."""
+    with pytest.raises(ValueError, match=error):
+        pronto_to_pulses(bytes.fromhex(pronto))
+
+
+def test_raw_round_trip() -> None:
+    """Encode spaces as negative durations."""
+    durations = pulses_to_raw(PULSES)
+    assert durations[:4] == [9000, -4500, 560, -560]
+    assert raw_to_pulses(durations) == PULSES
+
+
+def test_raw_normalized() -> None:
+    """Merge durations of the same sign and drop the leading space."""
+    assert raw_to_pulses([-100, 9000, 0, -4000, -500, 560, 40, -560]) == [
+        9000,
+        4500,
+        600,
+        560,
+    ]
+
+
+def test_legacy_equivalence() -> None:
+    """Encode and decode library codes the same as the previous conversions."""
+    library_pulses = _library_pulses(LEGACY_CODES)
+    assert library_pulses
+
+    for pulses in library_pulses:
+        packet = pulses_to_broadlink(pulses)
+        assert packet == benchmark.legacy_lirc2broadlink(pulses)
+        assert broadlink_to_pulses(packet) == pulses
+
+        pronto = pulses_to_pronto(pulses)
+        assert pronto_to_pulses(pronto) == benchmark.legacy_pronto2lirc(pronto)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"ab",
+        b"abcabcabcabc",
+        b"a" * 1000,
+        bytes(range(256)) * 4,
+        bytes(range(200)) + bytes(TUYA_WINDOW) + bytes(range(200)),
+        bytes(index * 7919 % 251 for index in range(20000)),
+    ],
+    ids=["empty", "short", "repeated", "run", "long match", "window", "mixed"],
+)
+def test_tuya_round_trip(data) -> None:
+    """Decompress the same data from the Tuya compressed data."""
+    compressed = tuya_compress(data)
+    assert tuya_decompress(compressed) == data
+    if len(data) > 100:
+        assert len(compressed) < len(data)
+
+
+def test_tuya_decompress() -> None:
+    """Repeat the overlapping matches."""
+    assert tuya_decompress(b"\x02abc\x20\x00") == b"abcccc"
+    assert tuya_decompress(b"\x01ab\xe0\x03\x01") == b"ab" + b"ab" * 6
+
+
+@pytest.mark.parametrize(
+    ("data", "error"),
+    [
+        (b"\x03ab", "truncated"),
+        (b"\x00a\x20", "truncated"),
+        (b"\x00a\xe0\x00", "truncated"),
+        (b"\x00a\x20\x01", "refers before its start"),
+    ],
+)
+def test_tuya_invalid(data, error) -> None:
+    """Reject truncated and invalid Tuya codes."""
+    with pytest.raises(ValueError, match=error):
+        tuya_decompress(data)
+
+
+def test_tuya_pulses() -> None:
+    """Clip the pulses longer than 16 bits."""
+    assert tuya_to_pulses(pulses_to_tuya(PULSES)) == [
+        min(pulse, 0xFFFF) for pulse in PULSES
+    ]
+    with pytest.raises(ValueError, match="odd number of bytes"):
+        tuya_to_pulses(tuya_compress(b"abc"))
+
+
+def test_tuya_library_round_trip() -> None:
+    """Decode the same pulses of the library codes from the Tuya codes."""
+    for pulses in _library_pulses(TUYA_CODES):
+        assert tuya_to_pulses(pulses_to_tuya(pulses)) == [
+            min(pulse, 0xFFFF) for pulse in pulses
+        ]
@@ -0,0 +1,201 @@
+"""Tests of the lazily loaded commands trees."""
+
+import gc
+import json
+import os
+
+import pytest
+
+from custom_components.smartir.code_store import CodeStore
+from custom_components.smartir.lazy_commands import (
+    LazyCommands,
+    _JsonLoader,
+    _index_json,
+    read_json_lazy,
+)
+
+SUBTREES = {
+    "heat": {"auto": {"16": "SDE2", "17": "SDE3"}},
+    "cool": {"auto": {"16": "QzE2", "17": "QzE3"}},
+    "dry": {"-": {"16": "RDE2"}},
+}
+
+DEVICE = {
+    "manufacturer": 'Brace { and "quote" ]',
+    "supportedModels": ["[model]", "{model}", "back\\slash"],
+    "commands": {
+        "off": "T0ZG",
+        "heat": {"auto": {"16": "}{][", "17": '\\"}'}},
+        "cool": {"äir": {"16": "žluťoučký"}},
+        'esc"aped\\key': {"☃": ["{", "}", {"[": "]"}]},
+        "fan": ["low", "high"],
+    },
+}
+
+
+class Loader:
+    """Loader of the subtrees recording the loaded keys."""
+
+    def __init__(self, size=10):
+        self.loaded = []
+        self._size = size
+
+    def __call__(self, key):
+        self.loaded.append(key)
+        return SUBTREES[key], self._size
+
+
+def _commands(loader, **kwargs) -> LazyCommands:
+    return LazyCommands(
+        {"off": "T0ZG", **{key: key for key in SUBTREES}},
+        set(SUBTREES),
+        loader,
+        **kwargs,
+    )
+
+
+def test_load_on_demand() -> None:
+    """Load subtrees on their first access only."""
+    loader = Loader()
+    commands = _commands(loader)
+
+    assert "heat" in commands
+    assert commands["off"] == "T0ZG"
+    assert list(commands) == ["off", "heat", "cool", "dry"]
+    assert loader.loaded == []
+
+    assert commands["heat"] == SUBTREES["heat"]
+    assert commands["heat"]["auto"]["17"] == "SDE3"
+    assert loader.loaded == ["heat"]
+
+
+def test_evict_least_recently_used() -> None:
+    """Unload the least recently used subtrees exceeding the cache size."""
+    loader = Loader()
+    commands = _commands(loader, cache_size=20)
+
+    commands["heat"]
+    commands["cool"]
+    commands["heat"]
+    commands["dry"]
+    assert loader.loaded == ["heat", "cool", "dry"]
+
+    # cool was used least recently
+    commands["heat"]
+    commands["cool"]
+    assert loader.loaded == ["heat", "cool", "dry", "cool"]
+
+
+def test_keep_last_loaded_subtree() -> None:
+    """Keep the last loaded subtree even if it's bigger than the cache."""
+    loader = Loader(size=100)
+    commands = _commands(loader, cache_size=20)
+
+    commands["heat"]
+    commands["heat"]
+    commands["cool"]
+    commands["heat"]
+    assert loader.loaded == ["heat", "cool", "heat"]
+
+
+def test_preload() -> None:
+    """Keep all preloaded subtrees loaded."""
+    loader = Loader()
+    commands = _commands(loader, cache_size=0, loaded={"heat": (SUBTREES["heat"], 10)})
+    assert not commands.preloaded
+
+    commands.preload()
+    assert commands.preloaded
+    assert sorted(loader.loaded) == ["cool", "dry"]
+    for key in SUBTREES:
+        assert commands[key] == SUBTREES[key]
+    assert sorted(loader.loaded) == ["cool", "dry"]
+
+
+def test_index_json() -> None:
+    """Index commands with brackets and quotes in their strings."""
+    data = json.dumps(DEVICE, indent=2, ensure_ascii=False).encode()
+
+    device_data, commands, spans, subtrees = _index_json(data)
+    assert device_data == {**DEVICE, "commands": None}
+    assert commands == {"off": "T0ZG", "fan": ["low", "high"]}
+    assert list(spans) == ["heat", "cool", 'esc"aped\\key']
+    for key, (start, end) in spans.items():
+        assert json.loads(data[start:end]) == DEVICE["commands"][key]
+    assert subtrees == {}
+
+
+def test_index_json_keep() -> None:
+    """Keep the first decoded subtrees up to the size."""
+    data = json.dumps(DEVICE).encode()
+    keep = sum(end - start for start, end in _index_json(data)[2].values()) - 1
+
+    subtrees = _index_json(data, keep)[3]
+    assert list(subtrees) == ["heat", "cool"]
+    assert subtrees["cool"] == (
+        DEVICE["commands"]["cool"],
+        len(json.dumps(DEVICE["commands"]["cool"]).encode()),
+    )
+
+
+def test_read_json_lazy(tmp_path) -> None:
+    """Read the same device data as the JSON decoder."""
+    file_path = tmp_path / "1000.json"
+    file_path.write_text(json.dumps(DEVICE, ensure_ascii=False), encoding="utf-8")
+
+    device_data = read_json_lazy(str(file_path))
+    assert isinstance(device_data["commands"], LazyCommands)
+    assert {**device_data, "commands": dict(device_data["commands"])} == DEVICE
+
+
+def test_changed_file(tmp_path) -> None:
+    """Refuse to load subtrees of the file changed since it was read."""
+    file_path = tmp_path / "1000.json"
+    file_path.write_text(json.dumps(DEVICE))
+    _, eager, spans, _ = _index_json(file_path.read_bytes())
+    loader = _JsonLoader(str(file_path), os.stat(file_path), spans)
+    commands = LazyCommands(
+        {**eager, **{key: key for key in spans}}, set(spans), loader, cache_size=0
+    )
+    assert commands["heat"] == DEVICE["commands"]["heat"]
+
+    file_path.write_text(json.dumps(DEVICE, indent=1))
+    stat = os.stat(file_path)
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    # the last loaded subtree is still cached
+    assert commands["heat"] == DEVICE["commands"]["heat"]
+    with pytest.raises(ValueError, match="changed since it was loaded"):
+        commands["cool"]
+
+
+def test_replace() -> None:
+    """Serve the content of the replacing commands to all holders."""
+    code_store = CodeStore()
+    commands = _commands(Loader(), code_store=code_store)
+    commands["heat"]
+    other = LazyCommands(
+        {"off": "T0ZGMQ==", "fan": "fan"},
+        {"fan"},
+        lambda key: ({"low": "TE9X"}, 10),
+        code_store=code_store,
+    )
+    other["fan"]
+
+    commands.replace(other)
+    assert commands.generation == 1
+    assert dict(commands) == {"off": "T0ZGMQ==", "fan": {"low": "TE9X"}}
+    assert "heat" not in commands
+    # codes of the replaced content are released, the taken over ones kept
+    assert code_store.statistics()["codes"] == 2
+
+    del other
+    gc.collect()
+    assert code_store.statistics()["codes"] == 2
+
+
+def test_replace_other_code_store() -> None:
+    """Refuse to take over codes interned in another code store."""
+    commands = _commands(Loader(), code_store=CodeStore())
+    with pytest.raises(ValueError):
+        commands.replace(_commands(Loader(), code_store=CodeStore()))
+    assert commands.generation == 0
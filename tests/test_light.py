@@ -0,0 +1,65 @@
+"""Tests of the SmartIR light platform."""
+
+import json
+
+from homeassistant.components.light import ATTR_BRIGHTNESS
+from homeassistant.const import ATTR_ENTITY_ID, SERVICE_TURN_ON
+from homeassistant.core import HomeAssistant
+
+from .common import RemoteMock, async_setup_smartir
+from .conftest import DEVICE_CODE, LIGHT_DEVICE
+
+
+async def test_brightness_steps(hass: HomeAssistant, tmp_path) -> None:
+    """Send the step commands repeated by the remote in a single call."""
+    (tmp_path / "light" / ("%d.json" % DEVICE_CODE)).write_text(
+        json.dumps({**LIGHT_DEVICE, "brightness": [64, 128, 192, 255]})
+    )
+    remote = RemoteMock(hass)
+    entity_id = await async_setup_smartir(hass, "light")
+
+    await hass.services.async_call(
+        "light",
+        SERVICE_TURN_ON,
+        {ATTR_ENTITY_ID: entity_id, ATTR_BRIGHTNESS: 255},
+        blocking=True,
+    )
+    await hass.services.async_call(
+        "light",
+        SERVICE_TURN_ON,
+        {ATTR_ENTITY_ID: entity_id, ATTR_BRIGHTNESS: 130},
+        blocking=True,
+    )
+    assert [(call["command"], call.get("num_repeats")) for call in remote.calls] == [
+        (["b64:T04="], None),
+        # the highest brightness resyncs by the full range
+        (["b64:VVA="], 4),
+        (["b64:RE9XTg=="], 2),
+    ]
+    assert hass.states.get(entity_id).attributes[ATTR_BRIGHTNESS] == 128
+
+
+async def test_brightness_steps_configured_repeats(hass: HomeAssistant) -> None:
+    """Send the step commands one by one with the configured repeats."""
+    remote = RemoteMock(hass)
+    entity_id = await async_setup_smartir(
+        hass,
+        "light",
+        controller_data={
+            "controller_type": "Broadlink",
+            "remote_entity": "remote.test",
+            "num_repeats": 3,
+        },
+    )
+
+    await hass.services.async_call(
+        "light",
+        SERVICE_TURN_ON,
+        {ATTR_ENTITY_ID: entity_id, ATTR_BRIGHTNESS: 255},
+        blocking=True,
+    )
+    assert [(call["command"], call["num_repeats"]) for call in remote.calls] == [
+        (["b64:T04="], 3),
+        (["b64:VVA="], 3),
+        (["b64:VVA="], 3),
+    ]
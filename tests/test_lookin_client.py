@@ -0,0 +1,126 @@
+"""Tests of the HTTP client of the LOOKin remotes."""
+
+import asyncio
+from types import SimpleNamespace
+
+import aiohttp
+import pytest
+
+from custom_components.smartir.lookin_client import LookinClient
+
+CONNECTION_KEY = SimpleNamespace(host="192.168.1.10", port=80, ssl=True)
+
+
+class Response:
+    """Response of the remote, failed by the status."""
+
+    def __init__(self, status=200):
+        self.status = status
+        self.read_calls = 0
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(None, (), status=self.status)
+
+    async def read(self):
+        self.read_calls += 1
+        return b""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return None
+
+
+class Session:
+    """Session returning the responses or raising the errors in order."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.urls = []
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        result = self.results.pop(0)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+
+def _connect_error():
+    return aiohttp.ClientConnectorError(CONNECTION_KEY, OSError(113, "No route"))
+
+
+async def test_get() -> None:
+    """Read the response of the remote."""
+    response = Response()
+    session = Session(response)
+    await LookinClient(session, "192.168.1.10").async_get("/commands/ir/raw/1")
+    assert session.urls == ["http://192.168.1.10/commands/ir/raw/1"]
+    assert response.read_calls == 1
+
+
+async def test_retry_connect_error() -> None:
+    """Retry the requests which failed to connect to the remote."""
+    session = Session(_connect_error(), _connect_error(), Response())
+    await LookinClient(session, "192.168.1.10", backoff=0).async_get("/path")
+    assert len(session.urls) == 3
+    assert not session.results
+
+
+async def test_retry_backoff(monkeypatch) -> None:
+    """Double the delay before every retry."""
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    session = Session(_connect_error(), _connect_error(), Response())
+    await LookinClient(session, "192.168.1.10", backoff=0.5).async_get("/path")
+    assert delays == [0.5, 1.0]
+
+
+async def test_retry_attempts() -> None:
+    """Raise the connection error of the last attempt."""
+    session = Session(*(_connect_error() for _ in range(3)))
+    with pytest.raises(aiohttp.ClientConnectorError):
+        await LookinClient(session, "192.168.1.10", backoff=0).async_get("/path")
+    assert len(session.urls) == 3
+
+
+@pytest.mark.parametrize(
+    "result",
+    [
+        asyncio.TimeoutError(),
+        aiohttp.ServerDisconnectedError(),
+        Response(500),
+    ],
+    ids=["timeout", "disconnected", "status"],
+)
+async def test_no_retry(result) -> None:
+    """Don't retry the requests which may have reached the remote."""
+    session = Session(result, Response())
+    with pytest.raises((asyncio.TimeoutError, aiohttp.ClientError)):
+        await LookinClient(session, "192.168.1.10", backoff=0).async_get("/path")
+    assert len(session.urls) == 1
+
+
+async def test_sequential() -> None:
+    """Send one request at a time to the remote."""
+    running = []
+    max_running = []
+
+    class SlowResponse(Response):
+        async def read(self):
+            running.append(None)
+            max_running.append(len(running))
+            await asyncio.sleep(0)
+            running.pop()
+            return b""
+
+    session = Session(SlowResponse(), SlowResponse())
+    client = LookinClient(session, "192.168.1.10")
+    await asyncio.gather(client.async_get("/a"), client.async_get("/b"))
+    assert max_running == [1, 1]
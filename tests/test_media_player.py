@@ -0,0 +1,85 @@
+"""Tests of the SmartIR media player platform."""
+
+from base64 import b64encode
+import json
+import os
+
+import pytest
+
+from homeassistant.components.media_player import (
+    ATTR_MEDIA_CONTENT_ID,
+    ATTR_MEDIA_CONTENT_TYPE,
+    SERVICE_PLAY_MEDIA,
+    MediaType,
+)
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import HomeAssistant
+
+from custom_components.smartir.const import DOMAIN
+from custom_components.smartir.services import SERVICE_RELOAD_CODES
+
+from .common import RemoteMock, async_setup_smartir
+from .conftest import DEVICE_CODE, MEDIA_PLAYER_DEVICE
+
+
+def _channels(prefix: str) -> dict:
+    return {
+        "Channel %d" % digit: b64encode(b"%s%d" % (prefix, digit)).decode()
+        for digit in range(10)
+    }
+
+
+def _write_device(tmp_path, sources: dict):
+    file_path = tmp_path / "media_player" / ("%d.json" % DEVICE_CODE)
+    commands = {**MEDIA_PLAYER_DEVICE["commands"], "sources": sources}
+    file_path.write_text(json.dumps({**MEDIA_PLAYER_DEVICE, "commands": commands}))
+    stat = os.stat(file_path)
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+async def _async_play_channel(hass: HomeAssistant, entity_id: str, channel: str):
+    await hass.services.async_call(
+        "media_player",
+        SERVICE_PLAY_MEDIA,
+        {
+            ATTR_ENTITY_ID: entity_id,
+            ATTR_MEDIA_CONTENT_TYPE: MediaType.CHANNEL,
+            ATTR_MEDIA_CONTENT_ID: channel,
+        },
+        blocking=True,
+    )
+
+
+async def test_play_channel(hass: HomeAssistant, tmp_path) -> None:
+    """Send the codes of all channel number digits in a single call."""
+    _write_device(tmp_path, _channels(b"A"))
+    remote = RemoteMock(hass)
+    entity_id = await async_setup_smartir(hass, "media_player")
+
+    await _async_play_channel(hass, entity_id, "12")
+    await _async_play_channel(hass, entity_id, "12")
+    assert remote.commands == [["b64:T04=", "b64:QTE=", "b64:QTI="]] * 2
+    assert hass.states.get(entity_id).attributes["source"] == "Channel 12"
+
+
+async def test_play_channel_reloaded(hass: HomeAssistant, tmp_path) -> None:
+    """Send the reloaded codes of the channel number digits."""
+    _write_device(tmp_path, _channels(b"A"))
+    remote = RemoteMock(hass)
+    entity_id = await async_setup_smartir(hass, "media_player")
+    await _async_play_channel(hass, entity_id, "3")
+
+    _write_device(tmp_path, _channels(b"B"))
+    await hass.services.async_call(DOMAIN, SERVICE_RELOAD_CODES, blocking=True)
+    await _async_play_channel(hass, entity_id, "3")
+    assert remote.commands == [["b64:T04=", "b64:QTM="], ["b64:T04=", "b64:QjM="]]
+
+
+@pytest.mark.parametrize("channel", ["12", "1a"])
+async def test_play_channel_invalid(hass: HomeAssistant, channel: str) -> None:
+    """Don't send any code of the channel number with a missing digit."""
+    remote = RemoteMock(hass)
+    entity_id = await async_setup_smartir(hass, "media_player")
+
+    await _async_play_channel(hass, entity_id, channel)
+    assert remote.calls == []
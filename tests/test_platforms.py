@@ -0,0 +1,87 @@
+"""Tests sending commands through every SmartIR platform."""
+
+import pytest
+
+from homeassistant.components.climate import SERVICE_SET_HVAC_MODE, HVACMode
+from homeassistant.const import ATTR_ENTITY_ID, SERVICE_TURN_OFF, SERVICE_TURN_ON
+from homeassistant.core import HomeAssistant
+
+from custom_components.smartir.const import DOMAIN
+from custom_components.smartir.services import SERVICE_FORCE_RESEND
+
+from .common import REMOTE_ENTITY, RemoteMock, async_setup_smartir
+
+# platform, service turning the entity on with its data and the sent codes
+TURN_ON = {
+    "climate": (SERVICE_SET_HVAC_MODE, {"hvac_mode": HVACMode.HEAT}, ["b64:SDE2"]),
+    "fan": (SERVICE_TURN_ON, {}, ["b64:TE9X"]),
+    "light": (SERVICE_TURN_ON, {}, ["b64:T04="]),
+    "media_player": (SERVICE_TURN_ON, {}, ["b64:T04="]),
+}
+# platform, service setting the same state again with its data and the codes
+SET_STATE = {
+    **TURN_ON,
+    # light skips turning on the turned on light by itself
+    "light": (SERVICE_TURN_ON, {"brightness": 1}, ["b64:TklHSFQ="]),
+}
+# platform and the codes turning the entity off
+TURN_OFF = {
+    "climate": ["b64:T0ZGSA=="],
+    "fan": ["b64:T0ZG"],
+    "light": ["b64:T0ZG"],
+    "media_player": ["b64:T0ZG"],
+}
+
+
+async def async_turn_on(hass: HomeAssistant, domain: str, entity_id: str) -> None:
+    service, data, _ = TURN_ON[domain]
+    await hass.services.async_call(
+        domain, service, {ATTR_ENTITY_ID: entity_id, **data}, blocking=True
+    )
+
+
+async def async_turn_off(hass: HomeAssistant, domain: str, entity_id: str) -> None:
+    await hass.services.async_call(
+        domain, SERVICE_TURN_OFF, {ATTR_ENTITY_ID: entity_id}, blocking=True
+    )
+
+
+@pytest.mark.parametrize("domain", list(TURN_ON))
+async def test_send_commands(hass: HomeAssistant, domain: str) -> None:
+    """Turn the entity on and off through the remote."""
+    remote = RemoteMock(hass)
+    entity_id = await async_setup_smartir(hass, domain)
+
+    await async_turn_on(hass, domain, entity_id)
+    assert remote.commands == [TURN_ON[domain][2]]
+    assert remote.calls[0][ATTR_ENTITY_ID] == REMOTE_ENTITY
+    assert hass.states.get(entity_id).state != "off"
+
+    await async_turn_off(hass, domain, entity_id)
+    assert remote.commands == [TURN_ON[domain][2], TURN_OFF[domain]]
+    assert hass.states.get(entity_id).state == "off"
+
+
+@pytest.mark.parametrize("domain", list(SET_STATE))
+async def test_skip_unchanged(hass: HomeAssistant, domain: str) -> None:
+    """Skip the same state codes and send them again when forced."""
+    remote = RemoteMock(hass)
+    entity_id = await async_setup_smartir(hass, domain, skip_unchanged=True)
+    service, data, codes = SET_STATE[domain]
+
+    await hass.services.async_call(
+        domain, service, {ATTR_ENTITY_ID: entity_id, **data}, blocking=True
+    )
+    sent = remote.commands
+    assert sent[-1] == codes
+
+    await hass.services.async_call(
+        domain, service, {ATTR_ENTITY_ID: entity_id, **data}, blocking=True
+    )
+    assert remote.commands == sent
+    assert hass.states.get(entity_id).attributes["sends_suppressed"] == 1
+
+    await hass.services.async_call(
+        DOMAIN, SERVICE_FORCE_RESEND, {ATTR_ENTITY_ID: entity_id}, blocking=True
+    )
+    assert remote.commands == sent + [codes]
@@ -0,0 +1,93 @@
+"""Tests of the power sensor and restored state of the SmartIR platforms."""
+
+from datetime import timedelta
+
+import pytest
+
+from homeassistant.const import ATTR_ENTITY_ID, SERVICE_TURN_ON, STATE_OFF, STATE_ON
+from homeassistant.core import HomeAssistant, State
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import (
+    async_fire_time_changed,
+    mock_restore_cache,
+)
+
+from .common import RemoteMock, async_setup_smartir
+
+POWER_SENSOR = "binary_sensor.power"
+POWER_SENSOR_DELAY = 5
+
+DOMAINS = ["fan", "light", "media_player"]
+
+
+@pytest.mark.parametrize("domain", DOMAINS)
+async def test_power_sensor(hass: HomeAssistant, domain: str) -> None:
+    """Follow the device turned on and off by its own remote."""
+    hass.states.async_set(POWER_SENSOR, STATE_OFF)
+    entity_id = await async_setup_smartir(hass, domain, power_sensor=POWER_SENSOR)
+    assert hass.states.get(entity_id).state == STATE_OFF
+
+    hass.states.async_set(POWER_SENSOR, STATE_ON)
+    await hass.async_block_till_done()
+    state = hass.states.get(entity_id)
+    assert state.state == STATE_ON
+    assert state.attributes["on_by_remote"] is True
+
+    hass.states.async_set(POWER_SENSOR, STATE_OFF)
+    await hass.async_block_till_done()
+    state = hass.states.get(entity_id)
+    assert state.state == STATE_OFF
+    assert state.attributes["on_by_remote"] is False
+
+
+@pytest.mark.parametrize("domain", ["fan", "media_player"])
+async def test_power_sensor_check(hass: HomeAssistant, domain: str) -> None:
+    """Revert the state when the power sensor doesn't follow the sent codes."""
+    RemoteMock(hass)
+    hass.states.async_set(POWER_SENSOR, STATE_OFF)
+    entity_id = await async_setup_smartir(
+        hass,
+        domain,
+        power_sensor=POWER_SENSOR,
+        power_sensor_delay=POWER_SENSOR_DELAY,
+    )
+
+    await hass.services.async_call(
+        domain, SERVICE_TURN_ON, {ATTR_ENTITY_ID: entity_id}, blocking=True
+    )
+    assert hass.states.get(entity_id).state == STATE_ON
+
+    async_fire_time_changed(
+        hass, dt_util.utcnow() + timedelta(seconds=POWER_SENSOR_DELAY + 1)
+    )
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state == STATE_OFF
+
+
+@pytest.mark.parametrize("domain", DOMAINS)
+async def test_restore_state(hass: HomeAssistant, domain: str) -> None:
+    """Restore the on state and whether the device was turned on by its remote."""
+    mock_restore_cache(
+        hass, [State(domain + ".test", STATE_ON, {"on_by_remote": True})]
+    )
+    hass.states.async_set(POWER_SENSOR, STATE_ON)
+    entity_id = await async_setup_smartir(hass, domain, power_sensor=POWER_SENSOR)
+
+    state = hass.states.get(entity_id)
+    assert state.state == STATE_ON
+    assert state.attributes["on_by_remote"] is True
+
+
+@pytest.mark.parametrize("domain", DOMAINS)
+async def test_restore_state_without_power_sensor(
+    hass: HomeAssistant, domain: str
+) -> None:
+    """Restore the on state, but not the remote flag without a power sensor."""
+    mock_restore_cache(
+        hass, [State(domain + ".test", STATE_ON, {"on_by_remote": True})]
+    )
+    entity_id = await async_setup_smartir(hass, domain)
+
+    state = hass.states.get(entity_id)
+    assert state.state == STATE_ON
+    assert state.attributes["on_by_remote"] is False
@@ -0,0 +1,71 @@
+"""Tests of the filter of the redundant state codes."""
+
+from custom_components.smartir.send_filter import RedundantSendFilter
+
+ON = ["b64:T04="]
+HEAT = ["b64:SEVBVA=="]
+
+
+class Clock:
+    """Clock advanced by the tests."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_redundant() -> None:
+    """Find the same state codes sent within the max age redundant."""
+    clock = Clock()
+    send_filter = RedundantSendFilter(max_age=60, clock=clock)
+    assert not send_filter.is_redundant("on", ON)
+
+    send_filter.update("on", ON)
+    clock.now += 60
+    assert send_filter.is_redundant("on", ON)
+    assert not send_filter.is_redundant("off", ON)
+    assert not send_filter.is_redundant("on", HEAT)
+    assert send_filter.suppressed == 1
+
+    clock.now += 0.1
+    assert not send_filter.is_redundant("on", ON)
+    assert send_filter.suppressed == 1
+
+
+def test_update() -> None:
+    """Measure the max age from the last sent state codes."""
+    clock = Clock()
+    send_filter = RedundantSendFilter(max_age=60, clock=clock)
+    send_filter.update("on", ON)
+    clock.now += 50
+    send_filter.update("on", HEAT)
+    clock.now += 50
+
+    assert send_filter.is_redundant("on", HEAT)
+    assert not send_filter.is_redundant("on", ON)
+    assert send_filter.state == "on"
+    assert send_filter.codes == HEAT
+
+
+def test_invalidate() -> None:
+    """Don't find the state codes redundant after relative codes."""
+    clock = Clock()
+    send_filter = RedundantSendFilter(max_age=60, clock=clock)
+    send_filter.update("on", ON)
+    send_filter.invalidate()
+
+    assert not send_filter.is_redundant("on", ON)
+    assert send_filter.codes == ON
+
+
+def test_disabled() -> None:
+    """Remember the last state codes without max age, never filtering them."""
+    send_filter = RedundantSendFilter(clock=Clock())
+    send_filter.update("on", ON)
+
+    assert not send_filter.is_redundant("on", ON)
+    assert send_filter.state == "on"
+    assert send_filter.codes == ON
+    assert send_filter.suppressed == 0
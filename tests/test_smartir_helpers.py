@@ -0,0 +1,48 @@
+"""Tests of the SmartIR helpers."""
+
+import pytest
+
+from custom_components.smartir.smartir_helpers import (
+    ClosestMatch,
+    closest_match_index,
+    closest_match_value,
+)
+
+KEYS = [
+    ["16", "17", "18", "20", "24"],
+    ["16", "16.5", "17", "17.5", "18"],
+    ["18", "16", "30", "17"],
+    ["16", "16.0", "17", "17.0"],
+    ["-5", "0", "5"],
+    ["20"],
+    [],
+]
+
+VALUES = [None, *(value / 4 for value in range(-40, 140))]
+
+
+@pytest.mark.parametrize("keys", KEYS, ids=str)
+def test_closest_match_value(keys) -> None:
+    """Return the same keys as closest_match_value."""
+    match = ClosestMatch(keys)
+    assert len(match) == len(keys)
+    for value in VALUES:
+        assert match.value(value) == closest_match_value(value, keys), value
+
+
+@pytest.mark.parametrize("keys", [keys for keys in KEYS if keys], ids=str)
+def test_closest_match_index(keys) -> None:
+    """Return the same positions as closest_match_index."""
+    match = ClosestMatch(keys)
+    numbers = [float(key) for key in keys]
+    for value in VALUES[1:]:
+        assert match.index(value) == closest_match_index(value, numbers), value
+
+
+def test_closest_match_numbers() -> None:
+    """Match numeric keys, like the light brightness levels."""
+    match = ClosestMatch([1, 64, 128, 255])
+    assert match.value(100) == 128
+    assert match.index(96) == 2
+    assert match.index(300) == 3
+    assert ClosestMatch(None).value(20) is None
@@ -0,0 +1,129 @@
+"""Tests of the conversion of device commands between the controllers."""
+
+from base64 import b64decode, b64encode
+import json
+
+from homeassistant.const import ATTR_ENTITY_ID, SERVICE_TURN_ON
+from homeassistant.core import HomeAssistant
+
+from custom_components.smartir.ir_codec import (
+    broadlink_to_pulses,
+    pronto_to_pulses,
+    pulses_to_broadlink,
+    tuya_to_pulses,
+)
+from custom_components.smartir.lazy_commands import LazyCommands
+from custom_components.smartir.transcoder import get_transcoder, transcode_commands
+
+from .common import RemoteMock, async_setup_smartir
+from .conftest import DEVICE_CODE, FAN_DEVICE
+
+PULSES = [9000, 4500, 560, 560, 560, 1690, 560, 39000]
+CODE = b64encode(pulses_to_broadlink(PULSES)).decode()
+DECODED = broadlink_to_pulses(b64decode(CODE))
+
+
+def test_get_transcoder() -> None:
+    """Convert commands between controllers through their pulses."""
+    encoding, transcode = get_transcoder("Broadlink", "Base64", "Xiaomi")
+    assert encoding == "Pronto"
+    pulses = pronto_to_pulses(bytes.fromhex(transcode(CODE)))
+    # Pronto durations are counted in the carrier periods
+    assert all(abs(pulse - decoded) < 27 for pulse, decoded in zip(pulses, DECODED))
+
+    encoding, transcode = get_transcoder("Broadlink", "Base64", "LOOKin")
+    assert encoding == "Raw"
+    assert transcode(CODE) == "8984 -4477 549 -549 549 -1675 549 -38981"
+    assert json.loads(get_transcoder("LOOKin", "Raw", "ESPHome")[1]("1 -2 3 -4")) == [
+        1,
+        -2,
+        3,
+        -4,
+    ]
+
+
+def test_get_transcoder_unsupported() -> None:
+    """Return None for the commands which can't be converted."""
+    assert get_transcoder("MQTT", "Raw", "Broadlink") is None
+    assert get_transcoder("Broadlink", "Base64", "ZHA") is None
+
+
+def test_transcode_commands() -> None:
+    """Convert the whole tree, dropping and reporting invalid commands."""
+    transcoded = []
+    reported = []
+
+    def transcode(command):
+        transcoded.append(command)
+        if command.startswith("bad"):
+            raise ValueError("invalid " + command)
+        return command.upper()
+
+    commands = LazyCommands(
+        {"off": "off", "on": "bad", "heat": "heat"},
+        {"heat"},
+        lambda key: (
+            {
+                "low": {"16": "h16", "17": "h16"},
+                "high": {"16": "bad16"},
+                "seq": ["a", 1],
+            },
+            0,
+        ),
+    )
+    result = transcode_commands(commands, transcode, reported.append)
+
+    assert isinstance(result, LazyCommands)
+    assert dict(result) == {
+        "off": "OFF",
+        "heat": {"low": {"16": "H16", "17": "H16"}, "high": {}, "seq": ["A", 1]},
+    }
+    assert sorted(transcoded) == ["a", "bad", "bad16", "h16", "off"]
+    assert len(reported) == 1
+    assert {command: str(error) for command, error in reported[0].items()} == {
+        "bad": "invalid bad",
+        "bad16": "invalid bad16",
+    }
+
+
+def test_transcode_commands_list() -> None:
+    """Drop the commands sequences with any invalid command."""
+    reported = []
+
+    def transcode(command):
+        if command == "bad":
+            raise ValueError(command)
+        return command
+
+    result = transcode_commands(
+        {"sequence": ["a", "bad"], "other": ["a"]}, transcode, reported.append
+    )
+    assert dict(result) == {"other": ["a"]}
+    assert list(reported[0]) == ["bad"]
+
+
+async def test_cross_controller(hass: HomeAssistant, tmp_path) -> None:
+    """Send Broadlink device commands by the Xiaomi controller."""
+    device_data = {**FAN_DEVICE, "commands": {"off": CODE, "default": {"low": CODE}}}
+    (tmp_path / "fan" / ("%d.json" % DEVICE_CODE)).write_text(json.dumps(device_data))
+    remote = RemoteMock(hass)
+    entity_id = await async_setup_smartir(
+        hass,
+        "fan",
+        controller_data={"controller_type": "Xiaomi", "remote_entity": "remote.test"},
+    )
+
+    await hass.services.async_call(
+        "fan", SERVICE_TURN_ON, {ATTR_ENTITY_ID: entity_id}, blocking=True
+    )
+    _, transcode = get_transcoder("Broadlink", "Base64", "Xiaomi")
+    assert remote.commands == [["pronto:" + transcode(CODE)]]
+    assert hass.states.get(entity_id).attributes["commands_encoding"] == "Pronto"
+
+
+def test_ufor11_transcoder() -> None:
+    """Convert Broadlink commands to the UFO-R11 Tuya codes and back."""
+    encoding, transcode = get_transcoder("Broadlink", "Base64", "UFOR11")
+    assert encoding == "Raw"
+    assert tuya_to_pulses(b64decode(transcode(CODE))) == DECODED
+    assert get_transcoder("UFOR11", "Raw", "Broadlink")[1](transcode(CODE)) == CODE
@@ -0,0 +1,192 @@
+"""Tests of the transmitters shared by the controllers."""
+
+import asyncio
+
+from custom_components.smartir.transmitter import Transmitter, TransmitterScheduler
+
+GAP = 0.05
+
+
+class Emissions:
+    """Emissions recording their order, paused until released."""
+
+    def __init__(self):
+        self.sent = []
+        self.released = asyncio.Event()
+        self.released.set()
+
+    def emit(self, name):
+        async def emit():
+            self.sent.append(name)
+            await self.released.wait()
+            return name
+
+        return emit
+
+
+async def test_exclusive() -> None:
+    """Run a single emission at a time."""
+    transmitter = Transmitter()
+    emissions = Emissions()
+    emissions.released.clear()
+
+    first = asyncio.create_task(transmitter.async_emit("a", emissions.emit("a1")))
+    second = asyncio.create_task(transmitter.async_emit("b", emissions.emit("b1")))
+    await asyncio.sleep(0)
+    assert emissions.sent == ["a1"]
+    assert transmitter.statistics()["queue_depth"] == 1
+
+    emissions.released.set()
+    assert await asyncio.gather(first, second) == ["a1", "b1"]
+    statistics = transmitter.statistics()
+    assert statistics["queue_depth"] == 0
+    assert statistics["max_queue_depth"] == 1
+    assert statistics["emissions"] == 2
+
+
+async def test_round_robin() -> None:
+    """Serve the waiting clients in turns."""
+    transmitter = Transmitter()
+    emissions = Emissions()
+    emissions.released.clear()
+
+    tasks = [
+        asyncio.create_task(transmitter.async_emit(client, emissions.emit(name)))
+        for client, name in (
+            ("a", "a1"),
+            ("a", "a2"),
+            ("a", "a3"),
+            ("b", "b1"),
+            ("b", "b2"),
+            ("c", "c1"),
+        )
+    ]
+    await asyncio.sleep(0)
+    emissions.released.set()
+    await asyncio.gather(*tasks)
+    assert emissions.sent == ["a1", "a2", "b1", "c1", "a3", "b2"]
+
+
+async def test_scheduler() -> None:
+    """Share transmitters by name, run different transmitters in parallel."""
+    scheduler = TransmitterScheduler()
+    transmitter = scheduler.get("Broadlink remote.first")
+    assert scheduler.get("Broadlink remote.first") is transmitter
+    other = scheduler.get("Broadlink remote.second")
+    assert other is not transmitter
+
+    emissions = Emissions()
+    emissions.released.clear()
+    first = asyncio.create_task(transmitter.async_emit("a", emissions.emit("a1")))
+    second = asyncio.create_task(other.async_emit("b", emissions.emit("b1")))
+    await asyncio.sleep(0)
+    assert emissions.sent == ["a1", "b1"]
+
+    emissions.released.set()
+    await asyncio.gather(first, second)
+    assert set(scheduler.statistics()) == {
+        "Broadlink remote.first",
+        "Broadlink remote.second",
+    }
+
+
+async def test_gap_deadline() -> None:
+    """Return right after the emission, delay only the next one by the gap."""
+    loop = asyncio.get_running_loop()
+    transmitter = Transmitter()
+    emissions = Emissions()
+    times = []
+
+    async def emit():
+        times.append(loop.time())
+
+    start = loop.time()
+    await transmitter.async_emit("a", emit, GAP)
+    assert loop.time() - start < GAP
+    await transmitter.async_emit("b", emit, GAP)
+    assert times[1] - times[0] >= GAP
+
+    # the gap already passed
+    await asyncio.sleep(GAP)
+    start = loop.time()
+    await transmitter.async_emit("a", emissions.emit("a1"))
+    assert loop.time() - start < GAP
+
+
+async def test_cancel_waiting() -> None:
+    """Drop the cancelled waiting emission."""
+    transmitter = Transmitter()
+    emissions = Emissions()
+    emissions.released.clear()
+
+    first = asyncio.create_task(transmitter.async_emit("a", emissions.emit("a1")))
+    second = asyncio.create_task(transmitter.async_emit("b", emissions.emit("b1")))
+    third = asyncio.create_task(transmitter.async_emit("c", emissions.emit("c1")))
+    await asyncio.sleep(0)
+    second.cancel()
+    await asyncio.sleep(0)
+    assert transmitter.statistics()["queue_depth"] == 1
+
+    emissions.released.set()
+    await asyncio.gather(first, third)
+    assert second.cancelled()
+    assert emissions.sent == ["a1", "c1"]
+
+
+async def test_cancel_passed_over() -> None:
+    """Pass the transmitter on when the emission is cancelled before it resumes."""
+    loop = asyncio.get_running_loop()
+    transmitter = Transmitter()
+    emissions = Emissions()
+
+    async def emit():
+        await asyncio.sleep(0)
+        # runs after the transmitter is passed over to the second emission
+        loop.call_soon(second.cancel)
+        return "a1"
+
+    first = asyncio.create_task(transmitter.async_emit("a", emit))
+    second = asyncio.create_task(transmitter.async_emit("b", emissions.emit("b1")))
+    third = asyncio.create_task(transmitter.async_emit("c", emissions.emit("c1")))
+    assert await asyncio.gather(first, third) == ["a1", "c1"]
+    assert second.cancelled()
+    assert emissions.sent == ["c1"]
+    assert transmitter.statistics()["queue_depth"] == 0
+
+
+async def test_cancel_running() -> None:
+    """Release the transmitter when the running emission is cancelled."""
+    transmitter = Transmitter()
+    emissions = Emissions()
+    emissions.released.clear()
+
+    first = asyncio.create_task(transmitter.async_emit("a", emissions.emit("a1")))
+    second = asyncio.create_task(transmitter.async_emit("b", emissions.emit("b1")))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    emissions.released.set()
+    assert await second == "b1"
+    assert first.cancelled()
+    assert emissions.sent == ["a1", "b1"]
+    assert transmitter.statistics()["queue_depth"] == 0
+
+
+async def test_cancel_gap_wait() -> None:
+    """Keep the gap when the emission waiting for it is cancelled."""
+    loop = asyncio.get_running_loop()
+    transmitter = Transmitter()
+    emissions = Emissions()
+
+    await transmitter.async_emit("a", emissions.emit("a1"), GAP)
+    sent_at = loop.time()
+    waiting = asyncio.create_task(transmitter.async_emit("b", emissions.emit("b1")))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    await asyncio.sleep(0)
+    assert waiting.cancelled()
+    assert transmitter.statistics()["queue_depth"] == 0
+
+    await transmitter.async_emit("c", emissions.emit("c1"))
+    assert loop.time() - sent_at >= GAP
+    assert emissions.sent == ["a1", "c1"]
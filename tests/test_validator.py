@@ -0,0 +1,95 @@
+"""Tests of the bulk validator of the device files."""
+
+import json
+import sys
+
+import pytest
+
+import test_device_data
+
+from .conftest import FAN_DEVICE
+
+
+@pytest.fixture
+def codes(tmp_path, monkeypatch):
+    """Provide fan device files in the codes directory."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(test_device_data, "validator_digest", lambda: "validator")
+    directory = tmp_path / "codes" / "fan"
+    directory.mkdir(parents=True)
+    (directory / "1000.json").write_text(json.dumps(FAN_DEVICE))
+    (directory / "1001.json").write_text(json.dumps({**FAN_DEVICE, "speed": []}))
+    return directory
+
+
+def _validate(monkeypatch, capsys, *args) -> tuple:
+    monkeypatch.setattr(sys, "argv", ["test_device_data.py", *args])
+    with pytest.raises(SystemExit) as exit:
+        test_device_data.main()
+    # results are followed by the slowest files, without the verdicts
+    results = [line.split() for line in capsys.readouterr().out.splitlines()]
+    return exit.value.code, {
+        result[2]: result[:2] for result in results if len(result) == 3
+    }
+
+
+def test_json(codes) -> None:
+    """Return the verdict and the index entry of a device file."""
+    valid, entry, _ = test_device_data.test_json("codes/fan/1000.json")
+    assert valid
+    assert entry["path"] == "codes/fan/1000.json"
+    assert entry["manufacturer"] == "Test"
+    assert entry["models"] == ["Fan"]
+
+    valid, entry, _ = test_device_data.test_json("codes/fan/1001.json")
+    assert not valid
+    assert entry is not None
+
+
+def test_incremental(codes, monkeypatch, capsys) -> None:
+    """Validate again only the files changed since the previous run."""
+    files = ["codes/fan/1000.json", "codes/fan/1001.json"]
+    exit, results = _validate(monkeypatch, capsys, *files)
+    assert exit == 1
+    assert results["codes/fan/1000.json"][1] == "OK"
+    assert results["codes/fan/1001.json"][1] == "INVALID"
+
+    exit, results = _validate(monkeypatch, capsys, "--incremental", *files)
+    assert exit == 1
+    assert results == {
+        "codes/fan/1000.json": ["cached", "OK"],
+        "codes/fan/1001.json": ["cached", "INVALID"],
+    }
+
+    (codes / "1001.json").write_text(json.dumps({**FAN_DEVICE, "speed": ["low"]}))
+    exit, results = _validate(monkeypatch, capsys, "--incremental", *files)
+    assert exit == 0
+    assert results["codes/fan/1000.json"] == ["cached", "OK"]
+    assert results["codes/fan/1001.json"][0] != "cached"
+    assert results["codes/fan/1001.json"][1] == "OK"
+
+    # verdicts are not reused without the incremental option
+    exit, results = _validate(monkeypatch, capsys, *files)
+    assert exit == 0
+    assert all(result[0] != "cached" for result in results.values())
+
+
+def test_load_manifest(codes, monkeypatch, capsys) -> None:
+    """Drop the verdicts of another validator, keep the index."""
+    _validate(monkeypatch, capsys, "codes/fan/1000.json")
+
+    index, verdicts = test_device_data.load_manifest(
+        test_device_data.MANIFEST_FILE, "validator"
+    )
+    assert verdicts["codes/fan/1000.json"]["valid"]
+    assert index.cached("codes/fan/1000.json")["manufacturer"] == "Test"
+
+    index, verdicts = test_device_data.load_manifest(
+        test_device_data.MANIFEST_FILE, "other"
+    )
+    assert verdicts == {}
+    assert index.cached("codes/fan/1000.json") is not None
+
+    index, verdicts = test_device_data.load_manifest("missing.json", "validator")
+    assert verdicts == {}
+    assert index.cached("codes/fan/1000.json") is None